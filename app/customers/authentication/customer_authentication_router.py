@@ -5,14 +5,22 @@ from fastapi.encoders import jsonable_encoder
 from pymongo.errors import PyMongoError
 
 from app.customers.models import SignUpModel
-from app.customers.schemas import LoginSchema, OTPVerification, SignUpSchema
+from app.customers.schemas import (
+    DeviceTokenSchema,
+    LoginSchema,
+    OTPVerification,
+    SignUpSchema,
+)
 from app.general.utils.database import NEXTCHOW_COLLECTIONS, get_database
 from app.general.utils.oauth_service import (
     create_access_token,
     get_current_user,
-    get_password_hash,
-    verify_password,
+    get_password_hash_async,
+    invalidate_user_cache,
+    verify_password_async,
 )
+from app.general.utils.otp_service import OTPPurpose, consume_otp, issue_otp
+from app.general.utils.push_notification import register_device_token
 
 customer_auth_router = APIRouter(prefix="/customer", tags=["Customer Authentication"])
 
@@ -31,29 +39,20 @@ async def customer_signup(signup_data: SignUpSchema, db=Depends(get_database)):
             )
 
         # Hash the password
-        hashed_password = get_password_hash(signup_data.password)
+        hashed_password = await get_password_hash_async(signup_data.password)
 
         # Prepare user data
         # Prepare user data
         user_data = jsonable_encoder(SignUpModel(**signup_data.dict()))
 
-        # Generate OTP
-        # otp = generate_otp()
-        user_data.update(
-            {
-                "password": hashed_password,
-                "otp": get_password_hash(
-                    "1234"
-                ),  # Replace with `generate_otp()` if needed
-                "otp_created_at": datetime.now(),
-            }
-        )
+        user_data["password"] = hashed_password
 
-        # Insert user with OTP
+        # Insert user
         result = await db[NEXTCHOW_COLLECTIONS.CUSTOMER_USER].insert_one(user_data)
 
-        # Send OTP via email (commented out for testing)
-        # await send_reg_otp_mail(signup_data.email, otp)
+        # Generate OTP
+        otp = "1234"  # Replace with `generate_otp()` if needed
+        await issue_otp(db, "customer", OTPPurpose.REGISTRATION, signup_data.email, otp)
 
         return {
             "success": True,
@@ -83,29 +82,21 @@ async def verify_customer_otp(
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
-        # Check if OTP is valid and not expired
-        otp_hash = user.get("otp")
-        otp_created_at = user.get("otp_created_at")
-
-        if not otp_hash or not otp_created_at:
-            raise HTTPException(
-                status_code=400,
-                detail="No OTP exists for this user",
-            )
-
-        # Check OTP expiration (e.g., 15 minutes)
-        if (datetime.now() - otp_created_at).total_seconds() > 900:
-            raise HTTPException(status_code=400, detail="OTP has expired")
-
-        # Verify OTP
-        if not verify_password(otp_verification.otp, otp_hash):
-            raise HTTPException(status_code=400, detail="Invalid OTP")
+        # Verify and consume the OTP
+        await consume_otp(
+            db,
+            "customer",
+            OTPPurpose.REGISTRATION,
+            otp_verification.email,
+            otp_verification.otp,
+        )
 
         # Mark user as verified
         await db[NEXTCHOW_COLLECTIONS.CUSTOMER_USER].update_one(
             {"email": otp_verification.email},
-            {"$set": {"is_verified": True}, "$unset": {"otp": 1, "otp_created_at": 1}},
+            {"$set": {"is_verified": True}},
         )
+        invalidate_user_cache(user["_id"])
 
         # Create access token
         access_token = create_access_token({"id": str(user["_id"])})
@@ -143,7 +134,7 @@ async def customer_login(login_data: LoginSchema, db=Depends(get_database)):
             )
 
         # Verify password
-        if not verify_password(login_data.password, user["password"]):
+        if not await verify_password_async(login_data.password, user["password"]):
             return HTTPException(
                 status_code=401,
                 detail="Invalid credentials",
@@ -197,6 +188,7 @@ async def update_customer_profile(
         result = await db[NEXTCHOW_COLLECTIONS.CUSTOMER_USER].update_one(
             {"_id": user.get("_id")}, {"$set": update_data}
         )
+        invalidate_user_cache(user.get("_id"))
 
         if result.modified_count == 0:
             raise HTTPException(
@@ -246,3 +238,24 @@ async def get_customer_profile(
         )
     except Exception as e:
         raise e
+
+
+@customer_auth_router.post("/devices")
+async def register_customer_device(
+    device: DeviceTokenSchema,
+    user: dict = Depends(get_current_user),
+    db=Depends(get_database),
+):
+    try:
+        await register_device_token(
+            db, device.token, str(user["_id"]), "customer", device.platform
+        )
+        return {"success": True, "message": "Device registered for notifications"}
+
+    except PyMongoError as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Database error: {str(e)}",
+        )
+    except Exception as e:
+        raise e
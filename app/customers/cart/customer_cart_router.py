@@ -1,51 +1,72 @@
-import os
+import asyncio
+import uuid
 from datetime import datetime
-from typing import List
+from typing import Dict, Optional, Tuple
 
-import requests
 from bson import ObjectId
-from fastapi import APIRouter, Depends, HTTPException, status
-from geopy.distance import geodesic
-from pymongo.errors import PyMongoError
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
 
-from app.customers.models import *
 from app.customers.schemas import CartPackSchema
-from app.general.utils.database import NEXTCHOW_COLLECTIONS, get_database
+from app.general.utils.database import (
+    NEXTCHOW_COLLECTIONS,
+    get_database,
+    run_in_transaction,
+)
+from app.general.utils.delivery import (
+    delivery_fee,
+    eta_minutes,
+    fetch_vendor_location,
+    preparation_minutes,
+    vendor_distance_km,
+)
+from app.general.utils.distance import location_coordinates
+from app.general.utils.helpers import id_query_values, prepare_json
+from app.general.utils.idempotency import IdempotencyClaim, run_idempotent
+from app.general.utils.job_handlers import enqueue_payment_init
+from app.general.utils.loaders import Loaders, get_loaders
 from app.general.utils.oauth_service import get_current_user
+from app.general.utils.order_hydration import snapshot_order_lines
+from app.general.utils.order_payments import PaymentStatus, wait_for_payment
 
 cart_router = APIRouter(prefix="/customer", tags=["Customer Cart Management"])
 
+MAX_CART_PACKS = 20
+# Removing a pack re-reads it when its subtotal changed underneath
+REMOVE_PACK_ATTEMPTS = 5
+
 
 @cart_router.post("/cart/add-pack")
 async def add_pack_to_cart(
     pack: CartPackSchema,
     user: dict = Depends(get_current_user),
     db=Depends(get_database),
+    loaders: Loaders = Depends(get_loaders),
 ):
     """
     Add a pack to the user's cart with comprehensive validations.
     """
     try:
+        # Load the packaging and every menu item together; the same documents
+        # are used to validate and to price the pack
+        pack_data = pack.dict()
+        pack_data["pack_id"] = uuid.uuid4().hex
+        menus, packaging = await fetch_prices(loaders, [pack_data])
+
         # Validate packaging exists
-        if pack.packaging_id:
-            packaging = await db[NEXTCHOW_COLLECTIONS.MENU_PACKAGING].find_one(
-                {"_id": ObjectId(pack.packaging_id)}
+        if pack.packaging_id and str(pack.packaging_id) not in packaging:
+            raise HTTPException(
+                status_code=400,
+                detail={
+                    "success": False,
+                    "message": f"Packaging {pack.packaging_id} not found",
+                },
             )
-            if not packaging:
-                raise HTTPException(
-                    status_code=400,
-                    detail={
-                        "success": False,
-                        "message": f"Packaging {pack.packaging_id} not found",
-                    },
-                )
 
         # Validate menu items
         for item in pack.items:
-            menu_item = await db[NEXTCHOW_COLLECTIONS.MENU].find_one(
-                {"_id": ObjectId(item.menu_id)}
-            )
-            if not menu_item:
+            if str(item.menu_id) not in menus:
                 raise HTTPException(
                     status_code=400,
                     detail={
@@ -54,21 +75,34 @@ async def add_pack_to_cart(
                     },
                 )
 
-        # Fetch or create cart
-        cart = await db[NEXTCHOW_COLLECTIONS.CUSTOMER_CART].find_one(
-            {"user_id": str(user["_id"])}
-        )
-        if not cart:
-            cart = {
-                "user_id": str(user["_id"]),
-                "packs": [],
-                "total_price": 0.0,
-                "created_at": datetime.now(),
-                "updated_at": datetime.now(),
-            }
-
-        # Limit cart size (optional - adjust as needed)
-        if len(cart["packs"]) >= 20:  # Max 20 different packs
+        # Price the pack once; the cart total is adjusted by this amount
+        price_pack(pack_data, menus, packaging)
+        now = datetime.now()
+
+        # Single conditional update: the $size guard enforces the pack cap
+        # even when two devices add at the same moment
+        try:
+            cart = await db[NEXTCHOW_COLLECTIONS.CUSTOMER_CART].find_one_and_update(
+                {
+                    "user_id": str(user["_id"]),
+                    "$expr": {
+                        "$lt": [
+                            {"$size": {"$ifNull": ["$packs", []]}},
+                            MAX_CART_PACKS,
+                        ]
+                    },
+                },
+                {
+                    "$push": {"packs": pack_data},
+                    "$inc": {"total_price": pack_data["subtotal"]},
+                    "$set": {"updated_at": now},
+                    "$setOnInsert": {"created_at": now},
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # The cart exists but failed the guard, so it is full
             raise HTTPException(
                 status_code=400,
                 detail={
@@ -77,17 +111,11 @@ async def add_pack_to_cart(
                 },
             )
 
-        # Add pack to cart
-        cart["packs"].append(pack.dict())
-        cart["total_price"] = await calculate_cart_total(cart["packs"], db)
-        cart["updated_at"] = datetime.now()
-
-        # Save/update cart
-        await db[NEXTCHOW_COLLECTIONS.CUSTOMER_CART].update_one(
-            {"user_id": str(user["_id"])}, {"$set": cart}, upsert=True
-        )
-
-        return {"success": True, "message": "Pack added to cart", "cart": cart}
+        return {
+            "success": True,
+            "message": "Pack added to cart",
+            "cart": prepare_json(cart),
+        }
 
     except PyMongoError as e:
         raise HTTPException(
@@ -98,7 +126,9 @@ async def add_pack_to_cart(
 
 @cart_router.get("/cart")
 async def get_user_cart(
-    user: dict = Depends(get_current_user), db=Depends(get_database)
+    user: dict = Depends(get_current_user),
+    db=Depends(get_database),
+    loaders: Loaders = Depends(get_loaders),
 ):
     """
     Fetch the current user's cart.
@@ -109,7 +139,11 @@ async def get_user_cart(
         )
         if not cart:
             return {"user_id": str(user["_id"]), "packs": [], "total_price": 0.0}
-        return cart
+        if any("pack_id" not in pack for pack in cart.get("packs", [])):
+            cart = await upgrade_legacy_cart(db, loaders, cart)
+        else:
+            cart = await reprice_stale_packs(db, loaders, cart)
+        return prepare_json(cart)
 
     except PyMongoError as e:
         raise HTTPException(
@@ -118,32 +152,51 @@ async def get_user_cart(
         )
 
 
-@cart_router.delete("/cart/pack/{pack_index}")
+@cart_router.delete("/cart/pack/{pack_id}")
 async def remove_pack_from_cart(
-    pack_index: int, user: dict = Depends(get_current_user), db=Depends(get_database)
+    pack_id: str, user: dict = Depends(get_current_user), db=Depends(get_database)
 ):
     """
     Remove a specific pack from the user's cart.
     """
     try:
-        cart = await db[NEXTCHOW_COLLECTIONS.CUSTOMER_CART].find_one(
-            {"user_id": str(user["_id"])}
-        )
-        if not cart:
-            raise HTTPException(status_code=404, detail="Cart not found")
-
-        try:
-            del cart["packs"][pack_index]
-        except IndexError:
-            raise HTTPException(status_code=400, detail="Invalid pack index")
-
-        cart["total_price"] = await calculate_cart_total(cart["packs"], db)
-        cart["updated_at"] = datetime.now()
+        cart_collection = db[NEXTCHOW_COLLECTIONS.CUSTOMER_CART]
+        for _ in range(REMOVE_PACK_ATTEMPTS):
+            cart = await cart_collection.find_one(
+                {"user_id": str(user["_id"]), "packs.pack_id": pack_id},
+                {"packs": {"$elemMatch": {"pack_id": pack_id}}},
+            )
+            if not cart:
+                raise HTTPException(status_code=404, detail="Pack not found in cart")
+            subtotal = cart["packs"][0].get("subtotal")
+
+            # Conditional on the pack still being there with the subtotal just
+            # read, so neither a concurrent removal nor a reprice in between
+            # can leave total_price off by this pack's subtotal
+            cart = await cart_collection.find_one_and_update(
+                {
+                    "_id": cart["_id"],
+                    "packs": {"$elemMatch": {"pack_id": pack_id, "subtotal": subtotal}},
+                },
+                {
+                    "$pull": {"packs": {"pack_id": pack_id}},
+                    "$inc": {"total_price": -(subtotal or 0.0)},
+                    "$set": {"updated_at": datetime.now()},
+                },
+                return_document=ReturnDocument.AFTER,
+            )
+            if cart:
+                break
+        else:
+            raise HTTPException(
+                status_code=409, detail="Cart is being updated, please retry"
+            )
 
-        await db[NEXTCHOW_COLLECTIONS.CUSTOMER_CART].update_one(
-            {"user_id": str(user["_id"])}, {"$set": cart}
-        )
-        return {"success": True, "message": "Pack removed from cart", "cart": cart}
+        return {
+            "success": True,
+            "message": "Pack removed from cart",
+            "cart": prepare_json(cart),
+        }
 
     except PyMongoError as e:
         raise HTTPException(
@@ -154,125 +207,67 @@ async def remove_pack_from_cart(
         raise e
 
 
-@cart_router.post("/cart/checkout_and_initiate_payment")
-async def checkout_and_initiate_payment(
-    db=Depends(get_database),
+@cart_router.get("/cart/quote")
+async def quote_cart(
+    longitude: Optional[float] = Query(None, ge=-180, le=180),
+    latitude: Optional[float] = Query(None, ge=-90, le=90),
     user: dict = Depends(get_current_user),
+    db=Depends(get_database),
+    loaders: Loaders = Depends(get_loaders),
 ):
     """
-    Convert the cart to an order, clear the cart, and initiate payment.
+    Price the cart and its delivery without writing anything. Delivers to the
+    user's saved location unless longitude/latitude are given.
     """
     try:
-        # Fetch the user's cart
         cart = await db[NEXTCHOW_COLLECTIONS.CUSTOMER_CART].find_one(
-            {"user_id": str(user["_id"])}
+            {"user_id": str(user["_id"])}, {"packs": 1}
         )
-        if not cart or not cart["packs"]:
+        if not cart or not cart.get("packs"):
             raise HTTPException(status_code=400, detail="Cart is empty")
+        packs = cart["packs"]
 
-        # Get menu and vendor details
-        menu_id = cart["packs"][0]["items"][0].get(
-            "menu_id"
-        )  # Adjusted based on cart structure
-        menu = await db[NEXTCHOW_COLLECTIONS.MENU].find_one({"_id": menu_id})
+        menus, packaging = await fetch_prices(loaders, packs)
+        prices = price_packs(packs, menus, packaging)
+
+        # The vendor is taken from the first item, as at checkout
+        menu = menus.get(str(packs[0]["items"][0]["menu_id"]))
         if not menu:
             raise HTTPException(status_code=400, detail="Menu item not found")
-
-        vendor = await db[NEXTCHOW_COLLECTIONS.VENDOR_USER].find_one(
-            {"_id": menu.get("user_id")}
-        )
-        if not vendor or "location" not in vendor:
+        vendor = await fetch_vendor_location(db, menu.get("user_id"))
+        if not vendor:
             raise HTTPException(
                 status_code=400, detail="Vendor not found or location missing"
             )
 
-        vendor_location = vendor.get("location")
-        vendor_address = vendor.get("address", "Unknown")
-
-        user_location = user.get("location")
-        if not user_location:
+        if longitude is not None and latitude is not None:
+            customer_coordinates = [longitude, latitude]
+        elif user.get("location"):
+            customer_coordinates = location_coordinates(user["location"])
+        else:
             raise HTTPException(status_code=400, detail="User location is missing")
 
-        # Calculate the estimated distance
-        estimated_distance = geodesic(
-            (vendor_location["coordinates"][1], vendor_location["coordinates"][0]),
-            (user_location["coordinates"][1], user_location["coordinates"][0]),
-        ).kilometers
-
-        # Calculate total price
-        total_price = await calculate_cart_total(cart["packs"], db)
-
-        # Create an order
-        order = {
-            "user_id": str(user["_id"]),
-            "pickup_address": vendor_address,
-            "pickup_location": vendor_location,
-            "delivery_address": user.get("address", ""),
-            "delivery_location": user_location,
-            "estimated_distance": round(estimated_distance, 2),
-            "additional_info": user.get("additional_info", ""),
-            "packs": cart["packs"],
-            "total_price": total_price,
-            "status": "Pending",
-            "created_at": datetime.now(),
-        }
-        order_result = await db[NEXTCHOW_COLLECTIONS.ORDERS].insert_one(order)
-        order_id = str(order_result.inserted_id)
-
-        # Clear the cart
-        await db[NEXTCHOW_COLLECTIONS.CUSTOMER_CART].delete_one(
-            {"user_id": str(user["_id"])}
+        distance = vendor_distance_km(
+            menu.get("user_id"),
+            location_coordinates(vendor["location"]),
+            customer_coordinates,
+        )
+        preparation = preparation_minutes(
+            menu.get("preparation_duration") for menu in menus.values()
         )
 
-        # Prepare payment data
-        payment_data = {
-            "email": user.get("email"),
-            "amount": total_price,
-            "callback_url": "https://nextchow.com/verify",
-            "channels": ["card"],
-            "metadata": {
-                "email": user.get("email"),
-                "user_id": user.get("_id"),
-                "order_id": order_id,
-                "amount": total_price,
+        return {
+            "success": True,
+            "data": {
+                "subtotal": prices["subtotal"],
+                "packaging": prices["packaging"],
+                "total_price": prices["subtotal"] + prices["packaging"],
+                "distance_km": distance,
+                "delivery_fee": delivery_fee(distance),
+                "eta_minutes": eta_minutes(distance, preparation),
             },
         }
 
-        # Initialize payment with Paystack
-        url = "https://api.paystack.co/transaction/initialize"
-        headers = {
-            "Authorization": f"Bearer {os.getenv('PAYMENT_SECRET_KEY')}",
-            "Content-Type": "application/json",
-        }
-        response = requests.post(url=url, json=payment_data, headers=headers)
-
-        if response.status_code in [200, 201]:
-            payment_authorization_data = response.json().get("data")
-
-            # Save payment details to the database
-            payment = OrderPayment(
-                order_id=order_id,
-                user_id=user.get("_id"),
-                amount=total_price,
-                reference=payment_authorization_data.get("reference"),
-                payment_method="credit_card",
-                access_code=payment_authorization_data.get("access_code"),
-            )
-            await db[NEXTCHOW_COLLECTIONS.ORDER_PAYMENTS].insert_one(payment.dict())
-
-            return {
-                "status_code": status.HTTP_200_OK,
-                "status": "success",
-                "message": "Checkout and payment initialization successful",
-                "order": order,
-                "payment_url": payment_authorization_data.get("authorization_url"),
-            }
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to initialize payment",
-            )
-
     except PyMongoError as e:
         raise HTTPException(
             status_code=500,
@@ -282,82 +277,354 @@ async def checkout_and_initiate_payment(
         raise e
 
 
-# @cart_router.post("/cart/checkout")
-# async def checkout(user: dict = Depends(get_current_user), db=Depends(get_database)):
-#     """
-#     Convert the cart to an order and clear the cart.
-#     """
-#     try:
-#         cart = await db[NEXTCHOW_COLLECTIONS.CUSTOMER_CART].find_one(
-#             {"user_id": str(user["_id"])}
-#         )
-#         if not cart or not cart["packs"]:
-#             raise HTTPException(status_code=400, detail="Cart is empty")
-
-#         # Create an order with more comprehensive user details
-#         order = {
-#             "user_id": str(user["_id"]),
-#             "customer_name": user.get("first_name", "")
-#             + " "
-#             + user.get("last_name", ""),
-#             "customer_phone": user.get("phone", ""),
-#             "customer_address": user.get("address", ""),
-#             "additional_info": user.get("additional_info", ""),
-#             "packs": cart["packs"],
-#             "total_price": cart["total_price"],
-#             "status": "Pending",
-#             "created_at": datetime.now(),
-#         }
+@cart_router.post("/cart/checkout_and_initiate_payment")
+async def checkout_and_initiate_payment(
+    idempotency_key: Optional[str] = Header(None),
+    db=Depends(get_database),
+    loaders: Loaders = Depends(get_loaders),
+    user: dict = Depends(get_current_user),
+):
+    """
+    Place the order exactly as `/cart/checkout` does, then wait for its
+    payment to be initialized and return the payment URL with the order.
+    Retries that send the same Idempotency-Key header get the first
+    response back, or carry on waiting for the same order.
+    """
+    return await run_idempotent(
+        db,
+        "checkout_and_initiate_payment",
+        user["_id"],
+        idempotency_key,
+        lambda claim: place_order_and_wait_for_payment(db, loaders, user, claim),
+    )
+
+
+async def place_order_and_wait_for_payment(
+    db, loaders: Loaders, user: dict, claim: IdempotencyClaim
+) -> Dict:
+    placed = await place_order(db, loaders, user, claim)
+    try:
+        order = await wait_for_payment(db, placed["order_id"])
+    except PyMongoError as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Database error: {str(e)}",
+        )
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
 
-#         await db[NEXTCHOW_COLLECTIONS.ORDERS].insert_one(order)
+    payment = order["payment"]
+    if payment.get("payment_url"):
+        return checkout_response(order, payment["payment_url"])
+    if payment["status"] == PaymentStatus.FAILED:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to initialize payment",
+        )
+    # Paystack is slow or down and the payment job is still retrying
+    raise HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=(
+            "Payment is still being initialized; retry with the same "
+            f"Idempotency-Key or poll /customer/cart/checkout/{placed['order_id']}"
+            "/payment"
+        ),
+    )
+
+
+def checkout_response(order: Dict, payment_url: Optional[str]) -> Dict:
+    return {
+        "status_code": status.HTTP_200_OK,
+        "status": "success",
+        "message": "Checkout and payment initialization successful",
+        "order": prepare_json(order),
+        "payment_url": payment_url,
+    }
+
+
+@cart_router.post("/cart/checkout", status_code=status.HTTP_202_ACCEPTED)
+async def checkout(
+    idempotency_key: Optional[str] = Header(None),
+    db=Depends(get_database),
+    loaders: Loaders = Depends(get_loaders),
+    user: dict = Depends(get_current_user),
+):
+    """
+    Convert the cart to an order and return its id straight away. Payment is
+    initialized in the background; poll `/cart/checkout/{order_id}/payment`
+    for the payment URL or wait for the push notification.
+    """
+    return await run_idempotent(
+        db,
+        "checkout",
+        user["_id"],
+        idempotency_key,
+        lambda claim: place_order(db, loaders, user, claim),
+    )
+
+
+async def place_order(
+    db, loaders: Loaders, user: dict, claim: IdempotencyClaim
+) -> Dict:
+    try:
+        order_id = claim.progress.get("order_id")
+        if order_id is not None:
+            # Placed by an earlier attempt with the same Idempotency-Key
+            return placed_response(order_id)
 
-#         # Clear the cart
-#         await db[NEXTCHOW_COLLECTIONS.CUSTOMER_CART].delete_one(
-#             {"user_id": str(user["_id"])}
-#         )
+        cart = await db[NEXTCHOW_COLLECTIONS.CUSTOMER_CART].find_one(
+            {"user_id": str(user["_id"])}
+        )
+        order = await build_order(db, loaders, user, cart)
+        order["_id"] = ObjectId()
+        order["payment"] = {"status": PaymentStatus.INITIALIZING}
+        order_id = str(order["_id"])
+
+        # The payment job is the outbox record: it exists if and only if the
+        # order does, and the cart is only cleared along with both
+        async def write_order(session):
+            # Only the cart that was priced; a pack added or removed since
+            # would otherwise vanish without being ordered
+            cleared = await db[NEXTCHOW_COLLECTIONS.CUSTOMER_CART].delete_one(
+                {"_id": cart["_id"], "updated_at": cart.get("updated_at")},
+                session=session,
+            )
+            if not cleared.deleted_count:
+                raise HTTPException(
+                    status_code=409, detail="Cart changed during checkout, please retry"
+                )
+            await db[NEXTCHOW_COLLECTIONS.ORDERS].insert_one(order, session=session)
+            await enqueue_payment_init(db, order_id, user.get("email"), session=session)
 
-#         return {"success": True, "message": "Checkout successful", "order": order}
+        await run_in_transaction(db, write_order)
+        await claim.checkpoint(order_id=order_id)
+        return placed_response(order_id)
 
-#     except PyMongoError as e:
-#         raise HTTPException(
-#             status_code=500,
-#             detail= f"Database error: {str(e)}"},
-#         )
+    except PyMongoError as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Database error: {str(e)}",
+        )
+
+
+def placed_response(order_id: str) -> Dict:
+    return {
+        "success": True,
+        "message": "Order placed, payment is being initialized",
+        "order_id": order_id,
+        "payment": {"status": PaymentStatus.INITIALIZING},
+    }
 
 
-async def calculate_cart_total(packs: List[CartPackSchema], db) -> float:
+@cart_router.get("/cart/checkout/{order_id}/payment")
+async def get_checkout_payment(
+    order_id: str, user: dict = Depends(get_current_user), db=Depends(get_database)
+):
+    """
+    Payment state of an order placed through `/cart/checkout`. `payment_url`
+    is set once `status` is "ready".
+    """
     try:
-        total_price = 0.0
-        for pack in packs:
-            pack_total = 0.0
-            for item in pack["items"]:
-                menu = await db["menu"].find_one({"_id": ObjectId(item["menu_id"])})
-                if menu:
-                    pack_total += menu["price"] * item["quantity"]
-            if pack["packaging_id"]:
-                packaging = await db["packaging"].find_one(
-                    {"_id": ObjectId(pack["packaging_id"])}
-                )
-                if packaging:
-                    pack_total += packaging["price"]
-            total_price += pack_total
-        return total_price
+        order = await db[NEXTCHOW_COLLECTIONS.ORDERS].find_one(
+            {
+                "_id": {"$in": id_query_values([order_id])},
+                "user_id": str(user["_id"]),
+            },
+            {"payment": 1},
+        )
+        if not order or "payment" not in order:
+            raise HTTPException(status_code=404, detail="Order not found")
+        return {"success": True, "data": order["payment"]}
+
     except PyMongoError as e:
         raise HTTPException(
             status_code=500,
-            detail={
-                "success": False,
-                "message": f"Database error in total calculation: {str(e)}",
-            },
+            detail=f"Database error: {str(e)}",
         )
-    except Exception as e:
+
+
+async def build_order(db, loaders: Loaders, user: dict, cart: Optional[Dict]) -> Dict:
+    """
+    Price `cart` in full at today's prices and build the order document for
+    it, with every line snapshotted so the order never needs re-joining.
+    """
+    if not cart or not cart["packs"]:
+        raise HTTPException(status_code=400, detail="Cart is empty")
+
+    try:
+        lines = await snapshot_order_lines(loaders, cart["packs"])
+    except KeyError as e:
         raise HTTPException(
-            status_code=500,
-            detail={
-                "success": False,
-                "message": f"Unexpected error in total calculation: {str(e)}",
+            status_code=400,
+            detail=f"Item {e.args[0]} is no longer available",
+        )
+
+    # The vendor is taken from the first item
+    vendor_id = lines[0]["items"][0]["menu"].get("user_id")
+    vendor = await fetch_vendor_location(db, vendor_id)
+    if not vendor:
+        raise HTTPException(
+            status_code=400, detail="Vendor not found or location missing"
+        )
+
+    vendor_location = vendor.get("location")
+    vendor_address = vendor.get("address", "Unknown")
+
+    user_location = user.get("location")
+    if not user_location:
+        raise HTTPException(status_code=400, detail="User location is missing")
+
+    # Calculate the estimated distance (memoized with the cart quote)
+    estimated_distance = vendor_distance_km(
+        vendor_id,
+        location_coordinates(vendor_location),
+        location_coordinates(user_location),
+    )
+
+    return {
+        # user_id is kept for existing readers; new queries use customer_id
+        "user_id": str(user["_id"]),
+        "customer_id": str(user["_id"]),
+        "vendor_id": vendor_id,
+        "pickup_address": vendor_address,
+        "pickup_location": vendor_location,
+        "delivery_address": user.get("address", ""),
+        "delivery_location": user_location,
+        "estimated_distance": round(estimated_distance, 2),
+        "delivery_fee": delivery_fee(estimated_distance),
+        "additional_info": user.get("additional_info", ""),
+        "packs": lines,
+        "total_price": sum(line["subtotal"] for line in lines),
+        "status": "Pending",
+        "created_at": datetime.now(),
+    }
+
+
+async def fetch_prices(
+    loaders: Loaders, packs
+) -> Tuple[Dict[str, Dict], Dict[str, Dict]]:
+    """
+    Price and price_version of every menu item and packaging in `packs`,
+    keyed by string id, with one `$in` query per collection.
+    """
+    menu_ids = {item["menu_id"] for pack in packs for item in pack["items"]}
+    packaging_ids = {pack["packaging_id"] for pack in packs if pack.get("packaging_id")}
+    menus, packaging = await asyncio.gather(
+        loaders.menu.load_many(menu_ids), loaders.packaging.load_many(packaging_ids)
+    )
+    return menus, packaging
+
+
+def price_packs(packs, menus: Dict[str, Dict], packaging: Dict[str, Dict]) -> Dict:
+    """Split the price of `packs` into menu subtotal and packaging."""
+    subtotal = 0.0
+    packaging_total = 0.0
+    for pack in packs:
+        for item in pack["items"]:
+            menu = menus.get(str(item["menu_id"]))
+            if menu is not None:
+                subtotal += menu.get("price", 0.0) * item["quantity"]
+        if pack.get("packaging_id"):
+            packaging_total += packaging.get(str(pack["packaging_id"]), {}).get(
+                "price", 0.0
+            )
+    return {"subtotal": subtotal, "packaging": packaging_total}
+
+
+def price_versions(pack, menus: Dict[str, Dict], packaging: Dict[str, Dict]) -> Dict:
+    """The price_version of everything `pack` was priced from."""
+    versions = {
+        "menu": {
+            str(item["menu_id"]): menus.get(str(item["menu_id"]), {}).get(
+                "price_version", 0
+            )
+            for item in pack["items"]
+        },
+        "packaging": {},
+    }
+    if pack.get("packaging_id"):
+        packaging_id = str(pack["packaging_id"])
+        versions["packaging"][packaging_id] = packaging.get(packaging_id, {}).get(
+            "price_version", 0
+        )
+    return versions
+
+
+def price_pack(pack: Dict, menus: Dict[str, Dict], packaging: Dict[str, Dict]) -> Dict:
+    """Stamp `pack` with its subtotal and the price versions it was priced at."""
+    prices = price_packs([pack], menus, packaging)
+    pack["subtotal"] = prices["subtotal"] + prices["packaging"]
+    pack["price_versions"] = price_versions(pack, menus, packaging)
+    return pack
+
+
+async def reprice_stale_packs(db, loaders: Loaders, cart: Dict) -> Dict:
+    """
+    Reprice only the packs whose menu items or packaging changed price since
+    they were added, moving `total_price` by the difference. Each pack is
+    updated only if its subtotal is unchanged since read, so concurrent
+    reprices cannot apply the same difference twice.
+    """
+    packs = cart.get("packs", [])
+    if not packs:
+        return cart
+    menus, packaging = await fetch_prices(loaders, packs)
+
+    stale = [
+        pack
+        for pack in packs
+        if pack.get("price_versions") != price_versions(pack, menus, packaging)
+    ]
+    if not stale:
+        return cart
+
+    cart_collection = db[NEXTCHOW_COLLECTIONS.CUSTOMER_CART]
+    for pack in stale:
+        previous = pack.get("subtotal", 0.0)
+        price_pack(pack, menus, packaging)
+        await cart_collection.update_one(
+            {
+                "_id": cart["_id"],
+                "packs": {
+                    "$elemMatch": {"pack_id": pack["pack_id"], "subtotal": previous}
+                },
             },
+            {
+                "$set": {
+                    "packs.$.subtotal": pack["subtotal"],
+                    "packs.$.price_versions": pack["price_versions"],
+                    "updated_at": datetime.now(),
+                },
+                "$inc": {"total_price": pack["subtotal"] - previous},
+            },
+        )
+    return await cart_collection.find_one({"_id": cart["_id"]}) or cart
+
+
+async def upgrade_legacy_cart(db, loaders: Loaders, cart: Dict) -> Dict:
+    """
+    Give packs saved before pack ids existed an id and a priced subtotal so
+    they can be removed individually. Only applied if the cart is unchanged
+    since read.
+    """
+    packs = cart.get("packs", [])
+    menus, packaging = await fetch_prices(loaders, packs)
+    for pack in packs:
+        pack.setdefault("pack_id", uuid.uuid4().hex)
+        price_pack(pack, menus, packaging)
+    total_price = sum(pack["subtotal"] for pack in packs)
+
+    upgraded = await db[NEXTCHOW_COLLECTIONS.CUSTOMER_CART].find_one_and_update(
+        {"_id": cart["_id"], "updated_at": cart.get("updated_at")},
+        {"$set": {"packs": packs, "total_price": total_price}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if upgraded is None:
+        # Changed concurrently; return whatever is stored now
+        upgraded = await db[NEXTCHOW_COLLECTIONS.CUSTOMER_CART].find_one(
+            {"_id": cart["_id"]}
         )
+    return upgraded or cart
 
 
 # TODO: Confirm order payment
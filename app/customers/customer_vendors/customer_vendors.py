@@ -1,28 +1,112 @@
-# TODO: Get Vendors Close to the customers' location
 # TODO: Get the menu of that vendor by the vendor's ID
 
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.encoders import jsonable_encoder
 from pymongo.errors import PyMongoError
 
 from app.general.utils.database import NEXTCHOW_COLLECTIONS, get_database
 from app.general.utils.helpers import *
 from app.general.utils.oauth_service import get_current_user
+from app.general.utils.pagination import PageParams, paginate
+from app.general.utils.vendor_directory import (
+    DISCOVERABLE_VENDORS,
+    VENDOR_CARD_PROJECTION,
+)
+from app.general.utils.vendor_index import nearby_vendors, nearest_vendors
 from app.vendors.models import *
 from app.vendors.schemas import *
 
-customer_vendor_router = APIRouter(prefix="/customer-vendor", tags=["Customer's Vendor"])
-
+customer_vendor_router = APIRouter(
+    prefix="/customer-vendor", tags=["Customer's Vendor"]
+)
 
 
 # Fetch all vendors
 @customer_vendor_router.get("/vendors")
 async def fetch_vendors(
+    page: PageParams = Depends(),
+    user: dict = Depends(get_current_user),
+    db=Depends(get_database),
+):
+    try:
+        vendors, next_cursor = await paginate(
+            db[NEXTCHOW_COLLECTIONS.VENDOR_PROFILE],
+            DISCOVERABLE_VENDORS,
+            page,
+            projection=VENDOR_CARD_PROJECTION,
+        )
+        return {
+            "success": True,
+            "data": jsonable_encoder(vendors),
+            "next_cursor": next_cursor,
+        }
+    except PyMongoError as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Database error: {str(e)}",
+        )
+    except Exception as e:
+        raise e
+
+
+def resolve_location(user, longitude, latitude):
+    # Default to the customer's saved location
+    if longitude is not None and latitude is not None:
+        return longitude, latitude
+    location = (user or {}).get("location") or {}
+    coordinates = location.get("coordinates")
+    if not coordinates:
+        raise HTTPException(
+            status_code=400,
+            detail="Location is required to find nearby vendors",
+        )
+    return coordinates[0], coordinates[1]
+
+
+# Fetch discoverable vendors closest to the customer
+@customer_vendor_router.get("/vendors/nearby")
+async def fetch_nearby_vendors(
+    longitude: Optional[float] = Query(None, ge=-180, le=180),
+    latitude: Optional[float] = Query(None, ge=-90, le=90),
+    radius_km: float = Query(10, gt=0, le=50),
+    page: PageParams = Depends(),
+    user: dict = Depends(get_current_user),
+    db=Depends(get_database),
+):
+    try:
+        longitude, latitude = resolve_location(user, longitude, latitude)
+        vendors, next_cursor = await nearby_vendors(
+            db, longitude, latitude, radius_km, page
+        )
+        return {
+            "success": True,
+            "data": jsonable_encoder(vendors),
+            "next_cursor": next_cursor,
+        }
+    except PyMongoError as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Database error: {str(e)}",
+        )
+    except Exception as e:
+        raise e
+
+
+# Fetch the k vendors closest to the customer
+@customer_vendor_router.get("/vendors/nearest")
+async def fetch_nearest_vendors(
+    longitude: Optional[float] = Query(None, ge=-180, le=180),
+    latitude: Optional[float] = Query(None, ge=-90, le=90),
+    k: int = Query(10, ge=1, le=50),
+    max_radius_km: float = Query(25, gt=0, le=50),
     user: dict = Depends(get_current_user),
     db=Depends(get_database),
 ):
     try:
-        vendors = await db[NEXTCHOW_COLLECTIONS.MENU].find().to_list(length=100) 
+        longitude, latitude = resolve_location(user, longitude, latitude)
+        vendors = await nearest_vendors(db, longitude, latitude, k, max_radius_km)
         return {"success": True, "data": jsonable_encoder(vendors)}
     except PyMongoError as e:
         raise HTTPException(
@@ -32,24 +116,28 @@ async def fetch_vendors(
     except Exception as e:
         raise e
 
+
 # Fetch all menus for a vendor
 @customer_vendor_router.get("/vendor/{vendor_id}/menus")
 async def fetch_menu(
     vendor_id: str,
+    page: PageParams = Depends(),
     user: dict = Depends(get_current_user),
     db=Depends(get_database),
 ):
     try:
-        menus = (
-            await db[NEXTCHOW_COLLECTIONS.MENU]
-            .find({"user_id": vendor_id})
-            .to_list(length=100)
+        menus, next_cursor = await paginate(
+            db[NEXTCHOW_COLLECTIONS.MENU], {"user_id": vendor_id}, page
         )
-        return {"success": True, "data": jsonable_encoder(menus)}
+        return {
+            "success": True,
+            "data": jsonable_encoder(menus),
+            "next_cursor": next_cursor,
+        }
     except PyMongoError as e:
         raise HTTPException(
             status_code=500,
             detail=f"Database error: {str(e)}",
         )
     except Exception as e:
-        raise e
\ No newline at end of file
+        raise e
@@ -1,3 +1,4 @@
+import uuid
 from datetime import datetime
 
 from bson import ObjectId
@@ -9,42 +10,42 @@ from app.customers.schemas import (  # Assuming you have an OrderSchema
     OrderSchema,
 )
 from app.general.utils.database import NEXTCHOW_COLLECTIONS, get_database
+from app.general.utils.helpers import prepare_json
+from app.general.utils.loaders import Loaders, get_loaders
 from app.general.utils.oauth_service import get_current_user
+from app.general.utils.order_hydration import hydrate_orders, snapshot_order_lines
+from app.general.utils.pagination import NEWEST_FIRST, PageParams, paginate
 
 customer_order_router = APIRouter(prefix="/customer", tags=["Customer Orders"])
 
 
 @customer_order_router.get("/orders")
 async def fetch_customer_orders(
-    user: dict = Depends(get_current_user), db=Depends(get_database)
+    page: PageParams = Depends(),
+    user: dict = Depends(get_current_user),
+    db=Depends(get_database),
+    loaders: Loaders = Depends(get_loaders),
 ):
     """
-    Fetch all orders for the current customer.
+    Fetch the current customer's orders, newest first, one page at a time.
     """
     try:
         # Find orders for the current customer
-        orders = (
-            await db[NEXTCHOW_COLLECTIONS.ORDERS]
-            .find({"customer_id": str(user.get("_id"))})
-            .to_list(length=100)
+        orders, next_cursor = await paginate(
+            db[NEXTCHOW_COLLECTIONS.ORDERS],
+            {"customer_id": str(user.get("_id"))},
+            page,
+            sort=NEWEST_FIRST,
         )
 
-        # Populate menu and packaging details for each pack
-        for order in orders:
-            for pack in order.get("packs", []):
-                # Fetch packaging details
-                if pack.get("packaging_id"):
-                    pack["packaging"] = await db[
-                        NEXTCHOW_COLLECTIONS.MENU_PACKAGING
-                    ].find_one({"_id": ObjectId(pack["packaging_id"])})
-
-                # Fetch menu item details
-                for item in pack.get("items", []):
-                    item["menu"] = await db[NEXTCHOW_COLLECTIONS.MENU].find_one(
-                        {"_id": ObjectId(item["menu_id"])}
-                    )
-
-        return orders
+        # Populate menu and packaging details for the whole page at once
+        await hydrate_orders(loaders, orders)
+
+        return {
+            "success": True,
+            "data": prepare_json(orders),
+            "next_cursor": next_cursor,
+        }
     except PyMongoError as e:
         raise HTTPException(
             status_code=500,
@@ -56,7 +57,10 @@ async def fetch_customer_orders(
 
 @customer_order_router.get("/orders/{order_id}")
 async def get_customer_order_details(
-    order_id: str, user: dict = Depends(get_current_user), db=Depends(get_database)
+    order_id: str,
+    user: dict = Depends(get_current_user),
+    db=Depends(get_database),
+    loaders: Loaders = Depends(get_loaders),
 ):
     """
     Fetch details of a specific order for the current customer.
@@ -71,20 +75,9 @@ async def get_customer_order_details(
             raise HTTPException(status_code=404, detail="Order not found")
 
         # Populate menu and packaging details
-        for pack in order.get("packs", []):
-            # Fetch packaging details
-            if pack.get("packaging_id"):
-                pack["packaging"] = await db[
-                    NEXTCHOW_COLLECTIONS.MENU_PACKAGING
-                ].find_one({"_id": ObjectId(pack["packaging_id"])})
-
-            # Fetch menu item details
-            for item in pack.get("items", []):
-                item["menu"] = await db[NEXTCHOW_COLLECTIONS.MENU].find_one(
-                    {"_id": ObjectId(item["menu_id"])}
-                )
-
-        return order
+        await hydrate_orders(loaders, [order])
+
+        return prepare_json(order)
     except PyMongoError as e:
         raise HTTPException(
             status_code=500,
@@ -96,34 +89,31 @@ async def get_customer_order_details(
 
 @customer_order_router.get("/orders/by-status/{status}")
 async def fetch_customer_orders_by_status(
-    status: str, user: dict = Depends(get_current_user), db=Depends(get_database)
+    status: str,
+    page: PageParams = Depends(),
+    user: dict = Depends(get_current_user),
+    db=Depends(get_database),
+    loaders: Loaders = Depends(get_loaders),
 ):
     """
-    Fetch customer orders by specific status.
+    Fetch customer orders by specific status, newest first.
     """
     try:
-        orders = (
-            await db[NEXTCHOW_COLLECTIONS.ORDERS]
-            .find({"customer_id": str(user.get("_id")), "status": status})
-            .to_list(length=100)
+        orders, next_cursor = await paginate(
+            db[NEXTCHOW_COLLECTIONS.ORDERS],
+            {"customer_id": str(user.get("_id")), "status": status},
+            page,
+            sort=NEWEST_FIRST,
         )
 
-        # Populate menu and packaging details
-        for order in orders:
-            for pack in order.get("packs", []):
-                # Fetch packaging details
-                if pack.get("packaging_id"):
-                    pack["packaging"] = await db[
-                        NEXTCHOW_COLLECTIONS.MENU_PACKAGING
-                    ].find_one({"_id": ObjectId(pack["packaging_id"])})
-
-                # Fetch menu item details
-                for item in pack.get("items", []):
-                    item["menu"] = await db[NEXTCHOW_COLLECTIONS.MENU].find_one(
-                        {"_id": ObjectId(item["menu_id"])}
-                    )
-
-        return orders
+        # Populate menu and packaging details for the whole page at once
+        await hydrate_orders(loaders, orders)
+
+        return {
+            "success": True,
+            "data": prepare_json(orders),
+            "next_cursor": next_cursor,
+        }
     except PyMongoError as e:
         raise HTTPException(
             status_code=500,
@@ -135,7 +125,10 @@ async def fetch_customer_orders_by_status(
 
 @customer_order_router.post("/reorder/{order_id}")
 async def reorder_previous_order(
-    order_id: str, user: dict = Depends(get_current_user), db=Depends(get_database)
+    order_id: str,
+    user: dict = Depends(get_current_user),
+    db=Depends(get_database),
+    loaders: Loaders = Depends(get_loaders),
 ):
     """
     Create a new order based on a previous order.
@@ -152,11 +145,33 @@ async def reorder_previous_order(
                 detail="Original order not found",
             )
 
+        # Snapshot the same items again at today's prices
+        packs = [
+            {
+                "pack_id": uuid.uuid4().hex,
+                "packaging_id": pack.get("packaging_id"),
+                "items": [
+                    {"menu_id": item["menu_id"], "quantity": item["quantity"]}
+                    for item in pack.get("items", [])
+                ],
+            }
+            for pack in original_order.get("packs", [])
+        ]
+        try:
+            lines = await snapshot_order_lines(loaders, packs)
+        except KeyError as e:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Item {e.args[0]} is no longer available",
+            )
+
         # Prepare new order data
         new_order = {
+            "user_id": str(user.get("_id")),
             "customer_id": str(user.get("_id")),
-            "packs": original_order.get("packs", []),
-            "total_price": original_order.get("total_price", 0),
+            "vendor_id": original_order.get("vendor_id"),
+            "packs": lines,
+            "total_price": sum(line["subtotal"] for line in lines),
             "status": "Pending",
             "created_at": datetime.now(),
         }
@@ -253,3 +253,19 @@ class OrderStatus(str, Enum):
     READY = "Ready"
     DELIVERED = "Delivered"
     CANCELLED = "Cancelled"
+
+
+class DeviceTokenSchema(BaseModel):
+    token: str
+    platform: Optional[str] = None
+
+    class Config:
+        allowed_population_by_field_name = True
+        arbitrary_types_allowed = True
+        json_encoders = {ObjectId: str}
+        schema_extra = {
+            "example": {
+                "token": "fcm-registration-token",
+                "platform": "android",
+            }
+        }
@@ -0,0 +1,91 @@
+import asyncio
+import copy
+import os
+from typing import Any, Dict, NamedTuple, Tuple
+
+from dotenv import load_dotenv
+
+from app.general.utils.cache import TTLCache
+from app.general.utils.paystack import PaystackError, paystack_client
+
+load_dotenv()
+
+
+class AccountResolverSettings:
+    TTL_SECONDS = float(os.getenv("ACCOUNT_RESOLVE_TTL_SECONDS", "86400"))
+    # Short, so an account that starts resolving is picked up again soon
+    NEGATIVE_TTL_SECONDS = float(
+        os.getenv("ACCOUNT_RESOLVE_NEGATIVE_TTL_SECONDS", "600")
+    )
+    MAX_SIZE = int(os.getenv("ACCOUNT_RESOLVE_CACHE_MAX_SIZE", "10000"))
+
+
+# Paystack's answers for an account that cannot be resolved. Other 4xx (401
+# bad key, 429 rate limited) say nothing about the account and are not cached.
+UNRESOLVABLE_STATUS_CODES = {400, 422}
+
+
+class _Rejection(NamedTuple):
+    """A cached "could not resolve" answer, re-raised as a fresh error."""
+
+    message: str
+    status_code: int
+    payload: Any
+
+    def error(self) -> PaystackError:
+        return PaystackError(
+            self.message,
+            status_code=self.status_code,
+            payload=copy.deepcopy(self.payload),
+        )
+
+
+class AccountResolver:
+    """
+    Cached, coalescing front for Paystack's /bank/resolve. Successful lookups
+    are cached per (account_number, bank_code); accounts Paystack cannot
+    resolve (400/422) are cached for a shorter time and re-raised. Outages,
+    throttling and auth errors are never cached. Identical lookups in flight
+    at the same time share one call. Every caller gets its own copy of the
+    result, so changing it cannot change the cache.
+    """
+
+    def __init__(self):
+        self._cache = TTLCache(
+            AccountResolverSettings.MAX_SIZE, AccountResolverSettings.TTL_SECONDS
+        )
+        self._in_flight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+    async def _lookup(self, key: Tuple[str, str]) -> Dict:
+        try:
+            details = await paystack_client.resolve_account(*key)
+        except PaystackError as e:
+            if e.status_code in UNRESOLVABLE_STATUS_CODES:
+                self._cache.set(
+                    key,
+                    _Rejection(e.message, e.status_code, e.payload),
+                    ttl=AccountResolverSettings.NEGATIVE_TTL_SECONDS,
+                )
+            raise
+        self._cache.set(key, details)
+        return details
+
+    async def resolve(self, account_number: str, bank_code: str) -> Dict:
+        key = (account_number.strip(), bank_code.strip())
+        cached = self._cache.get(key)
+        if isinstance(cached, _Rejection):
+            # A new error each time, so requests do not share a traceback
+            raise cached.error()
+        if cached is not None:
+            return copy.deepcopy(cached)
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._lookup(key))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # shield() so one cancelled request does not cancel the shared lookup
+        return copy.deepcopy(await asyncio.shield(task))
+
+
+account_resolver = AccountResolver()
@@ -0,0 +1,158 @@
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from app.general.utils.paystack import paystack_client
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class BankListSettings:
+    # Served as-is while younger than TTL; refreshed in the background after
+    TTL_SECONDS = float(os.getenv("BANK_LIST_TTL_SECONDS", "86400"))
+    # Past this age a stale list is no longer served and callers wait for Paystack
+    MAX_STALE_SECONDS = float(os.getenv("BANK_LIST_MAX_STALE_SECONDS", "2592000"))
+    REFRESH_INTERVAL_SECONDS = float(
+        os.getenv("BANK_LIST_REFRESH_INTERVAL_SECONDS", "21600")
+    )
+    SNAPSHOT_PATH = os.getenv(
+        "BANK_LIST_SNAPSHOT_PATH",
+        os.path.join(tempfile.gettempdir(), "nextchow_banks.json"),
+    )
+
+
+class BankListCache:
+    """
+    Process-level cache of Paystack's bank list with stale-while-revalidate:
+    a fresh list is returned directly, a stale one is returned while a single
+    background refresh runs, and only a cold or expired cache makes the caller
+    wait. Concurrent refreshes share one upstream request. Each successful
+    fetch is written to a snapshot file that seeds the cache on startup.
+    """
+
+    def __init__(self, country: str = "nigeria"):
+        self.country = country
+        self._banks: Optional[List[Dict]] = None
+        # Wall-clock time so snapshot ages survive restarts
+        self._fetched_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._loop_task: Optional[asyncio.Task] = None
+
+    def _age(self) -> float:
+        return time.time() - self._fetched_at
+
+    def load_snapshot(self) -> None:
+        try:
+            with open(BankListSettings.SNAPSHOT_PATH) as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable bank list snapshot: %s", e)
+            return
+        if snapshot.get("country") == self.country and snapshot.get("banks"):
+            self._banks = snapshot["banks"]
+            self._fetched_at = snapshot.get("fetched_at", 0.0)
+
+    def _write_snapshot(self) -> None:
+        path = BankListSettings.SNAPSHOT_PATH
+        tmp_path = None
+        try:
+            # A file of our own next to the snapshot, so workers writing at
+            # once never share one and the rename stays on one filesystem
+            with tempfile.NamedTemporaryFile(
+                "w",
+                dir=os.path.dirname(os.path.abspath(path)),
+                prefix=f"{os.path.basename(path)}.",
+                suffix=".tmp",
+                delete=False,
+            ) as f:
+                tmp_path = f.name
+                json.dump(
+                    {
+                        "country": self.country,
+                        "fetched_at": self._fetched_at,
+                        "banks": self._banks,
+                    },
+                    f,
+                )
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Could not write bank list snapshot: %s", e)
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+
+    async def _fetch(self) -> List[Dict]:
+        banks = await paystack_client.list_banks(self.country)
+        self._banks = banks
+        self._fetched_at = time.time()
+        self._write_snapshot()
+        return banks
+
+    def _refresh(self) -> asyncio.Task:
+        # Single flight: every caller shares the one in-flight fetch
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._fetch())
+            self._refresh_task.add_done_callback(self._log_refresh_failure)
+        return self._refresh_task
+
+    @staticmethod
+    def _log_refresh_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Bank list refresh failed: %r", task.exception())
+
+    async def get(self) -> List[Dict]:
+        age = self._age()
+        if self._banks is not None and age < BankListSettings.TTL_SECONDS:
+            return self._banks
+        if self._banks is not None and age < BankListSettings.MAX_STALE_SECONDS:
+            self._refresh()
+            return self._banks
+        # shield() so one cancelled request does not cancel the shared fetch
+        return await asyncio.shield(self._refresh())
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            if self._age() >= BankListSettings.TTL_SECONDS:
+                try:
+                    await self._refresh()
+                except Exception:
+                    pass  # already logged; the stale list keeps being served
+            await asyncio.sleep(BankListSettings.REFRESH_INTERVAL_SECONDS)
+
+    def start(self) -> None:
+        self.load_snapshot()
+        if self._loop_task is None:
+            self._loop_task = asyncio.create_task(self._refresh_periodically())
+
+    async def stop(self) -> None:
+        for task in (self._loop_task, self._refresh_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        self._loop_task = None
+        self._refresh_task = None
+
+    def stats(self) -> Dict:
+        return {
+            "banks": len(self._banks or []),
+            "age_seconds": round(self._age()) if self._banks is not None else None,
+            "refreshing": bool(self._refresh_task and not self._refresh_task.done()),
+        }
+
+
+bank_list_cache = BankListCache()
@@ -1,10 +1,10 @@
 import os
 from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
 
 import motor.motor_asyncio as motor_client
 from dotenv import load_dotenv
 from fastapi import Depends
-from pymongo import GEOSPHERE
 
 load_dotenv()
 
@@ -17,7 +17,8 @@ class NEXTCHOW_COLLECTIONS:
     MENU: str = "menu"
     VENDOR_PROFILE: str = "vendor_profile"
     ORDERS: str = "orders"
-    VENDOR_OTP: str = "vendor_otp"
+    OTP_CODES: str = "otp_codes"
+    OTP_SENDS: str = "otp_sends"
     MENU_PACKAGING: str = "menu_packaging"
     ORDER_PAYMENTS: str = "order_payments"
     MENU_CATEGORY: str = "menu_category"
@@ -26,20 +27,80 @@ class NEXTCHOW_COLLECTIONS:
     RIDER_USER: str = "rider_users"
     RIDER_BANK_ACCOUNT: str = "rider_bank_account"
     RIDER_SETTLEMENTS: str = "rider_settlements"
+    JOBS: str = "jobs"
+    DEVICE_TOKENS: str = "device_tokens"
+    IDEMPOTENCY_KEYS: str = "idempotency_keys"
 
 
-client = motor_client.AsyncIOMotorClient(os.getenv("MONGODB_URL"))
-db = client["nextchow"]
+class MongoSettings:
+    URL = os.getenv("MONGODB_URL")
+    DB_NAME = os.getenv("MONGODB_DB_NAME", "nextchow")
+    MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "100"))
+    MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", "0"))
+    MAX_IDLE_TIME_MS = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "300000"))
+    WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "5000"))
+
+
+# One pooled client per worker process, opened and closed by the app lifespan
+_client: Optional[motor_client.AsyncIOMotorClient] = None
+
+
+async def connect_to_mongo():
+    """Create the shared Motor client for this worker."""
+    global _client
+    if _client is not None:
+        return _client
+
+    _client = motor_client.AsyncIOMotorClient(
+        MongoSettings.URL,
+        maxPoolSize=MongoSettings.MAX_POOL_SIZE,
+        minPoolSize=MongoSettings.MIN_POOL_SIZE,
+        maxIdleTimeMS=MongoSettings.MAX_IDLE_TIME_MS,
+        waitQueueTimeoutMS=MongoSettings.WAIT_QUEUE_TIMEOUT_MS,
+    )
+    return _client
+
+
+async def close_mongo_connection():
+    """Close the shared Motor client and release its pooled connections."""
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
 
 
 def get_motor_client():
-    return motor_client.AsyncIOMotorClient(os.getenv("MONGODB_URL"))
+    if _client is None:
+        raise RuntimeError(
+            "MongoDB client is not initialised; connect_to_mongo() must run "
+            "in the application lifespan first"
+        )
+    return _client
 
 
 def get_database(client=Depends(get_motor_client)):
-    return client["nextchow"]
+    return client[MongoSettings.DB_NAME]
+
+
+async def ensure_transactions_supported(client) -> None:
+    """
+    Transactions (used by checkout) need a replica set or sharded cluster.
+    Fail at startup on a standalone server rather than on every checkout.
+    """
+    hello = await client.admin.command("hello")
+    if "setName" not in hello and hello.get("msg") != "isdbgrid":
+        raise RuntimeError(
+            "MongoDB is running standalone, but checkout needs transactions; "
+            "run it as a replica set (a single-node one is enough locally)"
+        )
 
 
-# Create geospatial indexes for the ride locations
-db[NEXTCHOW_COLLECTIONS.VENDOR_PROFILE].create_index([("location", GEOSPHERE)])
-# db[NEXTCHOW_COLLECTIONS.RIDES].create_index([("end_location", GEOSPHERE)])
+async def run_in_transaction(db, callback: Callable[[Any], Awaitable[Any]]) -> Any:
+    """
+    Run `callback(session)` in a transaction and return its result. Its
+    writes commit together or not at all; on a transient error (a write
+    conflict, a failover) the whole callback is retried, so it must only
+    write through the session it is given.
+    """
+    async with await db.client.start_session() as session:
+        return await session.with_transaction(callback)
@@ -0,0 +1,98 @@
+import math
+import os
+import re
+from typing import Dict, Iterable, Optional, Sequence
+
+from dotenv import load_dotenv
+
+from app.general.utils.cache import TTLCache
+from app.general.utils.database import NEXTCHOW_COLLECTIONS
+from app.general.utils.distance import distance_km
+
+load_dotenv()
+
+
+class DeliverySettings:
+    BASE_FEE = float(os.getenv("DELIVERY_BASE_FEE", "500"))
+    FEE_PER_KM = float(os.getenv("DELIVERY_FEE_PER_KM", "150"))
+    MIN_FEE = float(os.getenv("DELIVERY_MIN_FEE", "500"))
+    # Fees are rounded up to this many naira
+    FEE_ROUNDING = float(os.getenv("DELIVERY_FEE_ROUNDING", "50"))
+    AVERAGE_SPEED_KMH = float(os.getenv("DELIVERY_AVERAGE_SPEED_KMH", "20"))
+    PICKUP_BUFFER_MINUTES = int(os.getenv("DELIVERY_PICKUP_BUFFER_MINUTES", "5"))
+    DEFAULT_PREPARATION_MINUTES = int(
+        os.getenv("DELIVERY_DEFAULT_PREPARATION_MINUTES", "20")
+    )
+    # 3 decimal places is ~110 m, close enough for pricing
+    LOCATION_PRECISION = int(os.getenv("DELIVERY_LOCATION_PRECISION", "3"))
+    DISTANCE_CACHE_TTL_SECONDS = float(
+        os.getenv("DELIVERY_DISTANCE_CACHE_TTL_SECONDS", "900")
+    )
+    VENDOR_LOCATION_CACHE_TTL_SECONDS = float(
+        os.getenv("DELIVERY_VENDOR_LOCATION_CACHE_TTL_SECONDS", "600")
+    )
+
+
+_distance_cache = TTLCache(
+    maxsize=50000, ttl=DeliverySettings.DISTANCE_CACHE_TTL_SECONDS
+)
+_vendor_location_cache = TTLCache(
+    maxsize=10000, ttl=DeliverySettings.VENDOR_LOCATION_CACHE_TTL_SECONDS
+)
+
+
+async def fetch_vendor_location(db, vendor_id) -> Optional[Dict]:
+    """The vendor's GeoJSON location and address, cached per worker."""
+    cached = _vendor_location_cache.get(vendor_id)
+    if cached is not None:
+        return cached
+    vendor = await db[NEXTCHOW_COLLECTIONS.VENDOR_USER].find_one(
+        {"_id": vendor_id}, {"location": 1, "address": 1}
+    )
+    if not vendor or "location" not in vendor:
+        return None
+    _vendor_location_cache.set(vendor_id, vendor)
+    return vendor
+
+
+def vendor_distance_km(
+    vendor_id, vendor_coordinates: Sequence[float], customer_coordinates
+) -> float:
+    """
+    Vendor-to-customer distance, memoized per vendor and rounded customer
+    location so repeated cart refreshes skip the computation.
+    """
+    precision = DeliverySettings.LOCATION_PRECISION
+    key = (
+        str(vendor_id),
+        round(customer_coordinates[0], precision),
+        round(customer_coordinates[1], precision),
+    )
+    cached = _distance_cache.get(key)
+    if cached is not None:
+        return cached
+    distance = round(distance_km(vendor_coordinates, customer_coordinates), 2)
+    _distance_cache.set(key, distance)
+    return distance
+
+
+def delivery_fee(distance: float) -> float:
+    fee = DeliverySettings.BASE_FEE + DeliverySettings.FEE_PER_KM * distance
+    step = DeliverySettings.FEE_ROUNDING
+    fee = math.ceil(fee / step) * step if step > 0 else fee
+    return max(DeliverySettings.MIN_FEE, fee)
+
+
+def preparation_minutes(durations: Iterable[Optional[str]]) -> int:
+    """Longest preparation time among strings like "25 minutes"."""
+    minutes = [
+        int(match.group())
+        for duration in durations
+        if duration and (match := re.search(r"\d+", str(duration)))
+    ]
+    return max(minutes) if minutes else DeliverySettings.DEFAULT_PREPARATION_MINUTES
+
+
+def eta_minutes(distance: float, preparation: int) -> int:
+    travel = distance / DeliverySettings.AVERAGE_SPEED_KMH * 60
+    return int(math.ceil(preparation + DeliverySettings.PICKUP_BUFFER_MINUTES + travel))
@@ -0,0 +1,130 @@
+"""
+Great-circle distances between GeoJSON-ordered [longitude, latitude] points,
+as stored in every `location` field. Haversine is vectorised with NumPy;
+`method="geodesic"` falls back to geopy's ellipsoidal solve per pair when
+the extra ~0.5% precision matters more than speed.
+"""
+
+import math
+import os
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+from dotenv import load_dotenv
+from geopy.distance import geodesic
+
+load_dotenv()
+
+# IUGG mean Earth radius
+EARTH_RADIUS_KM = 6371.0088
+# The sphere MongoDB uses for 2dsphere distances
+MONGO_SPHERE_RADIUS_KM = 6378.1
+
+HAVERSINE = "haversine"
+GEODESIC = "geodesic"
+
+
+class DistanceSettings:
+    METHOD = os.getenv("DISTANCE_METHOD", HAVERSINE)
+
+
+def location_coordinates(location: Dict) -> Sequence[float]:
+    """[longitude, latitude] of a GeoJSON Point."""
+    return location["coordinates"]
+
+
+def haversine_km(
+    origin: Sequence[float],
+    destination: Sequence[float],
+    radius_km: float = EARTH_RADIUS_KM,
+) -> float:
+    """Scalar haversine; cheaper than NumPy for a single pair."""
+    lon1, lat1 = math.radians(origin[0]), math.radians(origin[1])
+    lon2, lat2 = math.radians(destination[0]), math.radians(destination[1])
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * radius_km * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _as_radians(points) -> np.ndarray:
+    array = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    return np.radians(array)
+
+
+def _haversine(lon1, lat1, lon2, lat2, radius_km: float) -> np.ndarray:
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * radius_km * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _geodesic_pairs(origins, destinations) -> np.ndarray:
+    return np.fromiter(
+        (
+            geodesic((o[1], o[0]), (d[1], d[0])).kilometers
+            for o, d in zip(origins, destinations)
+        ),
+        dtype=np.float64,
+        count=len(origins),
+    )
+
+
+def pairwise_km(
+    origins,
+    destinations,
+    method: Optional[str] = None,
+    radius_km: float = EARTH_RADIUS_KM,
+) -> np.ndarray:
+    """Distance between origins[i] and destinations[i] for every i."""
+    method = method or DistanceSettings.METHOD
+    if method == GEODESIC:
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 2)
+        destinations = np.asarray(destinations, dtype=np.float64).reshape(-1, 2)
+        return _geodesic_pairs(origins, destinations)
+    a, b = _as_radians(origins), _as_radians(destinations)
+    return _haversine(a[:, 0], a[:, 1], b[:, 0], b[:, 1], radius_km)
+
+
+def one_to_many_km(
+    origin: Sequence[float],
+    points,
+    method: Optional[str] = None,
+    radius_km: float = EARTH_RADIUS_KM,
+) -> np.ndarray:
+    """Distance from `origin` to each of `points`."""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    origins = np.broadcast_to(np.asarray(origin, dtype=np.float64), points.shape)
+    return pairwise_km(origins, points, method, radius_km)
+
+
+def many_to_many_km(
+    origins,
+    destinations,
+    method: Optional[str] = None,
+    radius_km: float = EARTH_RADIUS_KM,
+) -> np.ndarray:
+    """(len(origins), len(destinations)) matrix of distances."""
+    method = method or DistanceSettings.METHOD
+    if method == GEODESIC:
+        o = np.asarray(origins, dtype=np.float64).reshape(-1, 2)
+        d = np.asarray(destinations, dtype=np.float64).reshape(-1, 2)
+        o_rep = np.repeat(o, len(d), axis=0)
+        d_rep = np.tile(d, (len(o), 1))
+        return _geodesic_pairs(o_rep, d_rep).reshape(len(o), len(d))
+    a, b = _as_radians(origins), _as_radians(destinations)
+    return _haversine(
+        a[:, 0, None], a[:, 1, None], b[None, :, 0], b[None, :, 1], radius_km
+    )
+
+
+def distance_km(
+    origin: Sequence[float], destination: Sequence[float], method: Optional[str] = None
+) -> float:
+    """Distance between two [longitude, latitude] points."""
+    method = method or DistanceSettings.METHOD
+    if method == GEODESIC:
+        return float(_geodesic_pairs([origin], [destination])[0])
+    return haversine_km(origin, destination)
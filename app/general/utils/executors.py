@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from fastapi import HTTPException, status
+
+logger = logging.getLogger(__name__)
+
+
+class BoundedExecutor:
+    """
+    Thread pool for CPU-heavy blocking calls (e.g. bcrypt) that keeps them off
+    the event loop. At most `max_pending` calls may be queued or running; past
+    that callers get a 503 straight away instead of piling up behind the pool.
+    """
+
+    def __init__(self, name: str, workers: int, max_pending: int):
+        self.name = name
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix=name
+        )
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self._total_wait = 0.0
+        self._last_wait = 0.0
+        self._max_wait = 0.0
+
+    async def run(self, fn: Callable, *args) -> Any:
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            logger.warning(
+                "%s executor saturated (%d pending), rejecting call",
+                self.name,
+                self.pending,
+            )
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail={
+                    "success": False,
+                    "message": "Server is busy, please try again shortly",
+                },
+            )
+
+        queued_at = time.perf_counter()
+
+        def timed_call():
+            # Time spent waiting for a free worker thread
+            wait = time.perf_counter() - queued_at
+            return wait, fn(*args)
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            wait, result = await loop.run_in_executor(self._executor, timed_call)
+        finally:
+            self.pending -= 1
+
+        self.completed += 1
+        self._total_wait += wait
+        self._last_wait = wait
+        self._max_wait = max(self._max_wait, wait)
+        return result
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "queue_depth": max(0, self.pending - self.workers),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(
+                self._total_wait / self.completed * 1000 if self.completed else 0.0,
+                3,
+            ),
+            "last_wait_ms": round(self._last_wait * 1000, 3),
+            "max_wait_ms": round(self._max_wait * 1000, 3),
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
@@ -29,3 +29,19 @@ def prepare_json(data):
         for i, item in enumerate(data):
             data[i] = prepare_json(item)
     return data
+
+
+def id_query_values(ids):
+    """
+    Build the values for an `_id` `$in` query. Documents saved through
+    jsonable_encoder keep a string `_id` while raw inserts get an ObjectId,
+    so every id is matched in both forms.
+    """
+    values = []
+    for value in ids:
+        if value is None:
+            continue
+        values.append(str(value))
+        if ObjectId.is_valid(value):
+            values.append(ObjectId(value))
+    return list(dict.fromkeys(values))
@@ -0,0 +1,203 @@
+"""
+`Idempotency-Key` support for endpoints that must not repeat their work when
+a client retries. The first request with a key claims it in the
+`idempotency_keys` collection (unique on user, route and key), runs, and
+stores its response; later requests with the same key on the same route get
+the stored response back. Duplicates arriving while the first is still
+running wait for its result: in-process through a shared future, across
+workers by polling the claim.
+
+An operation can checkpoint progress on its claim. If it then fails, the
+claim is kept and the next retry resumes from that progress instead of
+starting over; a claim without progress is released.
+"""
+
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.general.utils.database import NEXTCHOW_COLLECTIONS
+
+load_dotenv()
+
+IN_PROGRESS = "in_progress"
+DONE = "done"
+
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencySettings:
+    # How long a stored response is replayed before the key can be reused
+    TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+    # A claim older than this belongs to a crashed request and can be taken over
+    LOCK_TIMEOUT_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT_SECONDS", "60"))
+    WAIT_TIMEOUT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT_SECONDS", "30"))
+    POLL_INTERVAL_SECONDS = float(
+        os.getenv("IDEMPOTENCY_POLL_INTERVAL_SECONDS", "0.25")
+    )
+
+
+# (user_id, route, key)
+Scope = Tuple[str, str, str]
+
+_in_flight: Dict[Scope, asyncio.Future] = {}
+
+
+class IdempotencyClaim:
+    """
+    The claim an operation runs under. `progress` holds what an earlier,
+    failed attempt checkpointed (empty on a first attempt).
+    """
+
+    def __init__(self, collection=None, record_id=None, progress: Dict = None):
+        self._collection = collection
+        self._record_id = record_id
+        self.progress: Dict[str, Any] = dict(progress or {})
+
+    async def checkpoint(self, **progress) -> None:
+        self.progress.update(progress)
+        if self._collection is not None:
+            await self._collection.update_one(
+                {"_id": self._record_id},
+                {
+                    "$set": {
+                        f"progress.{name}": value for name, value in progress.items()
+                    }
+                },
+            )
+
+
+def _validate_key(key: str) -> str:
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters",
+        )
+    return key
+
+
+def _scope_query(scope: Scope) -> Dict:
+    return {"user_id": scope[0], "route": scope[1], "key": scope[2]}
+
+
+async def _claim(db, scope: Scope) -> Tuple[bool, Optional[Dict]]:
+    """
+    Claim `scope` for this request. Returns whether it was claimed, with the
+    claimed record or else the record of the request that holds it.
+    """
+    collection = db[NEXTCHOW_COLLECTIONS.IDEMPOTENCY_KEYS]
+    now = datetime.now()
+    lock_expires_at = now + timedelta(seconds=IdempotencySettings.LOCK_TIMEOUT_SECONDS)
+    record = {
+        **_scope_query(scope),
+        "status": IN_PROGRESS,
+        "progress": {},
+        "lock_expires_at": lock_expires_at,
+        "created_at": now,
+        "expire_at": now + timedelta(seconds=IdempotencySettings.TTL_SECONDS),
+    }
+    try:
+        await collection.insert_one(record)
+        return True, record
+    except DuplicateKeyError:
+        pass
+
+    # Take over a claim whose holder died or failed part-way through
+    taken = await collection.find_one_and_update(
+        {
+            **_scope_query(scope),
+            "status": IN_PROGRESS,
+            "lock_expires_at": {"$lte": now},
+        },
+        {"$set": {"lock_expires_at": lock_expires_at}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if taken is not None:
+        return True, taken
+    return False, await collection.find_one(_scope_query(scope))
+
+
+async def _wait_for_response(db, scope: Scope) -> Dict:
+    collection = db[NEXTCHOW_COLLECTIONS.IDEMPOTENCY_KEYS]
+    deadline = (
+        asyncio.get_running_loop().time() + IdempotencySettings.WAIT_TIMEOUT_SECONDS
+    )
+    while asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(IdempotencySettings.POLL_INTERVAL_SECONDS)
+        record = await collection.find_one(_scope_query(scope))
+        if record is not None and record["status"] == DONE:
+            return record["response"]
+        if record is None or record["lock_expires_at"] <= datetime.now():
+            # The first request failed; a retry runs or resumes it
+            break
+    raise HTTPException(
+        status_code=409,
+        detail="A request with this Idempotency-Key is still being processed",
+    )
+
+
+async def _run(
+    db, scope: Scope, operation: Callable[[IdempotencyClaim], Awaitable[Dict]]
+) -> Dict:
+    collection = db[NEXTCHOW_COLLECTIONS.IDEMPOTENCY_KEYS]
+    claimed, record = await _claim(db, scope)
+    if not claimed:
+        if record is not None and record["status"] == DONE:
+            return record["response"]
+        return await _wait_for_response(db, scope)
+
+    claim = IdempotencyClaim(collection, record["_id"], record.get("progress"))
+    try:
+        # Encoded before storing so the first response and replays are identical
+        response = jsonable_encoder(await operation(claim))
+    except BaseException:
+        if claim.progress:
+            # Work was done that must not be repeated: hand the claim to the
+            # next retry straight away so it resumes from the checkpoint
+            await collection.update_one(
+                {"_id": record["_id"], "status": IN_PROGRESS},
+                {"$set": {"lock_expires_at": datetime.now()}},
+            )
+        else:
+            # Nothing to replay, so let a retry run the request again
+            await collection.delete_one({"_id": record["_id"], "status": IN_PROGRESS})
+        raise
+
+    await collection.update_one(
+        {"_id": record["_id"]},
+        {"$set": {"status": DONE, "response": response}},
+    )
+    return response
+
+
+async def run_idempotent(
+    db,
+    route: str,
+    user_id: str,
+    key: Optional[str],
+    operation: Callable[[IdempotencyClaim], Awaitable[Dict]],
+) -> Dict:
+    """
+    Run `operation` once per (user_id, route, key) and return its JSON-encoded
+    response, replaying the stored response for repeats. Without a key the
+    operation simply runs, with a claim that does not persist its progress.
+    """
+    if key is None:
+        return await operation(IdempotencyClaim())
+    scope = (str(user_id), route, _validate_key(key))
+
+    task = _in_flight.get(scope)
+    if task is None:
+        task = asyncio.ensure_future(_run(db, scope, operation))
+        _in_flight[scope] = task
+        task.add_done_callback(lambda _: _in_flight.pop(scope, None))
+    # shield() so a client disconnecting does not abandon a half-done checkout
+    return await asyncio.shield(task)
@@ -0,0 +1,191 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE
+from pymongo.errors import PyMongoError
+
+from app.general.utils.database import NEXTCHOW_COLLECTIONS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IndexSpec:
+    keys: List[Tuple[str, Any]]
+    unique: bool = False
+    expire_after_seconds: Optional[int] = None
+    options: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def name(self) -> str:
+        return "_".join(f"{key}_{direction}" for key, direction in self.keys)
+
+    def create_kwargs(self) -> Dict[str, Any]:
+        kwargs = {"name": self.name, **self.options}
+        if self.unique:
+            kwargs["unique"] = True
+        if self.expire_after_seconds is not None:
+            kwargs["expireAfterSeconds"] = self.expire_after_seconds
+        return kwargs
+
+
+# Every index the service relies on, keyed by collection name
+INDEX_REGISTRY: Dict[str, List[IndexSpec]] = {
+    NEXTCHOW_COLLECTIONS.VENDOR_USER: [
+        IndexSpec([("email", ASCENDING)], unique=True),
+        IndexSpec([("updated_at", ASCENDING)]),
+    ],
+    NEXTCHOW_COLLECTIONS.CUSTOMER_USER: [
+        IndexSpec([("email", ASCENDING)], unique=True),
+    ],
+    NEXTCHOW_COLLECTIONS.RIDER_USER: [
+        IndexSpec([("email", ASCENDING)], unique=True),
+    ],
+    NEXTCHOW_COLLECTIONS.VENDOR_PROFILE: [
+        IndexSpec([("location", GEOSPHERE)]),
+        IndexSpec([("is_onboarded", ASCENDING), ("is_approved", ASCENDING)]),
+        IndexSpec([("updated_at", ASCENDING)]),
+    ],
+    NEXTCHOW_COLLECTIONS.MENU: [
+        IndexSpec([("user_id", ASCENDING)]),
+    ],
+    NEXTCHOW_COLLECTIONS.MENU_CATEGORY: [
+        IndexSpec([("user_id", ASCENDING)]),
+    ],
+    NEXTCHOW_COLLECTIONS.MENU_PACKAGING: [
+        IndexSpec([("user_id", ASCENDING)]),
+    ],
+    NEXTCHOW_COLLECTIONS.CUSTOMER_CART: [
+        # One cart per user; cart upserts rely on this to detect a full cart
+        IndexSpec([("user_id", ASCENDING)], unique=True),
+    ],
+    NEXTCHOW_COLLECTIONS.ORDERS: [
+        # Keyset pagination sorts on (created_at, _id) newest first; each
+        # list query needs its equality fields followed by both sort keys
+        IndexSpec([("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexSpec(
+            [
+                ("status", ASCENDING),
+                ("created_at", DESCENDING),
+                ("_id", DESCENDING),
+            ]
+        ),
+        IndexSpec(
+            [
+                ("customer_id", ASCENDING),
+                ("created_at", DESCENDING),
+                ("_id", DESCENDING),
+            ]
+        ),
+        IndexSpec(
+            [
+                ("customer_id", ASCENDING),
+                ("status", ASCENDING),
+                ("created_at", DESCENDING),
+                ("_id", DESCENDING),
+            ]
+        ),
+        IndexSpec(
+            [
+                ("vendor_id", ASCENDING),
+                ("created_at", DESCENDING),
+                ("_id", DESCENDING),
+            ]
+        ),
+        IndexSpec(
+            [
+                ("vendor_id", ASCENDING),
+                ("status", ASCENDING),
+                ("created_at", DESCENDING),
+                ("_id", DESCENDING),
+            ]
+        ),
+    ],
+    NEXTCHOW_COLLECTIONS.ORDER_PAYMENTS: [
+        IndexSpec([("reference", ASCENDING)]),
+    ],
+    NEXTCHOW_COLLECTIONS.OTP_CODES: [
+        IndexSpec([("expires_at", ASCENDING)], expire_after_seconds=0),
+    ],
+    NEXTCHOW_COLLECTIONS.OTP_SENDS: [
+        # Drops a send throttle once its window is over
+        IndexSpec([("expire_at", ASCENDING)], expire_after_seconds=0),
+    ],
+    NEXTCHOW_COLLECTIONS.JOBS: [
+        IndexSpec([("status", ASCENDING), ("run_at", ASCENDING)]),
+        IndexSpec([("status", ASCENDING), ("lease_expires_at", ASCENDING)]),
+        IndexSpec([("expire_at", ASCENDING)], expire_after_seconds=0),
+    ],
+    NEXTCHOW_COLLECTIONS.DEVICE_TOKENS: [
+        IndexSpec([("user_id", ASCENDING)]),
+    ],
+    NEXTCHOW_COLLECTIONS.IDEMPOTENCY_KEYS: [
+        # Unique so only one request can claim a key on a route
+        IndexSpec(
+            [("user_id", ASCENDING), ("route", ASCENDING), ("key", ASCENDING)],
+            unique=True,
+        ),
+        IndexSpec([("expire_at", ASCENDING)], expire_after_seconds=0),
+    ],
+}
+
+
+def _normalise_key(keys) -> List[Tuple[str, Any]]:
+    return [(key, direction) for key, direction in keys]
+
+
+async def ensure_indexes(
+    db, registry: Optional[Dict[str, List[IndexSpec]]] = None
+) -> Dict:
+    """
+    Create any registered index that is missing. Safe to run on every startup
+    and from several workers at once; existing indexes are left untouched.
+    """
+    registry = INDEX_REGISTRY if registry is None else registry
+    report = {"created": [], "existing": [], "mismatched": [], "failed": []}
+
+    for collection_name, specs in registry.items():
+        collection = db[collection_name]
+        try:
+            existing = await collection.index_information()
+        except PyMongoError as e:
+            for spec in specs:
+                report["failed"].append(f"{collection_name}.{spec.name}: {e}")
+            continue
+
+        existing_by_key = {
+            tuple(_normalise_key(info["key"])): info for info in existing.values()
+        }
+
+        for spec in specs:
+            label = f"{collection_name}.{spec.name}"
+            info = existing_by_key.get(tuple(_normalise_key(spec.keys)))
+            if info is not None:
+                report["existing"].append(label)
+                if bool(info.get("unique")) != spec.unique:
+                    # create_index cannot change options in place
+                    report["mismatched"].append(label)
+                continue
+            try:
+                await collection.create_index(spec.keys, **spec.create_kwargs())
+                report["created"].append(label)
+            except PyMongoError as e:
+                report["failed"].append(f"{label}: {e}")
+
+    if report["created"]:
+        logger.info("Created missing indexes: %s", ", ".join(report["created"]))
+    if report["mismatched"]:
+        logger.warning(
+            "Indexes differ from the registry (drop them to rebuild): %s",
+            ", ".join(report["mismatched"]),
+        )
+    if report["failed"]:
+        logger.error("Could not create indexes: %s", "; ".join(report["failed"]))
+    logger.info(
+        "Index check finished: %d created, %d already present, %d failed",
+        len(report["created"]),
+        len(report["existing"]),
+        len(report["failed"]),
+    )
+    return report
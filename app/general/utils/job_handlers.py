@@ -0,0 +1,145 @@
+"""Side effects that run on the job queue instead of inside a request"""
+
+import logging
+from typing import Dict, List
+
+from app.general.utils import mail_sender
+from app.general.utils.jobs import enqueue_job, job_handler
+from app.general.utils.order_payments import (
+    CHARGE_SUCCEEDED,
+    PaymentStatus,
+    apply_charge_success,
+    initialize_order_payment,
+)
+from app.general.utils.push_notification import notify_users
+
+logger = logging.getLogger(__name__)
+
+
+class JobTypes:
+    EMAIL = "email"
+    PUSH = "push"
+    PAYMENT_INIT = "payment_init"
+    PAYSTACK_EVENT = "paystack_event"
+
+
+# Only these mail_sender functions may be named by an email job
+EMAIL_SENDERS = {
+    "welcome": mail_sender.send_welcome_email,
+    "password_reset": mail_sender.send_password_reset_mail,
+    "reg_otp": mail_sender.send_reg_otp_mail,
+    "password_reset_otp": mail_sender.send_password_reset_otp,
+    "subscribe": mail_sender.add_user_to_default_mail_list,
+}
+
+
+async def enqueue_email(db, template: str, **kwargs) -> str:
+    if template not in EMAIL_SENDERS:
+        raise ValueError(f"Unknown email template {template!r}")
+    return await enqueue_job(
+        db, JobTypes.EMAIL, {"template": template, "kwargs": kwargs}
+    )
+
+
+async def enqueue_push(db, user_ids: List[str], title: str, body: str) -> str:
+    return await enqueue_job(
+        db,
+        JobTypes.PUSH,
+        {
+            "user_ids": [str(user_id) for user_id in user_ids],
+            "title": title,
+            "body": body,
+        },
+    )
+
+
+async def enqueue_payment_init(db, order_id: str, email: str, session=None) -> str:
+    return await enqueue_job(
+        db,
+        JobTypes.PAYMENT_INIT,
+        {"order_id": order_id, "email": email},
+        dedupe_key=f"{JobTypes.PAYMENT_INIT}:{order_id}",
+        session=session,
+    )
+
+
+async def enqueue_paystack_event(db, event: Dict) -> str:
+    """
+    Queue a verified webhook event. Paystack redelivers events until it gets
+    a 2xx, so the event name and transaction id make the job id.
+    """
+    data = event.get("data") or {}
+    event_id = data.get("id") or data.get("reference")
+    return await enqueue_job(
+        db,
+        JobTypes.PAYSTACK_EVENT,
+        event,
+        dedupe_key=f"{JobTypes.PAYSTACK_EVENT}:{event.get('event')}:{event_id}",
+    )
+
+
+@job_handler(JobTypes.EMAIL, concurrency=8)
+async def run_email_job(db, payload: Dict) -> None:
+    sender = EMAIL_SENDERS[payload["template"]]
+    result = await sender(**payload["kwargs"])
+    if result:
+        return
+    if result.retryable:
+        # Provider outage or rate limit; the job retries with backoff
+        raise RuntimeError(f"{payload['template']} email was not sent: {result.error}")
+    # Rejected (bad address, missing template, ...); retrying cannot help
+    logger.error(
+        "Dropping %s email, rejected by the provider: %s",
+        payload["template"],
+        result.error,
+    )
+
+
+@job_handler(JobTypes.PUSH, concurrency=8)
+async def run_push_job(db, payload: Dict) -> None:
+    # One multicast to every device of these users; PushError triggers a retry
+    await notify_users(db, payload["user_ids"], payload["title"], payload["body"])
+
+
+@job_handler(JobTypes.PAYMENT_INIT, concurrency=8)
+async def run_payment_init_job(db, payload: Dict) -> None:
+    order = await initialize_order_payment(db, payload["order_id"], payload["email"])
+    if order is None:
+        return
+    # For clients not polling; the URL itself is read from the order
+    status = order["payment"]["status"]
+    if status == PaymentStatus.READY:
+        await enqueue_push(
+            db,
+            [order["user_id"]],
+            "Your order is ready for payment",
+            "Tap to complete payment for your order.",
+        )
+    elif status == PaymentStatus.FAILED:
+        await enqueue_push(
+            db,
+            [order["user_id"]],
+            "Payment could not be started",
+            "Please try checking out again.",
+        )
+
+
+@job_handler(JobTypes.PAYSTACK_EVENT, concurrency=8)
+async def run_paystack_event_job(db, payload: Dict) -> None:
+    if payload.get("event") != "charge.success":
+        logger.info("Ignoring Paystack event %s", payload.get("event"))
+        return
+    payment = await apply_charge_success(db, payload.get("data") or {})
+    if payment is None:
+        # Not one of ours, e.g. a transaction made from the dashboard
+        logger.warning(
+            "Paystack charge %s matches no order payment",
+            (payload.get("data") or {}).get("reference"),
+        )
+    elif payment["status"] == CHARGE_SUCCEEDED:
+        await enqueue_push(
+            db,
+            [payment["user_id"]],
+            "Payment received",
+            "Your order has been paid for.",
+        )
@@ -0,0 +1,356 @@
+import asyncio
+import logging
+import os
+import random
+import socket
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from app.general.utils.database import NEXTCHOW_COLLECTIONS
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class JobSettings:
+    WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+    POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1"))
+    LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+    MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+    BACKOFF_BASE_SECONDS = float(os.getenv("JOB_BACKOFF_BASE_SECONDS", "5"))
+    BACKOFF_MAX_SECONDS = float(os.getenv("JOB_BACKOFF_MAX_SECONDS", "900"))
+    # Finished jobs are removed by the TTL index after this long; dead ones stay
+    DONE_RETENTION_SECONDS = int(os.getenv("JOB_DONE_RETENTION_SECONDS", "604800"))
+
+
+# How soon a failed lease renewal is retried
+LEASE_RENEW_RETRY_SECONDS = 1.0
+
+
+class JobStatus:
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    DEAD = "dead"
+
+
+JobHandlerFn = Callable[[Any, Dict], Awaitable[None]]
+
+
+@dataclass
+class JobHandler:
+    fn: JobHandlerFn
+    concurrency: int
+    max_attempts: int
+
+
+# Job type -> handler, filled in by @job_handler at import time
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+
+def job_handler(
+    job_type: str, concurrency: int = 4, max_attempts: Optional[int] = None
+):
+    """
+    Register `fn(db, payload)` as the handler for `job_type`. At most
+    `concurrency` jobs of this type run at once in each worker process. A
+    handler signals failure by raising; the job is then retried with
+    exponential backoff until `max_attempts`, after which it is dead-lettered.
+    """
+
+    def register(fn: JobHandlerFn) -> JobHandlerFn:
+        JOB_HANDLERS[job_type] = JobHandler(
+            fn, concurrency, max_attempts or JobSettings.MAX_ATTEMPTS
+        )
+        return fn
+
+    return register
+
+
+async def enqueue_job(
+    db,
+    job_type: str,
+    payload: Dict,
+    run_at: Optional[datetime] = None,
+    dedupe_key: Optional[str] = None,
+    session=None,
+) -> str:
+    """
+    Persist a job and return its id. With a `dedupe_key` the job is only
+    enqueued once; later calls with the same key return the existing id.
+    Passing the `session` of an open transaction makes the job part of it.
+    """
+    now = datetime.now()
+    job_id = dedupe_key or uuid.uuid4().hex
+    job = {
+        "_id": job_id,
+        "type": job_type,
+        "payload": payload,
+        "status": JobStatus.PENDING,
+        "attempts": 0,
+        "run_at": run_at or now,
+        "created_at": now,
+        "updated_at": now,
+    }
+    jobs = db[NEXTCHOW_COLLECTIONS.JOBS]
+    if session is not None and dedupe_key is not None:
+        # Inside a transaction a duplicate-key error aborts the whole
+        # transaction, so look for the existing job instead of relying on it
+        if await jobs.find_one({"_id": job_id}, {"_id": 1}, session=session):
+            return job_id
+    try:
+        await jobs.insert_one(job, session=session)
+    except DuplicateKeyError:
+        if session is not None:
+            # The server has aborted the transaction; the caller must not
+            # carry on as if it could still commit
+            raise
+        return job_id
+    job_runner.notify()
+    return job_id
+
+
+class JobRunner:
+    """
+    In-service worker pool over the jobs collection. Workers claim due jobs
+    with an atomic find_one_and_update that takes a time-limited lease, so a
+    job whose worker died is picked up again once its lease runs out.
+    """
+
+    def __init__(self):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._db = None
+        self._tasks = []
+        self._wakeup = asyncio.Event()
+        self._claim_lock = asyncio.Lock()
+        self._running: Counter = Counter()
+        self.completed = 0
+        self.retried = 0
+        self.dead = 0
+
+    def notify(self) -> None:
+        """Wake idle workers so a job enqueued here runs without polling delay."""
+        self._wakeup.set()
+
+    def start(self, db) -> None:
+        if self._tasks:
+            return
+        self._db = db
+        self._tasks = [
+            asyncio.create_task(self._work(n)) for n in range(JobSettings.WORKERS)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _available_types(self):
+        return [
+            job_type
+            for job_type, handler in JOB_HANDLERS.items()
+            if self._running[job_type] < handler.concurrency
+        ]
+
+    async def _claim(self) -> Optional[Dict]:
+        # Serialised so per-type limits hold across this process's workers
+        async with self._claim_lock:
+            job_types = self._available_types()
+            if not job_types:
+                return None
+            now = datetime.now()
+            job = await self._db[NEXTCHOW_COLLECTIONS.JOBS].find_one_and_update(
+                {
+                    "type": {"$in": job_types},
+                    "$or": [
+                        {"status": JobStatus.PENDING, "run_at": {"$lte": now}},
+                        {
+                            "status": JobStatus.RUNNING,
+                            "lease_expires_at": {"$lte": now},
+                        },
+                    ],
+                },
+                {
+                    "$set": {
+                        "status": JobStatus.RUNNING,
+                        "lease_owner": self.worker_id,
+                        # Fresh per claim, so an attempt whose lease lapsed
+                        # cannot touch a later claim, even one by this worker
+                        "lease_token": uuid.uuid4().hex,
+                        "lease_expires_at": now
+                        + timedelta(seconds=JobSettings.LEASE_SECONDS),
+                        "updated_at": now,
+                    },
+                    "$inc": {"attempts": 1},
+                },
+                sort=[("run_at", 1)],
+                return_document=ReturnDocument.AFTER,
+            )
+            if job is not None:
+                self._running[job["type"]] += 1
+            return job
+
+    async def _renew_lease(self, job: Dict) -> None:
+        """
+        Extend the lease while the handler runs. A failed renewal is retried
+        until the lease would have run out; past that point another worker
+        may claim the job and run it again.
+        """
+        lease_expires_at = job["lease_expires_at"]
+        delay = JobSettings.LEASE_SECONDS / 3
+        while True:
+            await asyncio.sleep(delay)
+            renewed_until = datetime.now() + timedelta(
+                seconds=JobSettings.LEASE_SECONDS
+            )
+            try:
+                result = await self._db[NEXTCHOW_COLLECTIONS.JOBS].update_one(
+                    {"_id": job["_id"], "lease_token": job["lease_token"]},
+                    {"$set": {"lease_expires_at": renewed_until}},
+                )
+            except PyMongoError as e:
+                remaining = (lease_expires_at - datetime.now()).total_seconds()
+                if remaining <= 0:
+                    logger.error(
+                        "Job %s lease lapsed while renewals failed, it may be "
+                        "run again by another worker: %r",
+                        job["_id"],
+                        e,
+                    )
+                    return
+                logger.warning(
+                    "Could not renew lease of job %s, retrying: %r", job["_id"], e
+                )
+                delay = min(LEASE_RENEW_RETRY_SECONDS, remaining)
+                continue
+            if not result.matched_count:
+                logger.error("Job %s lease was taken over by another claim", job["_id"])
+                return
+            lease_expires_at = renewed_until
+            delay = JobSettings.LEASE_SECONDS / 3
+
+    @staticmethod
+    def _backoff(attempts: int) -> float:
+        delay = min(
+            JobSettings.BACKOFF_MAX_SECONDS,
+            JobSettings.BACKOFF_BASE_SECONDS * 2 ** (attempts - 1),
+        )
+        return random.uniform(delay / 2, delay)
+
+    async def _finish(self, job: Dict, update: Dict) -> None:
+        update["updated_at"] = datetime.now()
+        await self._db[NEXTCHOW_COLLECTIONS.JOBS].update_one(
+            # Only the claim holding the lease may settle the job
+            {"_id": job["_id"], "lease_token": job["lease_token"]},
+            {
+                "$set": update,
+                "$unset": {
+                    "lease_owner": "",
+                    "lease_token": "",
+                    "lease_expires_at": "",
+                },
+            },
+        )
+
+    async def _execute(self, job: Dict) -> None:
+        handler = JOB_HANDLERS[job["type"]]
+        heartbeat = asyncio.create_task(self._renew_lease(job))
+        try:
+            await handler.fn(self._db, job["payload"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            now = datetime.now()
+            if job["attempts"] >= handler.max_attempts:
+                self.dead += 1
+                logger.error(
+                    "Job %s (%s) dead after %d attempts: %r",
+                    job["_id"],
+                    job["type"],
+                    job["attempts"],
+                    e,
+                )
+                await self._finish(
+                    job,
+                    {"status": JobStatus.DEAD, "last_error": repr(e), "dead_at": now},
+                )
+            else:
+                self.retried += 1
+                delay = self._backoff(job["attempts"])
+                logger.warning(
+                    "Job %s (%s) failed, retrying in %.1fs: %r",
+                    job["_id"],
+                    job["type"],
+                    delay,
+                    e,
+                )
+                await self._finish(
+                    job,
+                    {
+                        "status": JobStatus.PENDING,
+                        "last_error": repr(e),
+                        "run_at": now + timedelta(seconds=delay),
+                    },
+                )
+        else:
+            self.completed += 1
+            now = datetime.now()
+            await self._finish(
+                job,
+                {
+                    "status": JobStatus.DONE,
+                    "finished_at": now,
+                    "expire_at": now
+                    + timedelta(seconds=JobSettings.DONE_RETENTION_SECONDS),
+                },
+            )
+        finally:
+            heartbeat.cancel()
+            self._running[job["type"]] -= 1
+            # A slot for this type just freed up
+            self._wakeup.set()
+
+    async def _work(self, worker_number: int) -> None:
+        while True:
+            try:
+                job = await self._claim()
+            except PyMongoError as e:
+                logger.warning("Job worker %d could not claim: %r", worker_number, e)
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), JobSettings.POLL_INTERVAL_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            try:
+                await self._execute(job)
+            except PyMongoError as e:
+                # The lease expires and another worker retries the job
+                logger.warning("Job %s could not be settled: %r", job["_id"], e)
+
+    def stats(self) -> Dict:
+        return {
+            "workers": len(self._tasks),
+            "running": dict(+self._running),
+            "completed": self.completed,
+            "retried": self.retried,
+            "dead": self.dead,
+        }
+
+
+job_runner = JobRunner()
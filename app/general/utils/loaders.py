@@ -0,0 +1,110 @@
+"""
+Request-scoped batching for menu and packaging lookups. Every `load` made in
+the same event-loop tick is answered by one `$in` query on the collection,
+and each id is fetched at most once per request, so a request costs one
+query per collection it touches however many items it handles.
+"""
+
+import asyncio
+from typing import Dict, Iterable, List, Optional, Set
+
+from fastapi import Depends
+
+from app.general.utils.database import NEXTCHOW_COLLECTIONS, get_database
+from app.general.utils.order_hydration import (
+    MENU_PROJECTION,
+    PACKAGING_PROJECTION,
+    fetch_by_ids,
+)
+
+# Enough for order screens, pricing and cart price-version checks
+MENU_LOADER_PROJECTION = {**MENU_PROJECTION, "price_version": 1}
+PACKAGING_LOADER_PROJECTION = {**PACKAGING_PROJECTION, "price_version": 1}
+
+
+class BatchLoader:
+    """Loads documents of one collection by id, batched and memoized."""
+
+    def __init__(self, collection, projection: Dict):
+        self._collection = collection
+        self._projection = projection
+        # string id -> future of the document (None if it does not exist)
+        self._loaded: Dict[str, asyncio.Future] = {}
+        self._pending: List[str] = []
+        # Referenced until done so the loop cannot drop a dispatch mid-flight
+        self._dispatches: Set[asyncio.Task] = set()
+
+    def _future(self, document_id) -> asyncio.Future:
+        key = str(document_id)
+        future = self._loaded.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._loaded[key] = future
+            if not self._pending:
+                # Runs after every callback already queued, i.e. once the
+                # other coroutines of this tick have asked for their ids
+                asyncio.get_running_loop().call_soon(self._start_dispatch)
+            self._pending.append(key)
+        return future
+
+    def _start_dispatch(self) -> None:
+        task = asyncio.ensure_future(self._dispatch())
+        self._dispatches.add(task)
+        task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self) -> None:
+        keys, self._pending = self._pending, []
+        try:
+            documents = await fetch_by_ids(self._collection, keys, self._projection)
+        except Exception as e:
+            for key in keys:
+                # Forget the failure so a later load in the request retries
+                future = self._loaded.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        except BaseException:
+            # Never leave a load waiting on a dispatch that is gone
+            for key in keys:
+                self._loaded.pop(key).cancel()
+            raise
+        for key in keys:
+            future = self._loaded[key]
+            if not future.done():
+                future.set_result(documents.get(key))
+
+    async def load(self, document_id) -> Optional[Dict]:
+        if document_id is None:
+            return None
+        # shield() so a cancelled caller cannot cancel a future other
+        # loads of the same id share
+        return await asyncio.shield(self._future(document_id))
+
+    async def load_many(self, ids: Iterable) -> Dict[str, Dict]:
+        """The documents of `ids` that exist, keyed by string id."""
+        futures = {
+            str(document_id): self._future(document_id)
+            for document_id in ids
+            if document_id is not None
+        }
+        documents = await asyncio.gather(
+            *(asyncio.shield(future) for future in futures.values())
+        )
+        return {
+            key: document
+            for key, document in zip(futures, documents)
+            if document is not None
+        }
+
+
+class Loaders:
+    def __init__(self, db):
+        self.menu = BatchLoader(db[NEXTCHOW_COLLECTIONS.MENU], MENU_LOADER_PROJECTION)
+        self.packaging = BatchLoader(
+            db[NEXTCHOW_COLLECTIONS.MENU_PACKAGING], PACKAGING_LOADER_PROJECTION
+        )
+
+
+def get_loaders(db=Depends(get_database)) -> Loaders:
+    """One set of loaders per request; FastAPI caches it for the request."""
+    return Loaders(db)
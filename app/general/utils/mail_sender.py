@@ -1,10 +1,16 @@
+import asyncio
+import logging
 import os
+import random
+from typing import Dict, Optional
 
-import requests
+import httpx
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 """We use Mailer Lite to maintain a subscription list for our users"""
 
 
@@ -14,38 +20,156 @@ load_dotenv()
 class Envs:
     MAILER_SEND_TOKEN = os.getenv("MAILER_SEND_TOKEN")
     MAILER_LITE_TOKEN = os.getenv("MAILER_LITE_TOKEN")
+    MAIL_FROM_EMAIL = os.getenv("MAIL_FROM_EMAIL", "info@databoard.ai")
+    MAILER_LITE_GROUP_ID = os.getenv("MAILER_LITE_GROUP_ID", "122156676408149459")
     WELCOME_TEMPLATE_ID = os.getenv("WELCOME_TEMPLATE_ID")
     PASS_TEMPLATE_ID = os.getenv("PASS_TEMPLATE_ID")
     PASSWORD_RESET_TEMPLATE_ID = os.getenv("PASSWORD_RESET_TEMPLATE_ID")
+    REG_OTP_TEMPLATE_ID = os.getenv("REG_OTP_TEMPLATE_ID", "3vz9dlevy5q4kj50")
+    PASSWORD_RESET_OTP_TEMPLATE_ID = os.getenv(
+        "PASSWORD_RESET_OTP_TEMPLATE_ID", "3vz9dlevy5q4kj50"
+    )
+    MAIL_TIMEOUT_SECONDS = float(os.getenv("MAIL_TIMEOUT_SECONDS", "10"))
+    MAIL_MAX_CONNECTIONS = int(os.getenv("MAIL_MAX_CONNECTIONS", "20"))
+    MAIL_MAX_RETRIES = int(os.getenv("MAIL_MAX_RETRIES", "2"))
+    MAIL_RETRY_BACKOFF_SECONDS = float(os.getenv("MAIL_RETRY_BACKOFF_SECONDS", "0.5"))
+
+
+MAILER_SEND_URL = "https://api.mailersend.com/v1/email"
+MAILER_LITE_SUBSCRIBERS_URL = "https://connect.mailerlite.com/api/subscribers"
+
+# 429 is retried too: both providers rate limit bursts of sends
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class MailResult:
+    """
+    Outcome of a send, truthy only when the provider accepted it. `retryable`
+    tells an outage or rate limit (worth trying later) from a rejection.
+    """
+
+    def __init__(self, sent: bool, retryable: bool = False, error: str = ""):
+        self.sent = sent
+        self.retryable = retryable
+        self.error = error
+
+    def __bool__(self) -> bool:
+        return self.sent
+
+    def __repr__(self) -> str:
+        if self.sent:
+            return "MailResult(sent)"
+        kind = "retryable" if self.retryable else "rejected"
+        return f"MailResult({kind}: {self.error})"
+
+
+class MailDispatcher:
+    """
+    Shared, pooled async client for MailerSend and MailerLite. Sends never
+    raise: failures are logged and reported as a falsy MailResult.
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def start(self) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=Envs.MAIL_TIMEOUT_SECONDS,
+                limits=httpx.Limits(max_connections=Envs.MAIL_MAX_CONNECTIONS),
+            )
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _post(self, url: str, headers: Dict, data: Dict) -> MailResult:
+        await self.start()
+        attempt = 0
+        while True:
+            try:
+                response = await self._client.post(url, json=data, headers=headers)
+            except httpx.TransportError as e:
+                error = repr(e)
+            else:
+                if response.is_success:
+                    return MailResult(True)
+                error = f"{response.status_code} - {response.text}"
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    logger.error("Mail request to %s failed: %s", url, error)
+                    return MailResult(False, error=error)
+
+            if attempt >= Envs.MAIL_MAX_RETRIES:
+                logger.error("Mail request to %s failed: %s", url, error)
+                return MailResult(False, retryable=True, error=error)
+            await asyncio.sleep(
+                random.uniform(0, Envs.MAIL_RETRY_BACKOFF_SECONDS * 2**attempt)
+            )
+            attempt += 1
+
+    async def send_template(
+        self,
+        reciever_email: str,
+        subject: str,
+        template_id: Optional[str],
+        substitutions: Optional[Dict[str, str]] = None,
+        personalization: Optional[Dict] = None,
+    ) -> MailResult:
+        if not template_id:
+            logger.error("No template configured for %r email", subject)
+            return MailResult(False, error=f"no template configured for {subject!r}")
+
+        data = {
+            "from": {"email": Envs.MAIL_FROM_EMAIL},
+            "to": [{"email": reciever_email}],
+            "subject": subject,
+            "template_id": template_id,
+        }
+        if substitutions:
+            data["variables"] = [
+                {
+                    "email": reciever_email,
+                    "substitutions": [
+                        {"var": var, "value": value}
+                        for var, value in substitutions.items()
+                    ],
+                }
+            ]
+        if personalization is not None:
+            data["personalization"] = [
+                {"email": reciever_email, "data": personalization}
+            ]
+
+        headers = {
+            "Content-Type": "application/json",
+            "X-Requested-With": "XMLHttpRequest",
+            "Authorization": f"Bearer {Envs.MAILER_SEND_TOKEN}",
+        }
+        return await self._post(MAILER_SEND_URL, headers, data)
+
+    async def add_subscriber(
+        self, email: str, fields: Dict, groups: list
+    ) -> MailResult:
+        headers = {
+            "Authorization": f"Bearer {Envs.MAILER_LITE_TOKEN}",
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        }
+        data = {"email": email, "fields": fields, "groups": groups}
+        return await self._post(MAILER_LITE_SUBSCRIBERS_URL, headers, data)
+
+
+mail_dispatcher = MailDispatcher()
 
 
 async def send_welcome_email(reciever_email: str, reciever_firstname: str):
-    url = "https://api.mailersend.com/v1/email"
-
-    headers = {
-        "Content-Type": "application/json",
-        "X-Requested-With": "XMLHttpRequest",
-        "Authorization": f"Bearer {Envs.MAILER_SEND_TOKEN}",
-    }
-
-    data = {
-        "from": {"email": "info@databoard.ai"},
-        "to": [{"email": reciever_email}],
-        "personalization": [
-            {"email": reciever_email, "data": {"name": reciever_firstname}}
-        ],
-        "subject": "Welcome to Clocker",
-        "template_id": Envs.WELCOME_TEMPLATE_ID,
-    }
-
-    response = requests.post(url, json=data, headers=headers)
-
-    if response.status_code in [200, 201, 202, 204]:
-        print("Email sent successfully!")
-        return True
-    else:
-        print(f"Error: {response.status_code} - {response.text}")
-        return False
+    return await mail_dispatcher.send_template(
+        reciever_email,
+        "Welcome to Clocker",
+        Envs.WELCOME_TEMPLATE_ID,
+        personalization={"name": reciever_firstname},
+    )
 
 
 async def send_pass_email_to_users(
@@ -59,179 +183,58 @@ async def send_pass_email_to_users(
     ticket_type: str,
     sender: str,
 ):
-    url = "https://api.mailersend.com/v1/email"
-
-    headers = {
-        "Content-Type": "application/json",
-        "X-Requested-With": "XMLHttpRequest",
-        "Authorization": f"Bearer {Envs.MAILER_SEND_TOKEN}",
-    }
-
-    data = {
-        "from": {"email": "info@databoard.ai"},
-        "to": [{"email": reciever_email}],
-        "variables": [
-            {
-                "email": reciever_email,
-                "substitutions": [
-                    {"var": "host", "value": host},
-                    {"var": "type", "value": type},
-                    {"var": "sender", "value": sender},
-                    {"var": "event_name", "value": event_name},
-                    {"var": "conjunction", "value": conjunction},
-                    {"var": "ticket_name", "value": ticket_name},
-                    {"var": "ticket_type", "value": ticket_type},
-                    {"var": "claim_url", "value": claim_url},
-                ],
-            }
-        ],
-        "subject": "You got a free pass",
-        "personalization": [{"email": reciever_email, "data": {"type": ""}}],
-        "template_id": Envs.PASS_TEMPLATE_ID,
-    }
-
-    response = requests.post(url, json=data, headers=headers)
-
-    if response.status_code in [200, 201, 202, 204]:
-        print("Email sent successfully!")
-        return True
-    else:
-        print(f"Error: {response.status_code} - {response.text}")
-        return False
+    return await mail_dispatcher.send_template(
+        reciever_email,
+        "You got a free pass",
+        Envs.PASS_TEMPLATE_ID,
+        substitutions={
+            "host": host,
+            "type": type,
+            "sender": sender,
+            "event_name": event_name,
+            "conjunction": conjunction,
+            "ticket_name": ticket_name,
+            "ticket_type": ticket_type,
+            "claim_url": claim_url,
+        },
+        personalization={"type": ""},
+    )
 
 
 async def send_password_reset_mail(
     reciever_email: str, reciever_firstname: str, otp: str
 ):
-    url = "https://api.mailersend.com/v1/email"
-
-    headers = {
-        "Content-Type": "application/json",
-        "X-Requested-With": "XMLHttpRequest",
-        "Authorization": f"Bearer {Envs.MAILER_SEND_TOKEN}",
-    }
-
-    data = {
-        "from": {"email": "info@databoard.ai"},
-        "to": [{"email": reciever_email}],
-        "variables": [
-            {
-                "email": reciever_email,
-                "substitutions": [
-                    {"var": "otp", "value": otp},
-                    {"var": "name", "value": reciever_firstname},
-                ],
-            }
-        ],
-        "subject": "Password Reset",
-        "template_id": Envs.PASSWORD_RESET_TEMPLATE_ID,
-    }
-
-    response = requests.post(url, json=data, headers=headers)
-
-    if response.status_code in [200, 201, 202, 204]:
-        print("Email sent successfully!")
-        return True
-    else:
-        print(f"Error: {response.status_code} - {response.text}")
-        return False
+    return await mail_dispatcher.send_template(
+        reciever_email,
+        "Password Reset",
+        Envs.PASSWORD_RESET_TEMPLATE_ID,
+        substitutions={"otp": otp, "name": reciever_firstname},
+    )
 
 
 async def send_reg_otp_mail(reciever_email: str, reciever_name: str, otp: str):
-    url = "https://api.mailersend.com/v1/email"
-
-    headers = {
-        "Content-Type": "application/json",
-        "X-Requested-With": "XMLHttpRequest",
-        "Authorization": f"Bearer {Envs.MAILER_SEND_TOKEN}",
-    }
-
-    data = {
-        "from": {"email": "info@databoard.ai"},
-        "to": [{"email": reciever_email}],
-        "variables": [
-            {
-                "email": reciever_email,
-                "substitutions": [
-                    {"var": "otp", "value": otp},
-                    {"var": "name", "value": reciever_name},
-                ],
-            }
-        ],
-        "subject": "Welcome to Clocker",
-        "template_id": "3vz9dlevy5q4kj50",
-    }
-
-    response = requests.post(url, json=data, headers=headers)
-
-    if response.status_code in [200, 201, 202, 204]:
-        print("Email sent successfully!")
-        return True
-    else:
-        print(f"Error: {response.status_code} - {response.text}")
-        return False
+    return await mail_dispatcher.send_template(
+        reciever_email,
+        "Welcome to Clocker",
+        Envs.REG_OTP_TEMPLATE_ID,
+        substitutions={"otp": otp, "name": reciever_name},
+    )
 
 
 async def send_password_reset_otp(reciever_email: str, reciever_name: str, otp: str):
-    url = "https://api.mailersend.com/v1/email"
-
-    headers = {
-        "Content-Type": "application/json",
-        "X-Requested-With": "XMLHttpRequest",
-        "Authorization": f"Bearer {Envs.MAILER_SEND_TOKEN}",
-    }
-
-    data = {
-        "from": {"email": "info@databoard.ai"},
-        "to": [{"email": reciever_email}],
-        "variables": [
-            {
-                "email": reciever_email,
-                "substitutions": [
-                    {"var": "otp", "value": otp},
-                    {"var": "name", "value": reciever_name},
-                ],
-            }
-        ],
-        "subject": "Welcome to Clocker",
-        "template_id": "3vz9dlevy5q4kj50",
-    }
-
-    response = requests.post(url, json=data, headers=headers)
-
-    if response.status_code in [200, 201, 202, 204]:
-        print("Email sent successfully!")
-        return True
-    else:
-        print(f"Error: {response.status_code} - {response.text}")
-        return False
+    return await mail_dispatcher.send_template(
+        reciever_email,
+        "Welcome to Clocker",
+        Envs.PASSWORD_RESET_OTP_TEMPLATE_ID,
+        substitutions={"otp": otp, "name": reciever_name},
+    )
 
 
 async def add_user_to_default_mail_list(
     user_firstname: str, user_lastname: str, user_email: str
 ):
-    url = "https://connect.mailerlite.com/api/subscribers"
-
-    headers = {
-        "Authorization": f"Bearer {Envs.MAILER_LITE_TOKEN}",
-        "Content-Type": "application/json",
-        "Accept": "application/json",
-    }
-    data = {
-        "email": user_email,
-        "fields": {"name": user_firstname, "last_name": user_lastname},
-        "groups": [
-            "122156676408149459",
-        ],
-    }
-
-    response = requests.post(url, headers=headers, json=data)
-
-    if response.status_code in [200, 201]:
-        print("New subscriber added successfully:")
-
-        return True
-    else:
-        print(f"Error: {response.status_code} - {response.text}")
-
-        return False
+    return await mail_dispatcher.add_subscriber(
+        user_email,
+        {"name": user_firstname, "last_name": user_lastname},
+        [Envs.MAILER_LITE_GROUP_ID],
+    )
@@ -1,3 +1,4 @@
+import copy
 import os
 from datetime import datetime, timedelta
 from typing import Dict
@@ -9,16 +10,38 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from pydantic import BaseModel
 
+from app.general.utils.cache import TTLCache
 from app.general.utils.database import NEXTCHOW_COLLECTIONS, get_database
+from app.general.utils.executors import BoundedExecutor
 
 load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRY_MINUTES = os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES")
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "10000"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
 
 oauth2_scheme = APIKeyHeader(name="Authorization", auto_error=False)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Secrets are never loaded into (or served from) the principal cache
+PRINCIPAL_PROJECTION = {
+    "password": 0,
+    "otp": 0,
+    "otp_created_at": 0,
+    "password_reset_otp": 0,
+    "password_reset_otp_created_at": 0,
+    "password_reset_otp_verified": 0,
+}
+_principal_cache = TTLCache(maxsize=USER_CACHE_MAX_SIZE, ttl=USER_CACHE_TTL_SECONDS)
+
+# bcrypt takes ~100-300 ms of CPU per call, so it runs on its own bounded pool
+password_executor = BoundedExecutor(
+    "bcrypt", workers=PASSWORD_HASH_WORKERS, max_pending=PASSWORD_HASH_MAX_PENDING
+)
+
 
 class TokenData(BaseModel):
     id: str
@@ -45,12 +68,19 @@ def verify_access_token(token: str, credential_exception):
         raise credential_exception
 
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password_async(plain_password, hashed_password):
+    return await password_executor.run(
+        pwd_context.verify, plain_password, hashed_password
+    )
+
+
+async def get_password_hash_async(password):
+    return await password_executor.run(pwd_context.hash, password)
 
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+def invalidate_user_cache(user_id):
+    """Drop a cached principal after its profile, password or verification changes."""
+    _principal_cache.pop(str(user_id))
 
 
 async def get_current_user(
@@ -75,7 +105,16 @@ async def get_current_user(
 
     current_user_id = verify_access_token(token, credentail_exception).id
 
+    # Callers get their own copy: one mutating e.g. `location` must not
+    # change the principal other requests are served
+    cached_user = _principal_cache.get(current_user_id)
+    if cached_user is not None:
+        return copy.deepcopy(cached_user)
+
     current_user = await db[NEXTCHOW_COLLECTIONS.VENDOR_USER].find_one(
-        {"_id": current_user_id}
+        {"_id": current_user_id}, PRINCIPAL_PROJECTION
     )
+    if current_user is not None:
+        _principal_cache.set(current_user_id, current_user)
+        return copy.deepcopy(current_user)
     return current_user
@@ -0,0 +1,120 @@
+import asyncio
+from typing import Dict, Iterable, List
+
+from app.general.utils.helpers import id_query_values
+
+# Only the fields order screens render; keeps hydrated pages small
+MENU_PROJECTION = {
+    "name": 1,
+    "description": 1,
+    "price": 1,
+    "menu_picture": 1,
+    "preparation_duration": 1,
+    "user_id": 1,
+}
+PACKAGING_PROJECTION = {"name": 1, "description": 1, "price": 1}
+
+
+async def fetch_by_ids(collection, ids: Iterable, projection: Dict) -> Dict[str, Dict]:
+    """Fetch every document in `ids` with one `$in` query, keyed by string id."""
+    ids = id_query_values(ids)
+    if not ids:
+        return {}
+    documents = await collection.find({"_id": {"$in": ids}}, projection).to_list(
+        length=len(ids)
+    )
+    return {str(document["_id"]): document for document in documents}
+
+
+async def hydrate_orders(loaders, orders: List[Dict]) -> List[Dict]:
+    """
+    Attach `packaging` to every pack and `menu` to every item of `orders`
+    through the request's loaders, i.e. one batched lookup per collection for
+    the whole page. Lines snapshotted at checkout already carry both and are
+    left alone, so pages of such orders need no lookups at all.
+    """
+    menu_ids = set()
+    packaging_ids = set()
+    for order in orders:
+        for pack in order.get("packs", []):
+            if pack.get("packaging_id") and "packaging" not in pack:
+                packaging_ids.add(pack["packaging_id"])
+            for item in pack.get("items", []):
+                if "menu" not in item:
+                    menu_ids.add(item["menu_id"])
+    if not menu_ids and not packaging_ids:
+        return orders
+
+    menus, packaging = await asyncio.gather(
+        loaders.menu.load_many(menu_ids), loaders.packaging.load_many(packaging_ids)
+    )
+
+    for order in orders:
+        for pack in order.get("packs", []):
+            if pack.get("packaging_id") and "packaging" not in pack:
+                document = packaging.get(str(pack["packaging_id"]))
+                pack["packaging"] = document and _snapshot(
+                    document, PACKAGING_PROJECTION
+                )
+            for item in pack.get("items", []):
+                if "menu" not in item:
+                    document = menus.get(str(item["menu_id"]))
+                    item["menu"] = document and _snapshot(document, MENU_PROJECTION)
+    return orders
+
+
+def _snapshot(document: Dict, projection: Dict) -> Dict:
+    # Same shape as a hydrated menu or packaging
+    snapshot = {"_id": document.get("_id")}
+    snapshot.update((field, document.get(field)) for field in projection)
+    return snapshot
+
+
+def snapshot_packs(
+    packs: List[Dict], menus: Dict[str, Dict], packaging: Dict[str, Dict]
+) -> List[Dict]:
+    """
+    Order lines for `packs` with the name, price and details of every menu
+    item and packaging copied in, as charged. `menus` and `packaging` are
+    keyed by string id and fetched with MENU_PROJECTION and
+    PACKAGING_PROJECTION. Raises KeyError for an id missing from them.
+    """
+    lines = []
+    for pack in packs:
+        items = []
+        subtotal = 0.0
+        for item in pack["items"]:
+            menu = menus[str(item["menu_id"])]
+            unit_price = menu.get("price", 0.0)
+            subtotal += unit_price * item["quantity"]
+            items.append(
+                {
+                    "menu_id": str(item["menu_id"]),
+                    "quantity": item["quantity"],
+                    "unit_price": unit_price,
+                    "menu": _snapshot(menu, MENU_PROJECTION),
+                }
+            )
+        line = {
+            "pack_id": pack.get("pack_id"),
+            "packaging_id": pack.get("packaging_id"),
+            "items": items,
+        }
+        if pack.get("packaging_id"):
+            line["packaging"] = _snapshot(
+                packaging[str(pack["packaging_id"])], PACKAGING_PROJECTION
+            )
+            subtotal += line["packaging"].get("price") or 0.0
+        line["subtotal"] = subtotal
+        lines.append(line)
+    return lines
+
+
+async def snapshot_order_lines(loaders, packs: List[Dict]) -> List[Dict]:
+    """snapshot_packs at current prices, loaded through the request's loaders."""
+    menu_ids = {item["menu_id"] for pack in packs for item in pack["items"]}
+    packaging_ids = {pack["packaging_id"] for pack in packs if pack.get("packaging_id")}
+    menus, packaging = await asyncio.gather(
+        loaders.menu.load_many(menu_ids), loaders.packaging.load_many(packaging_ids)
+    )
+    return snapshot_packs(packs, menus, packaging)
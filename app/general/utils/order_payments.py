@@ -0,0 +1,206 @@
+"""
+Paystack transactions for orders. `/customer/cart/checkout` writes the
+order with `payment.status = initializing` and a payment job in the same
+transaction (the job is the outbox record); the job calls Paystack and
+publishes the authorization URL on the order for the client to poll.
+`/customer/cart/checkout_and_initiate_payment` places the order the same
+way and waits for the job to publish the URL.
+Webhook events are applied to `order_payments` and `orders` by reference.
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+from app.customers.models import OrderPayment
+from app.general.utils.database import NEXTCHOW_COLLECTIONS
+from app.general.utils.helpers import id_query_values
+from app.general.utils.paystack import PaystackError, paystack_client
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentStatus:
+    INITIALIZING = "initializing"
+    READY = "ready"
+    FAILED = "failed"
+    PAID = "paid"
+
+
+class OrderPaymentSettings:
+    # How long checkout_and_initiate_payment waits for the payment job
+    WAIT_TIMEOUT_SECONDS = float(os.getenv("ORDER_PAYMENT_WAIT_TIMEOUT_SECONDS", "15"))
+    POLL_INTERVAL_SECONDS = float(
+        os.getenv("ORDER_PAYMENT_POLL_INTERVAL_SECONDS", "0.25")
+    )
+
+
+# order_payments.status values; rows start as "pending"
+CHARGE_SUCCEEDED = "success"
+CHARGE_AMOUNT_MISMATCH = "amount_mismatch"
+
+
+def payment_request(order_id: str, user: Dict, amount: float) -> Dict:
+    return {
+        "email": user.get("email"),
+        "amount": amount,
+        "callback_url": "https://nextchow.com/verify",
+        "channels": ["card"],
+        "metadata": {
+            "email": user.get("email"),
+            "user_id": user.get("_id"),
+            "order_id": order_id,
+            "amount": amount,
+        },
+    }
+
+
+async def save_order_payment(
+    db, order_id: str, user_id: str, amount: float, authorization: Dict
+) -> None:
+    payment = OrderPayment(
+        order_id=order_id,
+        user_id=user_id,
+        amount=amount,
+        reference=authorization.get("reference"),
+        payment_method="credit_card",
+        access_code=authorization.get("access_code"),
+    )
+    await db[NEXTCHOW_COLLECTIONS.ORDER_PAYMENTS].insert_one(payment.dict())
+
+
+async def initialize_order_payment(db, order_id: str, email: str) -> Optional[Dict]:
+    """
+    Initialize the Paystack transaction for an order placed through the
+    outbox and publish the result on `order.payment`. Outages are raised so
+    the job retries; requests Paystack rejects mark the payment failed.
+    Returns the order, or None if it no longer exists.
+    """
+    order = await db[NEXTCHOW_COLLECTIONS.ORDERS].find_one(
+        {"_id": {"$in": id_query_values([order_id])}}
+    )
+    if order is None:
+        return None
+    if order.get("payment", {}).get("status") != PaymentStatus.INITIALIZING:
+        # Already settled by an earlier attempt
+        return order
+
+    user_id = order["user_id"]
+    try:
+        authorization = await paystack_client.initialize_transaction(
+            payment_request(
+                order_id, {"_id": user_id, "email": email}, order["total_price"]
+            )
+        )
+    except PaystackError as e:
+        if e.status_code >= 500:
+            # Includes PaystackUnavailable; the job retries with backoff
+            raise
+        logger.warning("Paystack rejected payment for order %s: %r", order_id, e)
+        return await _publish_payment(
+            db,
+            order,
+            {
+                "status": PaymentStatus.FAILED,
+                "error": str(e),
+                "updated_at": datetime.now(),
+            },
+        )
+
+    await save_order_payment(db, order_id, user_id, order["total_price"], authorization)
+    return await _publish_payment(
+        db,
+        order,
+        {
+            "status": PaymentStatus.READY,
+            "reference": authorization.get("reference"),
+            "payment_url": authorization.get("authorization_url"),
+            "updated_at": datetime.now(),
+        },
+    )
+
+
+async def wait_for_payment(db, order_id: str) -> Optional[Dict]:
+    """
+    Return the order once its payment job has published a result, or as it
+    stands when WAIT_TIMEOUT_SECONDS runs out. None if there is no order.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + OrderPaymentSettings.WAIT_TIMEOUT_SECONDS
+    while True:
+        order = await db[NEXTCHOW_COLLECTIONS.ORDERS].find_one(
+            {"_id": {"$in": id_query_values([order_id])}}
+        )
+        if (
+            order is None
+            or order.get("payment", {}).get("status") != PaymentStatus.INITIALIZING
+            or loop.time() >= deadline
+        ):
+            return order
+        await asyncio.sleep(OrderPaymentSettings.POLL_INTERVAL_SECONDS)
+
+
+async def _publish_payment(db, order: Dict, payment: Dict) -> Dict:
+    await db[NEXTCHOW_COLLECTIONS.ORDERS].update_one(
+        {"_id": order["_id"], "payment.status": PaymentStatus.INITIALIZING},
+        {"$set": {"payment": payment}},
+    )
+    order["payment"] = payment
+    return order
+
+
+async def apply_charge_success(db, charge: Dict) -> Optional[Dict]:
+    """
+    Settle the pending order_payments row for a successful Paystack charge
+    and mark its order paid. Safe to repeat: a redelivered event or a retried
+    job settles the payment once and re-applies the same order update.
+    Returns the payment, or None when the reference is unknown.
+    """
+    payments = db[NEXTCHOW_COLLECTIONS.ORDER_PAYMENTS]
+    payment = await payments.find_one({"reference": charge.get("reference")})
+    if payment is None:
+        return None
+
+    if payment.get("status") == "pending":
+        settlement = {
+            "status": (
+                CHARGE_SUCCEEDED
+                if charge.get("amount") == payment.get("amount")
+                else CHARGE_AMOUNT_MISMATCH
+            ),
+            "paid_amount": charge.get("amount"),
+            "channel": charge.get("channel"),
+            "gateway_response": charge.get("gateway_response"),
+            "paid_at": charge.get("paid_at"),
+            "updated_at": datetime.now(),
+        }
+        await payments.update_one(
+            {"_id": payment["_id"], "status": "pending"}, {"$set": settlement}
+        )
+        payment = await payments.find_one({"_id": payment["_id"]})
+        if payment["status"] == CHARGE_AMOUNT_MISMATCH:
+            logger.error(
+                "Payment %s charged %s, expected %s",
+                payment.get("reference"),
+                charge.get("amount"),
+                payment.get("amount"),
+            )
+
+    if payment["status"] == CHARGE_SUCCEEDED:
+        await db[NEXTCHOW_COLLECTIONS.ORDERS].update_one(
+            {"_id": {"$in": id_query_values([payment["order_id"]])}},
+            {
+                "$set": {
+                    "payment.status": PaymentStatus.PAID,
+                    "payment.reference": payment["reference"],
+                    "payment.paid_at": payment["updated_at"],
+                }
+            },
+        )
+    return payment
@@ -0,0 +1,225 @@
+import hashlib
+import hmac
+import os
+import secrets
+from datetime import datetime, timedelta
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.general.utils.database import NEXTCHOW_COLLECTIONS
+from app.general.utils.oauth_service import verify_password_async
+
+load_dotenv()
+
+
+class OTPSettings:
+    SECRET_KEY = os.getenv("OTP_SECRET_KEY") or os.getenv("SECRET_KEY") or ""
+    TTL_SECONDS = int(os.getenv("OTP_TTL_SECONDS", "900"))
+    MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", "5"))
+    RESEND_INTERVAL_SECONDS = int(os.getenv("OTP_RESEND_INTERVAL_SECONDS", "60"))
+    MAX_SENDS_PER_WINDOW = int(os.getenv("OTP_MAX_SENDS_PER_WINDOW", "5"))
+    SEND_WINDOW_SECONDS = int(os.getenv("OTP_SEND_WINDOW_SECONDS", "3600"))
+
+
+class OTPPurpose:
+    REGISTRATION = "registration"
+    PASSWORD_RESET = "password_reset"
+
+
+# Before otp_codes, codes were bcrypt-hashed onto the user document. Those
+# are still accepted until they expire (TTL_SECONDS after they were sent);
+# once that long has passed since the otp_codes release, this can go.
+LEGACY_OTP_FIELDS = {
+    OTPPurpose.REGISTRATION: ("otp", "otp_created_at"),
+    OTPPurpose.PASSWORD_RESET: ("password_reset_otp", "password_reset_otp_created_at"),
+}
+# Where each flow kept them; rider password resets were written to customers
+LEGACY_OTP_USERS = {
+    ("vendor", OTPPurpose.REGISTRATION): NEXTCHOW_COLLECTIONS.VENDOR_USER,
+    ("vendor", OTPPurpose.PASSWORD_RESET): NEXTCHOW_COLLECTIONS.VENDOR_USER,
+    ("customer", OTPPurpose.REGISTRATION): NEXTCHOW_COLLECTIONS.CUSTOMER_USER,
+    ("customer", OTPPurpose.PASSWORD_RESET): NEXTCHOW_COLLECTIONS.CUSTOMER_USER,
+    ("rider", OTPPurpose.REGISTRATION): NEXTCHOW_COLLECTIONS.RIDER_USER,
+    ("rider", OTPPurpose.PASSWORD_RESET): NEXTCHOW_COLLECTIONS.CUSTOMER_USER,
+}
+
+
+def generate_otp(length: int = 6) -> str:
+    return "".join(str(secrets.randbelow(10)) for _ in range(length))
+
+
+def _otp_key(user_type: str, purpose: str, email: str) -> str:
+    return f"{user_type}:{purpose}:{email.strip().lower()}"
+
+
+def _otp_digest(key: str, code: str) -> str:
+    # Keyed HMAC instead of bcrypt: OTPs are short-lived and attempt-limited,
+    # so a microsecond digest is enough and keeps verification off the CPU
+    return hmac.new(
+        OTPSettings.SECRET_KEY.encode(), f"{key}:{code}".encode(), hashlib.sha256
+    ).hexdigest()
+
+
+async def _record_send(db, key: str, now: datetime) -> None:
+    """
+    Count a send against the throttle for `key`, or raise 429. The throttle
+    lives in its own document that expires with its window, so consuming or
+    expiring the OTP does not reset it.
+    """
+    collection = db[NEXTCHOW_COLLECTIONS.OTP_SENDS]
+    resend_cutoff = now - timedelta(seconds=OTPSettings.RESEND_INTERVAL_SECONDS)
+
+    # Within the current window: both limits are checked in the filter, so
+    # two concurrent requests cannot both get through
+    counted = await collection.update_one(
+        {
+            "_id": key,
+            "expire_at": {"$gt": now},
+            "send_count": {"$lt": OTPSettings.MAX_SENDS_PER_WINDOW},
+            "last_sent_at": {"$lte": resend_cutoff},
+        },
+        {"$inc": {"send_count": 1}, "$set": {"last_sent_at": now}},
+    )
+    if counted.matched_count:
+        return
+
+    # No window, or the last one is over (the TTL monitor only runs once a
+    # minute): start a new one. An open window makes the upsert hit the _id.
+    try:
+        await collection.update_one(
+            {"_id": key, "expire_at": {"$lte": now}},
+            {
+                "$set": {
+                    "send_count": 1,
+                    "last_sent_at": now,
+                    "expire_at": now
+                    + timedelta(seconds=OTPSettings.SEND_WINDOW_SECONDS),
+                }
+            },
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        throttle = await collection.find_one({"_id": key}, {"send_count": 1})
+        if throttle and throttle["send_count"] >= OTPSettings.MAX_SENDS_PER_WINDOW:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many OTP requests, please try again later",
+            )
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Please wait before requesting another OTP",
+        )
+
+
+async def issue_otp(
+    db, user_type: str, purpose: str, email: str, code: Optional[str] = None
+) -> str:
+    """
+    Store a fresh OTP for (user_type, purpose, email), replacing any previous
+    one, and return the plain code so it can be sent to the user. Raises 429
+    if the previous code was sent too recently or too many codes were sent in
+    the current window.
+    """
+    code = code or generate_otp()
+    key = _otp_key(user_type, purpose, email)
+    now = datetime.now()
+
+    await _record_send(db, key, now)
+    await db[NEXTCHOW_COLLECTIONS.OTP_CODES].update_one(
+        {"_id": key},
+        {
+            "$set": {
+                "user_type": user_type,
+                "purpose": purpose,
+                "email": email,
+                "digest": _otp_digest(key, code),
+                "attempts": 0,
+                "created_at": now,
+                "expires_at": now + timedelta(seconds=OTPSettings.TTL_SECONDS),
+            }
+        },
+        upsert=True,
+    )
+    return code
+
+
+async def consume_otp(db, user_type: str, purpose: str, email: str, code: str):
+    """
+    Check `code` against the stored OTP and consume it on success. Every
+    check counts as an attempt; raises 400 for a missing, expired or wrong
+    code and 429 once the attempt limit is reached.
+    """
+    collection = db[NEXTCHOW_COLLECTIONS.OTP_CODES]
+    key = _otp_key(user_type, purpose, email)
+    now = datetime.now()
+
+    otp = await collection.find_one_and_update(
+        {
+            "_id": key,
+            "expires_at": {"$gt": now},
+            "attempts": {"$lt": OTPSettings.MAX_ATTEMPTS},
+        },
+        {"$inc": {"attempts": 1}},
+        projection={"digest": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+
+    if otp is None:
+        # The TTL monitor only runs once a minute, so expired codes may linger
+        existing = await collection.find_one(
+            {"_id": key}, {"expires_at": 1, "attempts": 1}
+        )
+        if not existing:
+            if await _consume_legacy_otp(db, user_type, purpose, email, code, now):
+                return
+            raise HTTPException(status_code=400, detail="No OTP exists for this user")
+        if existing["expires_at"] <= now:
+            raise HTTPException(status_code=400, detail="OTP has expired")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many invalid attempts, please request a new OTP",
+        )
+
+    if not hmac.compare_digest(otp["digest"], _otp_digest(key, code)):
+        raise HTTPException(status_code=400, detail="Invalid OTP")
+
+    await collection.delete_one({"_id": key})
+
+
+async def _consume_legacy_otp(
+    db, user_type: str, purpose: str, email: str, code: str, now: datetime
+) -> bool:
+    """
+    Check `code` against an OTP stored on the user document before otp_codes
+    existed, and consume it on success. Returns False if there is none;
+    raises 400 if it has expired or does not match.
+    """
+    collection_name = LEGACY_OTP_USERS.get((user_type, purpose))
+    if collection_name is None:
+        return False
+    hash_field, created_field = LEGACY_OTP_FIELDS[purpose]
+    collection = db[collection_name]
+    user = await collection.find_one(
+        {"email": email, hash_field: {"$exists": True}},
+        {hash_field: 1, created_field: 1},
+    )
+    if not user or not user.get(created_field):
+        return False
+
+    if (now - user[created_field]).total_seconds() > OTPSettings.TTL_SECONDS:
+        raise HTTPException(status_code=400, detail="OTP has expired")
+    if not await verify_password_async(code, user[hash_field]):
+        raise HTTPException(status_code=400, detail="Invalid OTP")
+
+    # Conditional on the same hash, so the code can only be used once
+    consumed = await collection.update_one(
+        {"_id": user["_id"], hash_field: user[hash_field]},
+        {"$unset": {hash_field: 1, created_field: 1}},
+    )
+    if not consumed.modified_count:
+        raise HTTPException(status_code=400, detail="No OTP exists for this user")
+    return True
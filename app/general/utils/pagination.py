@@ -0,0 +1,123 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException, Query
+from pymongo import ASCENDING, DESCENDING
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Common keyset orderings; the last field must be unique so pages never overlap.
+# Each query paginated with one needs an index ending in the same fields
+# (see app/general/utils/indexes.py) or every page sorts in memory.
+ID_ASC = [("_id", ASCENDING)]
+NEWEST_FIRST = [("created_at", DESCENDING), ("_id", DESCENDING)]
+
+
+class PageParams:
+    """Query parameters shared by every cursor-paginated list endpoint."""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return {"$oid": str(value)}
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "$oid" in value:
+            return ObjectId(value["$oid"])
+        if "$date" in value:
+            return datetime.fromisoformat(value["$date"])
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Turn the sort-key values of the last returned document into an opaque token."""
+    raw = json.dumps([_encode_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, expected_length: int) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != expected_length:
+            raise ValueError("cursor does not match the sort order")
+        return [_decode_value(value) for value in values]
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(
+            status_code=400,
+            detail={"success": False, "message": "Invalid pagination cursor"},
+        )
+
+
+def keyset_filter(sort: List[Tuple[str, int]], values: Sequence[Any]) -> Dict:
+    """
+    Match documents strictly after `values` in the given sort order, i.e.
+    (a > x) or (a == x and b > y) ... with the comparison flipped for
+    descending fields.
+    """
+    clauses = []
+    for position, (field, direction) in enumerate(sort):
+        clause = {sort[i][0]: values[i] for i in range(position)}
+        clause[field] = {"$gt" if direction == ASCENDING else "$lt": values[position]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+
+def _sort_value(document: Dict, field: str) -> Any:
+    value = document
+    for part in field.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+async def paginate(
+    collection,
+    query: Dict,
+    page: PageParams,
+    sort: List[Tuple[str, int]] = ID_ASC,
+    projection: Optional[Dict] = None,
+) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Fetch one page of `query` ordered by `sort` and return it together with
+    the cursor for the next page (None when this is the last page). Documents
+    missing a sort field are left out: a cursor could never reach them, so
+    they would only ever show up on the first page.
+    """
+    clauses = [query]
+    clauses.extend({field: {"$ne": None}} for field, _ in sort if field != "_id")
+    if page.cursor:
+        values = decode_cursor(page.cursor, len(sort))
+        clauses.append(keyset_filter(sort, values))
+    filters = clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+    documents = (
+        await collection.find(filters, projection)
+        .sort(sort)
+        .limit(page.limit + 1)
+        .to_list(length=page.limit + 1)
+    )
+
+    next_cursor = None
+    if len(documents) > page.limit:
+        documents = documents[: page.limit]
+        last = documents[-1]
+        next_cursor = encode_cursor([_sort_value(last, field) for field, _ in sort])
+    return documents, next_cursor
@@ -0,0 +1,259 @@
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class PaystackSettings:
+    # Point this at the local stub (scripts/paystack_stub.py) for offline load tests
+    BASE_URL = os.getenv("PAYSTACK_BASE_URL", "https://api.paystack.co")
+    SECRET_KEY = os.getenv("PAYMENT_SECRET_KEY")
+    CONNECT_TIMEOUT_SECONDS = float(os.getenv("PAYSTACK_CONNECT_TIMEOUT_SECONDS", "3"))
+    READ_TIMEOUT_SECONDS = float(os.getenv("PAYSTACK_READ_TIMEOUT_SECONDS", "10"))
+    MAX_CONNECTIONS = int(os.getenv("PAYSTACK_MAX_CONNECTIONS", "50"))
+    MAX_KEEPALIVE_CONNECTIONS = int(
+        os.getenv("PAYSTACK_MAX_KEEPALIVE_CONNECTIONS", "20")
+    )
+    MAX_RETRIES = int(os.getenv("PAYSTACK_MAX_RETRIES", "2"))
+    RETRY_BACKOFF_SECONDS = float(os.getenv("PAYSTACK_RETRY_BACKOFF_SECONDS", "0.2"))
+    BREAKER_FAILURE_THRESHOLD = int(
+        os.getenv("PAYSTACK_BREAKER_FAILURE_THRESHOLD", "5")
+    )
+    BREAKER_RESET_SECONDS = float(os.getenv("PAYSTACK_BREAKER_RESET_SECONDS", "30"))
+
+
+class PaystackError(Exception):
+    """Paystack answered with an error, or could not be used at all."""
+
+    def __init__(
+        self, message: str, status_code: int = 502, payload: Optional[Any] = None
+    ):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.payload = payload
+
+
+class PaystackUnavailable(PaystackError):
+    """Paystack is unreachable or the circuit breaker is open."""
+
+    def __init__(self, message: str):
+        super().__init__(message, status_code=503)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_seconds`; then lets a single trial call through (half-open) and
+    closes again if it succeeds.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow_request(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(
+                    "Paystack circuit opened after %d failures", self.failures
+                )
+            self.opened_at = time.monotonic()
+
+    def release_trial(self) -> None:
+        """
+        End a half-open trial that recorded no outcome (cancelled, or an
+        error that says nothing about Paystack's health), so the next call
+        becomes the trial instead of every call being rejected.
+        """
+        self._trial_in_flight = False
+
+
+class PaystackClient:
+    """Shared, pooled async client for the Paystack REST API."""
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self.breaker = CircuitBreaker(
+            PaystackSettings.BREAKER_FAILURE_THRESHOLD,
+            PaystackSettings.BREAKER_RESET_SECONDS,
+        )
+
+    async def start(self) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=PaystackSettings.BASE_URL,
+                headers={
+                    "Authorization": f"Bearer {PaystackSettings.SECRET_KEY}",
+                    "Content-Type": "application/json",
+                },
+                timeout=httpx.Timeout(
+                    PaystackSettings.READ_TIMEOUT_SECONDS,
+                    connect=PaystackSettings.CONNECT_TIMEOUT_SECONDS,
+                ),
+                limits=httpx.Limits(
+                    max_connections=PaystackSettings.MAX_CONNECTIONS,
+                    max_keepalive_connections=PaystackSettings.MAX_KEEPALIVE_CONNECTIONS,
+                ),
+            )
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        # Full jitter keeps retrying workers from hitting Paystack in lockstep
+        return random.uniform(0, PaystackSettings.RETRY_BACKOFF_SECONDS * 2**attempt)
+
+    @staticmethod
+    def _body(response: httpx.Response) -> Dict:
+        try:
+            return response.json()
+        except ValueError:
+            return {"message": response.text}
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: Optional[Dict] = None,
+        json: Optional[Dict] = None,
+        idempotent: bool = True,
+        timeout: Optional[float] = None,
+    ) -> Dict:
+        """
+        Send one API call with bounded retries. Non-idempotent calls are only
+        retried when the request never reached Paystack (connect failures).
+        """
+        await self.start()
+        request_timeout = httpx.USE_CLIENT_DEFAULT if timeout is None else timeout
+        attempt = 0
+        while True:
+            trial = self.breaker.state == "half_open"
+            if not self.breaker.allow_request():
+                raise PaystackUnavailable("Paystack is temporarily unavailable")
+
+            try:
+                response = await self._client.request(
+                    method,
+                    path,
+                    params=params,
+                    json=json,
+                    timeout=request_timeout,
+                )
+            except httpx.TransportError as e:
+                self.breaker.record_failure()
+                not_sent = isinstance(
+                    e, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+                )
+                if (idempotent or not_sent) and attempt < PaystackSettings.MAX_RETRIES:
+                    await asyncio.sleep(self._backoff(attempt))
+                    attempt += 1
+                    continue
+                raise PaystackUnavailable(f"Could not reach Paystack: {e!r}")
+            except BaseException:
+                if trial:
+                    self.breaker.release_trial()
+                raise
+
+            if response.status_code >= 500:
+                self.breaker.record_failure()
+                if idempotent and attempt < PaystackSettings.MAX_RETRIES:
+                    await asyncio.sleep(self._backoff(attempt))
+                    attempt += 1
+                    continue
+                raise PaystackError(
+                    f"Paystack returned a server error ({response.status_code})",
+                    payload=self._body(response),
+                )
+
+            self.breaker.record_success()
+            body = self._body(response)
+            if response.status_code >= 400:
+                raise PaystackError(
+                    body.get("message", "Paystack request failed"),
+                    status_code=response.status_code,
+                    payload=body,
+                )
+            return body
+
+    async def initialize_transaction(self, payment_data: Dict) -> Dict:
+        body = await self._request(
+            "POST", "/transaction/initialize", json=payment_data, idempotent=False
+        )
+        return body.get("data") or {}
+
+    async def list_banks(self, country: str = "nigeria") -> List[Dict]:
+        body = await self._request("GET", "/bank", params={"country": country})
+        return body.get("data") or []
+
+    async def resolve_account(self, account_number: str, bank_code: str) -> Dict:
+        body = await self._request(
+            "GET",
+            "/bank/resolve",
+            params={"account_number": account_number, "bank_code": bank_code},
+        )
+        return body.get("data") or {}
+
+    def stats(self) -> Dict:
+        return {
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+        }
+
+
+paystack_client = PaystackClient()
+
+
+def verify_webhook_signature(body: bytes, signature: Optional[str]) -> bool:
+    """
+    Paystack signs each webhook with the HMAC-SHA512 of the raw request body,
+    keyed with the secret key, in the x-paystack-signature header.
+    """
+    if not signature or not PaystackSettings.SECRET_KEY:
+        return False
+    expected = hmac.new(
+        PaystackSettings.SECRET_KEY.encode(), body, hashlib.sha512
+    ).hexdigest()
+    return hmac.compare_digest(expected, signature)
@@ -1,25 +1,222 @@
+import asyncio
+import logging
 import os
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
 import httpx
 from dotenv import load_dotenv
 from fastapi import HTTPException
 
+from app.general.utils.database import NEXTCHOW_COLLECTIONS
+
 load_dotenv()
+
+logger = logging.getLogger(__name__)
+
 FCM_SERVER_KEY = os.getenv("FCM_SERVER_KEY")
 
 
-async def send_push_notification(device_token: str, title: str, body: str):
-    """Send a push notification using FCM."""
-    headers = {
-        "Authorization": f"key={FCM_SERVER_KEY}",
-        "Content-Type": "application/json",
-    }
-    payload = {"to": device_token, "notification": {"title": title, "body": body}}
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "https://fcm.googleapis.com/fcm/send", json=payload, headers=headers
+class PushSettings:
+    FCM_URL = os.getenv("FCM_URL", "https://fcm.googleapis.com/fcm/send")
+    TIMEOUT_SECONDS = float(os.getenv("FCM_TIMEOUT_SECONDS", "10"))
+    MAX_CONNECTIONS = int(os.getenv("FCM_MAX_CONNECTIONS", "20"))
+    # FCM accepts at most 1000 registration_ids per multicast request
+    MAX_TOKENS_PER_REQUEST = int(os.getenv("FCM_MAX_TOKENS_PER_REQUEST", "1000"))
+    # How long identical notifications wait to be merged into one request
+    BATCH_WINDOW_SECONDS = float(os.getenv("FCM_BATCH_WINDOW_MS", "20")) / 1000
+
+
+# FCM result errors meaning the token will never work again
+INVALID_TOKEN_ERRORS = {"NotRegistered", "InvalidRegistration", "MismatchSenderId"}
+
+
+class PushError(Exception):
+    """FCM rejected the whole request or could not be reached."""
+
+
+async def register_device_token(
+    db, token: str, user_id: str, user_type: str, platform: Optional[str] = None
+) -> None:
+    # Keyed by token: a device that changes hands moves to the new user
+    now = datetime.now()
+    await db[NEXTCHOW_COLLECTIONS.DEVICE_TOKENS].update_one(
+        {"_id": token},
+        {
+            "$set": {
+                "user_id": user_id,
+                "user_type": user_type,
+                "platform": platform,
+                "updated_at": now,
+            },
+            "$setOnInsert": {"created_at": now},
+        },
+        upsert=True,
+    )
+
+
+async def device_tokens_for(db, user_ids: Iterable[str]) -> List[str]:
+    cursor = db[NEXTCHOW_COLLECTIONS.DEVICE_TOKENS].find(
+        {"user_id": {"$in": [str(user_id) for user_id in user_ids]}}, {"_id": 1}
+    )
+    return [doc["_id"] async for doc in cursor]
+
+
+async def prune_device_tokens(db, tokens: Iterable[str]) -> None:
+    tokens = list(tokens)
+    if tokens:
+        await db[NEXTCHOW_COLLECTIONS.DEVICE_TOKENS].delete_many(
+            {"_id": {"$in": tokens}}
         )
+        logger.info("Pruned %d invalid device tokens", len(tokens))
+
+
+class FCMPusher:
+    """
+    Long-lived FCM client that sends one notification to many devices per
+    request. Sends of the same notification that arrive within
+    BATCH_WINDOW_SECONDS of each other are merged into a single multicast.
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        # (title, body) -> tokens waiting for the next flush, and their futures
+        self._pending: Dict[
+            Tuple[str, str], List[Tuple[List[str], asyncio.Future]]
+        ] = {}
+        self._timers: Dict[Tuple[str, str], asyncio.TimerHandle] = {}
+        # Referenced until done so the loop cannot drop a flush mid-flight
+        self._flushes: Set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=PushSettings.TIMEOUT_SECONDS,
+                limits=httpx.Limits(max_connections=PushSettings.MAX_CONNECTIONS),
+                headers={
+                    "Authorization": f"key={FCM_SERVER_KEY}",
+                    "Content-Type": "application/json",
+                },
+            )
+
+    async def aclose(self) -> None:
+        # Send what is still waiting for its batching window before closing
+        for key in list(self._timers):
+            self._timers.pop(key).cancel()
+            self._start_flush(key)
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _multicast(
+        self, tokens: List[str], title: str, body: str
+    ) -> Dict[str, Optional[str]]:
+        """Send one request and return each token's error (None if sent)."""
+        await self.start()
+        payload = {
+            "registration_ids": tokens,
+            "notification": {"title": title, "body": body},
+        }
+        try:
+            response = await self._client.post(PushSettings.FCM_URL, json=payload)
+        except httpx.TransportError as e:
+            raise PushError(f"Could not reach FCM: {e!r}")
         if response.status_code != 200:
-            raise HTTPException(
-                status_code=500, detail="Failed to send push notification"
+            raise PushError(f"FCM returned {response.status_code}: {response.text}")
+
+        # FCM answers with one result per registration_id, in order
+        results = response.json().get("results", [])
+        errors = {token: "MissingResult" for token in tokens}
+        for token, result in zip(tokens, results):
+            errors[token] = (
+                None if "message_id" in result else result.get("error", "Unknown")
+            )
+        return errors
+
+    async def send(self, tokens: List[str], title: str, body: str) -> Dict:
+        """
+        Send to every token, sharing requests with other sends of the same
+        notification in this batching window. Returns {"sent": n,
+        "invalid": [...]} for this call's own tokens only.
+        """
+        tokens = list(dict.fromkeys(tokens))
+        if not tokens:
+            return {"sent": 0, "invalid": []}
+
+        key = (title, body)
+        future = asyncio.get_running_loop().create_future()
+        if key not in self._pending:
+            self._pending[key] = []
+            self._timers[key] = asyncio.get_running_loop().call_later(
+                PushSettings.BATCH_WINDOW_SECONDS, self._start_flush, key
+            )
+        self._pending[key].append((tokens, future))
+        errors = await future
+
+        return {
+            "sent": sum(errors.get(token, "MissingResult") is None for token in tokens),
+            "invalid": [
+                token for token in tokens if errors.get(token) in INVALID_TOKEN_ERRORS
+            ],
+        }
+
+    def _start_flush(self, key: Tuple[str, str]) -> None:
+        self._timers.pop(key, None)
+        task = asyncio.ensure_future(self._flush(key))
+        self._flushes.add(task)
+        task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task: asyncio.Task) -> None:
+        self._flushes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("FCM flush failed", exc_info=task.exception())
+
+    async def _flush(self, key: Tuple[str, str]) -> None:
+        waiters = self._pending.pop(key, [])
+        tokens = list(dict.fromkeys(t for batch, _ in waiters for t in batch))
+        size = PushSettings.MAX_TOKENS_PER_REQUEST
+        chunks = [tokens[i : i + size] for i in range(0, len(tokens), size)]
+        try:
+            outcomes = await asyncio.gather(
+                *(self._multicast(chunk, *key) for chunk in chunks)
             )
+        except Exception as e:
+            for _, future in waiters:
+                if not future.done():
+                    # Each caller raises its own error rather than sharing one
+                    future.set_exception(
+                        PushError(str(e)) if isinstance(e, PushError) else e
+                    )
+            return
+        except BaseException:
+            for _, future in waiters:
+                future.cancel()
+            raise
+
+        errors = {token: error for o in outcomes for token, error in o.items()}
+        for _, future in waiters:
+            if not future.done():
+                future.set_result(errors)
+
+
+fcm_pusher = FCMPusher()
+
+
+async def notify_users(db, user_ids: Iterable[str], title: str, body: str) -> Dict:
+    """Push to every registered device of `user_ids`, pruning dead tokens."""
+    tokens = await device_tokens_for(db, user_ids)
+    result = await fcm_pusher.send(tokens, title, body)
+    await prune_device_tokens(db, result["invalid"])
+    return result
+
+
+async def send_push_notification(device_token: str, title: str, body: str):
+    """Send a push notification using FCM."""
+    try:
+        result = await fcm_pusher.send([device_token], title, body)
+    except PushError:
+        raise HTTPException(status_code=500, detail="Failed to send push notification")
+    if not result["sent"]:
+        raise HTTPException(status_code=500, detail="Failed to send push notification")
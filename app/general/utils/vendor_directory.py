@@ -0,0 +1,136 @@
+"""
+Discovery reads compact vendor cards from `vendor_profile` (one per vendor,
+keyed by the vendor user's _id) instead of the full vendor_users documents.
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.general.utils.database import NEXTCHOW_COLLECTIONS
+from app.general.utils.pagination import PageParams, decode_cursor, encode_cursor
+
+# Fields copied from the vendor user onto the card
+VENDOR_CARD_FIELDS = [
+    "store_name",
+    "description",
+    "address",
+    "location",
+    "profile_picture",
+    "cover_picture",
+    "order_type",
+    "operating_hours",
+    "is_onboarded",
+    "is_approved",
+]
+
+# What a discovery list returns per vendor
+VENDOR_CARD_PROJECTION = {
+    "store_name": 1,
+    "description": 1,
+    "address": 1,
+    "location": 1,
+    "profile_picture": 1,
+    "order_type": 1,
+    "distance_km": 1,
+}
+
+# Only vendors customers may order from show up in discovery
+DISCOVERABLE_VENDORS = {"is_onboarded": True, "is_approved": True}
+
+
+def build_vendor_card(vendor: Dict) -> Dict:
+    card = {field: vendor.get(field) for field in VENDOR_CARD_FIELDS}
+    card["is_onboarded"] = bool(card["is_onboarded"])
+    card["is_approved"] = bool(card["is_approved"])
+    card["updated_at"] = datetime.now()
+    return card
+
+
+async def sync_vendor_card(db, vendor_id) -> Optional[Dict]:
+    """Rebuild the card for `vendor_id` from its vendor_users document."""
+    vendor = await db[NEXTCHOW_COLLECTIONS.VENDOR_USER].find_one(
+        {"_id": vendor_id}, {field: 1 for field in VENDOR_CARD_FIELDS}
+    )
+    if vendor is None or not vendor.get("location"):
+        # A card without a location cannot live in the 2dsphere index
+        await db[NEXTCHOW_COLLECTIONS.VENDOR_PROFILE].delete_one({"_id": vendor_id})
+        return None
+
+    card = build_vendor_card(vendor)
+    await db[NEXTCHOW_COLLECTIONS.VENDOR_PROFILE].update_one(
+        {"_id": vendor_id}, {"$set": card}, upsert=True
+    )
+    return card
+
+
+async def set_vendor_approval(db, vendor_id, approved: bool) -> Optional[Dict]:
+    """
+    Approve or un-approve a vendor and refresh their card, so discovery
+    follows at once. Returns the card, or None if the vendor has none.
+    """
+    await db[NEXTCHOW_COLLECTIONS.VENDOR_USER].update_one(
+        {"_id": vendor_id},
+        {"$set": {"is_approved": approved, "updated_at": datetime.now()}},
+    )
+    return await sync_vendor_card(db, vendor_id)
+
+
+async def find_nearby_vendors(
+    db,
+    longitude: float,
+    latitude: float,
+    radius_km: float,
+    page: PageParams,
+) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Discoverable vendors within `radius_km`, nearest first, as one cursor
+    page. The cursor is the (distance, _id) of the last card returned.
+    """
+    geo_near = {
+        "near": {"type": "Point", "coordinates": [longitude, latitude]},
+        "distanceField": "distance_m",
+        "maxDistance": radius_km * 1000,
+        "query": DISCOVERABLE_VENDORS,
+        "spherical": True,
+    }
+    pipeline = [{"$geoNear": geo_near}]
+
+    if page.cursor:
+        last_distance, last_id = decode_cursor(page.cursor, 2)
+        # minDistance lets the index skip every vendor on earlier pages
+        geo_near["minDistance"] = last_distance
+        pipeline.append(
+            {
+                "$match": {
+                    "$or": [
+                        {"distance_m": {"$gt": last_distance}},
+                        {"_id": {"$gt": last_id}},
+                    ]
+                }
+            }
+        )
+
+    pipeline += [
+        {"$sort": {"distance_m": 1, "_id": 1}},
+        {"$limit": page.limit + 1},
+        {
+            "$addFields": {
+                "distance_km": {"$round": [{"$divide": ["$distance_m", 1000]}, 2]}
+            }
+        },
+        {"$project": {**VENDOR_CARD_PROJECTION, "distance_m": 1}},
+    ]
+
+    cards = (
+        await db[NEXTCHOW_COLLECTIONS.VENDOR_PROFILE]
+        .aggregate(pipeline)
+        .to_list(length=page.limit + 1)
+    )
+
+    next_cursor = None
+    if len(cards) > page.limit:
+        cards = cards[: page.limit]
+        next_cursor = encode_cursor([cards[-1]["distance_m"], cards[-1]["_id"]])
+    for card in cards:
+        card.pop("distance_m", None)
+    return cards, next_cursor
@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from app.general.utils.database import NEXTCHOW_COLLECTIONS
+from app.general.utils.distance import MONGO_SPHERE_RADIUS_KM, haversine_km
+from app.general.utils.pagination import PageParams, decode_cursor, encode_cursor
+from app.general.utils.vendor_directory import (
+    DISCOVERABLE_VENDORS,
+    VENDOR_CARD_PROJECTION,
+    find_nearby_vendors,
+)
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class VendorIndexSettings:
+    # ~5.5 km cells at the equator; a 10 km radius query touches ~25 cells
+    CELL_DEGREES = float(os.getenv("VENDOR_INDEX_CELL_DEGREES", "0.05"))
+    REFRESH_INTERVAL_SECONDS = float(
+        os.getenv("VENDOR_INDEX_REFRESH_INTERVAL_SECONDS", "30")
+    )
+    # Incremental refreshes cannot see deleted cards, so reload fully now and then
+    FULL_RELOAD_SECONDS = float(os.getenv("VENDOR_INDEX_FULL_RELOAD_SECONDS", "600"))
+    # Cards are stamped by different hosts' clocks, so each refresh re-reads
+    # this far behind the newest updated_at seen rather than trusting it
+    REFRESH_OVERLAP_SECONDS = float(
+        os.getenv("VENDOR_INDEX_REFRESH_OVERLAP_SECONDS", "60")
+    )
+    # Older than this and queries go to Mongo instead
+    MAX_STALENESS_SECONDS = float(
+        os.getenv("VENDOR_INDEX_MAX_STALENESS_SECONDS", "120")
+    )
+
+
+class VendorGridIndex:
+    """
+    Per-worker grid of discoverable vendor locations. Vendors are bucketed
+    into CELL_DEGREES squares, so radius and nearest-k queries only measure
+    vendors in the cells around the point. Kept fresh by a background task
+    that pulls cards changed since the last refresh.
+    """
+
+    def __init__(self):
+        self._cells: Dict[Tuple[int, int], set] = {}
+        # vendor_id -> (longitude, latitude, card)
+        self._vendors: Dict[str, Tuple[float, float, Dict]] = {}
+        self._watermark: Optional[datetime] = None
+        self._refreshed_at: Optional[float] = None
+        self._full_reload_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def _cell(self, longitude: float, latitude: float) -> Tuple[int, int]:
+        size = VendorIndexSettings.CELL_DEGREES
+        return int(math.floor(longitude / size)), int(math.floor(latitude / size))
+
+    def _remove(self, vendor_id: str) -> None:
+        entry = self._vendors.pop(vendor_id, None)
+        if entry is not None:
+            cell = self._cells.get(self._cell(entry[0], entry[1]))
+            if cell is not None:
+                cell.discard(vendor_id)
+                if not cell:
+                    del self._cells[self._cell(entry[0], entry[1])]
+
+    def apply(self, card: Dict) -> None:
+        """Insert, move or drop one vendor card."""
+        vendor_id = card["_id"]
+        self._remove(vendor_id)
+        coordinates = (card.get("location") or {}).get("coordinates")
+        discoverable = all(card.get(k) == v for k, v in DISCOVERABLE_VENDORS.items())
+        if not coordinates or not discoverable:
+            return
+        longitude, latitude = coordinates[0], coordinates[1]
+        compact = {k: card.get(k) for k in VENDOR_CARD_PROJECTION if k in card}
+        compact["_id"] = vendor_id
+        self._vendors[vendor_id] = (longitude, latitude, compact)
+        self._cells.setdefault(self._cell(longitude, latitude), set()).add(vendor_id)
+
+    async def load(self, db) -> None:
+        """Rebuild the whole index from vendor_profile."""
+        cards = await self._fetch(db, DISCOVERABLE_VENDORS)
+        # Swapped in without awaiting, so queries never see a half-built index
+        self._cells, self._vendors = {}, {}
+        self._apply_all(cards)
+        self._full_reload_at = time.monotonic()
+
+    async def refresh(self, db) -> None:
+        """
+        Apply cards updated since the last refresh. Re-applying a card seen
+        before is harmless, so the overlap only costs a few extra reads.
+        """
+        if self._watermark is None:
+            await self.load(db)
+            return
+        since = self._watermark - timedelta(
+            seconds=VendorIndexSettings.REFRESH_OVERLAP_SECONDS
+        )
+        self._apply_all(await self._fetch(db, {"updated_at": {"$gt": since}}))
+
+    async def _fetch(self, db, query: Dict) -> List[Dict]:
+        projection = {
+            **VENDOR_CARD_PROJECTION,
+            **{field: 1 for field in DISCOVERABLE_VENDORS},
+            "updated_at": 1,
+        }
+        projection.pop("distance_km", None)
+        return await (
+            db[NEXTCHOW_COLLECTIONS.VENDOR_PROFILE]
+            .find(query, projection)
+            .to_list(length=None)
+        )
+
+    def _apply_all(self, cards: List[Dict]) -> None:
+        for card in cards:
+            self.apply(card)
+            updated_at = card.get("updated_at")
+            if updated_at and (self._watermark is None or updated_at > self._watermark):
+                self._watermark = updated_at
+        self._refreshed_at = time.monotonic()
+
+    def is_fresh(self) -> bool:
+        return (
+            self._refreshed_at is not None
+            and time.monotonic() - self._refreshed_at
+            < VendorIndexSettings.MAX_STALENESS_SECONDS
+        )
+
+    def _cells_within(self, longitude: float, latitude: float, radius_m: float):
+        lat_span = math.degrees(radius_m / (MONGO_SPHERE_RADIUS_KM * 1000))
+        cos_lat = max(math.cos(math.radians(min(89.0, abs(latitude) + lat_span))), 1e-6)
+        lon_span = lat_span / cos_lat
+        x0, y0 = self._cell(longitude - lon_span, latitude - lat_span)
+        x1, y1 = self._cell(longitude + lon_span, latitude + lat_span)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                cell = self._cells.get((x, y))
+                if cell:
+                    yield cell
+
+    def within(
+        self, longitude: float, latitude: float, radius_m: float
+    ) -> List[Tuple[float, str]]:
+        """(distance_m, vendor_id) of vendors within `radius_m`, nearest first."""
+        hits = []
+        for cell in self._cells_within(longitude, latitude, radius_m):
+            for vendor_id in cell:
+                v_lon, v_lat, _ = self._vendors[vendor_id]
+                # Same sphere $geoNear uses, so local and Mongo cursors agree
+                distance = 1000 * haversine_km(
+                    (longitude, latitude), (v_lon, v_lat), MONGO_SPHERE_RADIUS_KM
+                )
+                if distance <= radius_m:
+                    hits.append((distance, vendor_id))
+        hits.sort()
+        return hits
+
+    def nearest(
+        self, longitude: float, latitude: float, k: int, max_radius_m: float
+    ) -> List[Tuple[float, str]]:
+        """The `k` closest vendors, searching outwards until `max_radius_m`."""
+        radius = VendorIndexSettings.CELL_DEGREES * 111320
+        while True:
+            hits = self.within(longitude, latitude, min(radius, max_radius_m))
+            if len(hits) >= k or radius >= max_radius_m:
+                return hits[:k]
+            radius *= 2
+
+    def card(self, vendor_id: str, distance_m: float) -> Dict:
+        card = dict(self._vendors[vendor_id][2])
+        card["distance_km"] = round(distance_m / 1000, 2)
+        return card
+
+    async def _refresh_periodically(self, db) -> None:
+        while True:
+            try:
+                due = time.monotonic() - self._full_reload_at
+                if due >= VendorIndexSettings.FULL_RELOAD_SECONDS:
+                    await self.load(db)
+                else:
+                    await self.refresh(db)
+            except Exception as e:
+                # Queries fall back to Mongo once the index goes stale
+                logger.warning("Vendor index refresh failed: %r", e)
+            await asyncio.sleep(VendorIndexSettings.REFRESH_INTERVAL_SECONDS)
+
+    def start(self, db) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_periodically(db))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict:
+        return {
+            "vendors": len(self._vendors),
+            "cells": len(self._cells),
+            "fresh": self.is_fresh(),
+            "age_seconds": (
+                round(time.monotonic() - self._refreshed_at, 1)
+                if self._refreshed_at is not None
+                else None
+            ),
+        }
+
+
+vendor_index = VendorGridIndex()
+
+
+async def nearby_vendors(
+    db, longitude: float, latitude: float, radius_km: float, page: PageParams
+) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Same contract as find_nearby_vendors (including cursors), answered from
+    the in-memory index while it is fresh and from Mongo otherwise.
+    """
+    if not vendor_index.is_fresh():
+        return await find_nearby_vendors(db, longitude, latitude, radius_km, page)
+
+    hits = vendor_index.within(longitude, latitude, radius_km * 1000)
+    if page.cursor:
+        last = tuple(decode_cursor(page.cursor, 2))
+        hits = [hit for hit in hits if hit > last]
+
+    next_cursor = None
+    if len(hits) > page.limit:
+        hits = hits[: page.limit]
+        next_cursor = encode_cursor(list(hits[-1]))
+    vendors = [vendor_index.card(vendor_id, distance) for distance, vendor_id in hits]
+    return vendors, next_cursor
+
+
+async def nearest_vendors(
+    db, longitude: float, latitude: float, k: int, max_radius_km: float
+) -> List[Dict]:
+    if vendor_index.is_fresh():
+        hits = vendor_index.nearest(longitude, latitude, k, max_radius_km * 1000)
+        return [vendor_index.card(vendor_id, distance) for distance, vendor_id in hits]
+
+    vendors, _ = await find_nearby_vendors(
+        db, longitude, latitude, max_radius_km, PageParams(limit=k, cursor=None)
+    )
+    return vendors
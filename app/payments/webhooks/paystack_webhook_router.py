@@ -0,0 +1,43 @@
+import json
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from pymongo.errors import PyMongoError
+
+from app.general.utils.database import get_database
+from app.general.utils.job_handlers import enqueue_paystack_event
+from app.general.utils.paystack import verify_webhook_signature
+
+paystack_webhook_router = APIRouter(prefix="/payments", tags=["Payments"])
+
+
+@paystack_webhook_router.post("/paystack/webhook")
+async def receive_paystack_webhook(
+    request: Request,
+    x_paystack_signature: str = Header(None),
+    db=Depends(get_database),
+):
+    """
+    Verify a Paystack event and queue it for processing. The response only
+    waits for the event to be stored, so Paystack is acknowledged quickly;
+    redelivered events map to the same job and are applied once.
+    """
+    body = await request.body()
+    if not verify_webhook_signature(body, x_paystack_signature):
+        raise HTTPException(status_code=401, detail="Invalid signature")
+
+    try:
+        event = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid payload")
+    if not isinstance(event, dict) or "event" not in event:
+        raise HTTPException(status_code=400, detail="Invalid payload")
+
+    try:
+        await enqueue_paystack_event(db, event)
+    except PyMongoError as e:
+        # Paystack retries anything but a 2xx
+        raise HTTPException(
+            status_code=500,
+            detail=f"Database error: {str(e)}",
+        )
+    return {"success": True}
@@ -9,9 +9,11 @@ from app.general.utils.database import NEXTCHOW_COLLECTIONS, get_database
 from app.general.utils.oauth_service import (
     create_access_token,
     get_current_user,
-    get_password_hash,
-    verify_password,
+    get_password_hash_async,
+    invalidate_user_cache,
+    verify_password_async,
 )
+from app.general.utils.otp_service import OTPPurpose, consume_otp, issue_otp
 
 rider_auth_router = APIRouter(prefix="/rider", tags=["Rider Authentication"])
 
@@ -30,24 +32,20 @@ async def rider_signup(signup_data: SignUpSchema, db=Depends(get_database)):
             )
 
         # Hash the password
-        hashed_password = get_password_hash(signup_data.password)
+        hashed_password = await get_password_hash_async(signup_data.password)
 
         # Prepare user data
         user_data = signup_data.dict()
         user_data["password"] = hashed_password
 
-        # Generate OTP
-        # otp = generate_otp()
-        otp = "123456"  # For testing, replace with actual OTP generation
-        user_data["otp"] = get_password_hash(otp)
-        user_data["otp_created_at"] = datetime.now()
         data = jsonable_encoder(user_data)
 
-        # Insert user with OTP
+        # Insert user
         result = await db[NEXTCHOW_COLLECTIONS.RIDER_USER].insert_one(data)
 
-        # Send OTP via email (commented out for testing)
-        # await send_reg_otp_mail(signup_data.email, otp)
+        # Generate OTP
+        otp = "123456"  # For testing, replace with `generate_otp()`
+        await issue_otp(db, "rider", OTPPurpose.REGISTRATION, signup_data.email, otp)
 
         return {
             "success": True,
@@ -75,29 +73,21 @@ async def verify_rider_otp(otp_verification: OTPVerification, db=Depends(get_dat
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
-        # Check if OTP is valid and not expired
-        otp_hash = user.get("otp")
-        otp_created_at = user.get("otp_created_at")
-
-        if not otp_hash or not otp_created_at:
-            raise HTTPException(
-                status_code=400,
-                detail="No OTP exists for this user",
-            )
-
-        # Check OTP expiration (15 minutes)
-        if (datetime.now() - otp_created_at).total_seconds() > 900:
-            raise HTTPException(status_code=400, detail="OTP has expired")
-
-        # Verify OTP
-        if not verify_password(otp_verification.otp, otp_hash):
-            raise HTTPException(status_code=400, detail="Invalid OTP")
+        # Verify and consume the OTP
+        await consume_otp(
+            db,
+            "rider",
+            OTPPurpose.REGISTRATION,
+            otp_verification.email,
+            otp_verification.otp,
+        )
 
         # Mark user as verified
         await db[NEXTCHOW_COLLECTIONS.RIDER_USER].update_one(
             {"email": otp_verification.email},
-            {"$set": {"is_verified": True}, "$unset": {"otp": 1, "otp_created_at": 1}},
+            {"$set": {"is_verified": True}},
         )
+        invalidate_user_cache(user["_id"])
 
         # Create access token
         access_token = create_access_token({"sub": str(user["_id"])})
@@ -133,7 +123,7 @@ async def rider_login(login_data: LoginSchema, db=Depends(get_database)):
             )
 
         # Verify password
-        if not verify_password(login_data.password, user["password"]):
+        if not await verify_password_async(login_data.password, user["password"]):
             raise HTTPException(
                 status_code=401,
                 detail="Invalid credentials",
@@ -187,6 +177,7 @@ async def update_rider_profile(
         result = await db[NEXTCHOW_COLLECTIONS.RIDER_USER].update_one(
             {"_id": user.get("_id")}, {"$set": update_data}
         )
+        invalidate_user_cache(user.get("_id"))
 
         if result.modified_count == 0:
             raise HTTPException(
@@ -1,13 +1,14 @@
-import os
 from datetime import datetime
 
-import requests
 from dotenv import load_dotenv
 from fastapi import APIRouter, Depends, HTTPException, status
 from pymongo.errors import PyMongoError
 
+from app.general.utils.account_resolver import account_resolver
+from app.general.utils.bank_list import bank_list_cache
 from app.general.utils.database import NEXTCHOW_COLLECTIONS, get_database
 from app.general.utils.oauth_service import get_current_user
+from app.general.utils.paystack import PaystackError
 from app.riders.schemas import BankAccountSchema, ResolveBankAccountSchema
 
 vendor_payment_router = APIRouter(prefix="/rider", tags=["Rider Payment Management"])
@@ -136,28 +137,23 @@ async def get_all_nigerian_banks(
     current_user: dict = Depends(get_current_user),
 ):
     try:
-        url = "https://api.paystack.co/bank"
-        response = requests.get(url)
-
-        if response.status_code == 200:
-            all_banks = response.json()
-            return {
-                "status_code": status.HTTP_200_OK,
-                "status": "success",
-                "message": "Successfully deleted payment information",
-                "data": all_banks.get("data"),
-            }
-
-        else:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail={
-                    "status": "error",
-                    "message": " Something when wrong",
-                    "data": f"{response.json()}",
-                },
-            )
+        all_banks = await bank_list_cache.get()
+        return {
+            "status_code": status.HTTP_200_OK,
+            "status": "success",
+            "message": "Successfully deleted payment information",
+            "data": all_banks,
+        }
 
+    except PaystackError as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail={
+                "status": "error",
+                "message": " Something when wrong",
+                "data": f"{e.payload or e.message}",
+            },
+        )
     except Exception as e:
         return HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -174,33 +170,26 @@ async def resolve_nigerian_account(
     bank_data: ResolveBankAccountSchema,
 ):
     try:
-        url = f"https://api.paystack.co/bank/resolve?account_number={bank_data.account_number}&bank_code={bank_data.bank_code}"
-        headers = {
-            "Authorization": f"Bearer {os.getenv('PAYMENT_SECRET_KEY')}",
-            "Content-Type": "application/json",
-        }
-        response = requests.get(url, headers=headers)
-
-        if response.status_code == 200:
-            bank_details = response.json()
-
-            return {
-                "status_code": status.HTTP_200_OK,
-                "status": "success",
-                "message": "Account details retrieved successfully",
-                "data": bank_details.get("data"),
-            }
+        bank_details = await account_resolver.resolve(
+            bank_data.account_number, bank_data.bank_code
+        )
 
-        else:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail={
-                    "status": "error",
-                    "message": " Something when wrong",
-                    "data": f"{response.json()}",
-                },
-            )
+        return {
+            "status_code": status.HTTP_200_OK,
+            "status": "success",
+            "message": "Account details retrieved successfully",
+            "data": bank_details,
+        }
 
+    except PaystackError as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail={
+                "status": "error",
+                "message": " Something when wrong",
+                "data": f"{e.payload or e.message}",
+            },
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -4,12 +4,14 @@ from fastapi import APIRouter, Depends, HTTPException
 from pymongo.errors import PyMongoError
 
 from app.general.utils.database import NEXTCHOW_COLLECTIONS, get_database
-from app.general.utils.mail_sender import send_password_reset_otp
+from app.general.utils.job_handlers import enqueue_email
 from app.general.utils.oauth_service import (
     get_current_user,
-    get_password_hash,
-    verify_password,
+    get_password_hash_async,
+    invalidate_user_cache,
+    verify_password_async,
 )
+from app.general.utils.otp_service import OTPPurpose, consume_otp, issue_otp
 from app.vendors.schemas import (
     ChangePasswordSchema,
     OTPVerification,
@@ -42,22 +44,19 @@ async def request_password_reset(
         # Generate OTP
         otp = "123456"
 
-        # Hash OTP for secure storage
-        otp_hash = get_password_hash(otp)
-
-        # Update user with OTP and creation time
-        await db[NEXTCHOW_COLLECTIONS.VENDOR_USER].update_one(
-            {"email": reset_request.email},
-            {
-                "$set": {
-                    "password_reset_otp": otp_hash,
-                    "password_reset_otp_created_at": datetime.now(),
-                }
-            },
+        # Store OTP (throttled per email)
+        await issue_otp(
+            db, "vendor", OTPPurpose.PASSWORD_RESET, reset_request.email, otp
         )
 
-        # Send OTP via email
-        await send_password_reset_otp(reset_request.email, otp)
+        # Send OTP via email in the background
+        await enqueue_email(
+            db,
+            "password_reset_otp",
+            reciever_email=reset_request.email,
+            reciever_name=user.get("first_name", ""),
+            otp=otp,
+        )
 
         return {"success": True, "message": "Password reset OTP sent to your email"}
 
@@ -83,32 +82,14 @@ async def verify_password_reset_otp(
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
-        # Check if OTP exists and is not expired
-        otp_hash = user.get("password_reset_otp")
-        otp_created_at = user.get("password_reset_otp_created_at")
-
-        if not otp_hash or not otp_created_at:
-            raise HTTPException(
-                status_code=400,
-                detail="No password reset OTP exists",
-            )
-
-        # Check OTP expiration (e.g., 15 minutes)
-        if (datetime.now() - otp_created_at).total_seconds() > 900:
-            await db[NEXTCHOW_COLLECTIONS.VENDOR_USER].update_one(
-                {"email": otp_verification.email},
-                {
-                    "$unset": {
-                        "password_reset_otp": 1,
-                        "password_reset_otp_created_at": 1,
-                    }
-                },
-            )
-            raise HTTPException(status_code=400, detail="OTP has expired")
-
-        # Verify OTP
-        if not verify_password(otp_verification.otp, otp_hash):
-            raise HTTPException(status_code=400, detail="Invalid OTP")
+        # Verify and consume the OTP
+        await consume_otp(
+            db,
+            "vendor",
+            OTPPurpose.PASSWORD_RESET,
+            otp_verification.email,
+            otp_verification.otp,
+        )
 
         # Mark OTP as verified
         await db[NEXTCHOW_COLLECTIONS.VENDOR_USER].update_one(
@@ -149,7 +130,7 @@ async def reset_password(password_reset: PasswordResetSchema, db=Depends(get_dat
             )
 
         # Check if new password is different from current password
-        if verify_password(password_reset.new_password, user["password"]):
+        if await verify_password_async(password_reset.new_password, user["password"]):
             raise HTTPException(
                 status_code=400,
                 detail={
@@ -159,7 +140,7 @@ async def reset_password(password_reset: PasswordResetSchema, db=Depends(get_dat
             )
 
         # Hash new password
-        new_password_hash = get_password_hash(password_reset.new_password)
+        new_password_hash = await get_password_hash_async(password_reset.new_password)
 
         # Update password and clean up reset-related fields
         result = await db[NEXTCHOW_COLLECTIONS.VENDOR_USER].update_one(
@@ -173,6 +154,7 @@ async def reset_password(password_reset: PasswordResetSchema, db=Depends(get_dat
                 },
             },
         )
+        invalidate_user_cache(user["_id"])
 
         if result.modified_count == 0:
             raise HTTPException(
@@ -205,7 +187,7 @@ async def change_password(
         )
 
         # Verify current password
-        if not verify_password(
+        if not await verify_password_async(
             password_change.current_password, current_user["password"]
         ):
             raise HTTPException(
@@ -214,7 +196,9 @@ async def change_password(
             )
 
         # Check if new password is different from current password
-        if verify_password(password_change.new_password, current_user["password"]):
+        if await verify_password_async(
+            password_change.new_password, current_user["password"]
+        ):
             raise HTTPException(
                 status_code=400,
                 detail={
@@ -224,13 +208,14 @@ async def change_password(
             )
 
         # Hash new password
-        new_password_hash = get_password_hash(password_change.new_password)
+        new_password_hash = await get_password_hash_async(password_change.new_password)
 
         # Update password
         result = await db[NEXTCHOW_COLLECTIONS.VENDOR_USER].update_one(
             {"_id": user.get("_id")},
             {"$set": {"password": new_password_hash, "updated_at": datetime.now()}},
         )
+        invalidate_user_cache(user.get("_id"))
 
         if result.modified_count == 0:
             raise HTTPException(
@@ -9,13 +9,22 @@ from app.general.utils.helpers import *
 from app.general.utils.oauth_service import (
     create_access_token,
     get_current_user,
-    get_password_hash,
-    verify_password,
+    get_password_hash_async,
+    invalidate_user_cache,
+    verify_password_async,
 )
+from app.general.utils.otp_service import OTPPurpose, consume_otp, issue_otp
+from app.general.utils.push_notification import register_device_token
+from app.general.utils.vendor_directory import sync_vendor_card
 from app.vendors.models import *
 from app.vendors.models import SignUpModel
 from app.vendors.schemas import *
-from app.vendors.schemas import LoginSchema, OTPVerification, SignUpSchema
+from app.vendors.schemas import (
+    DeviceTokenSchema,
+    LoginSchema,
+    OTPVerification,
+    SignUpSchema,
+)
 
 vendor_auth_router = APIRouter(prefix="/vendor", tags=["Vendor Authentication"])
 
@@ -34,29 +43,20 @@ async def vendor_signup(signup_data: SignUpSchema, db=Depends(get_database)):
             )
 
         # Hash the password
-        hashed_password = get_password_hash(signup_data.password)
+        hashed_password = await get_password_hash_async(signup_data.password)
 
         # Prepare user data
         user_data = jsonable_encoder(SignUpModel(**signup_data.dict()))
 
-        # Generate OTP
-        # otp = generate_otp()
-        user_data.update(
-            {
-                "password": hashed_password,
-                "otp": get_password_hash(
-                    "1234"
-                ),  # Replace with `generate_otp()` if needed
-                "otp_created_at": datetime.now(),
-            }
-        )
+        user_data["password"] = hashed_password
         # data=jsonable_encoder(jsonable_encoder)
 
-        # Insert user with OTP
+        # Insert user
         result = await db[NEXTCHOW_COLLECTIONS.VENDOR_USER].insert_one(user_data)
 
-        # Send OTP via email
-        # await send_reg_otp_mail(signup_data.email, otp)
+        # Generate OTP
+        otp = "1234"  # Replace with `generate_otp()` if needed
+        await issue_otp(db, "vendor", OTPPurpose.REGISTRATION, signup_data.email, otp)
 
         return {
             "success": True,
@@ -84,29 +84,21 @@ async def verify_otp(otp_verification: OTPVerification, db=Depends(get_database)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
-        # Check if OTP is valid and not expired
-        otp_hash = user.get("otp")
-        otp_created_at = user.get("otp_created_at")
-
-        if not otp_hash or not otp_created_at:
-            raise HTTPException(
-                status_code=400,
-                detail="No OTP exists for this user",
-            )
-
-        # Check OTP expiration (e.g., 15 minutes)
-        if (datetime.now() - otp_created_at).total_seconds() > 900:
-            raise HTTPException(status_code=400, detail="OTP has expired")
-
-        # Verify OTP
-        if not verify_password(otp_verification.otp, otp_hash):
-            raise HTTPException(status_code=400, detail="Invalid OTP")
+        # Verify and consume the OTP
+        await consume_otp(
+            db,
+            "vendor",
+            OTPPurpose.REGISTRATION,
+            otp_verification.email,
+            otp_verification.otp,
+        )
 
         # Mark user as verified
         await db[NEXTCHOW_COLLECTIONS.VENDOR_USER].update_one(
             {"email": otp_verification.email},
-            {"$set": {"is_verified": True}, "$unset": {"otp": 1, "otp_created_at": 1}},
+            {"$set": {"is_verified": True}},
         )
+        invalidate_user_cache(user["_id"])
 
         # Create access token
         access_token = create_access_token({"id": str(user["_id"])})
@@ -161,6 +153,7 @@ async def complete_vendor_profile(
                 }
             },
         )
+        invalidate_user_cache(user.get("_id"))
 
         if result.modified_count == 0:
             raise HTTPException(
@@ -168,6 +161,9 @@ async def complete_vendor_profile(
                 detail="Profile could not be updated",
             )
 
+        # Refresh the vendor's card used by customer discovery
+        await sync_vendor_card(db, user.get("_id"))
+
         return {"success": True, "message": "Vendor profile completed successfully"}
 
     except PyMongoError as e:
@@ -194,7 +190,7 @@ async def vendor_login(login_data: LoginSchema, db=Depends(get_database)):
             )
 
         # Verify password
-        if not verify_password(login_data.password, user["password"]):
+        if not await verify_password_async(login_data.password, user["password"]):
             return HTTPException(
                 status_code=401,
                 detail="Invalid credentials",
@@ -250,3 +246,24 @@ async def get_vendor_profile(
         )
     except Exception as e:
         raise e
+
+
+@vendor_auth_router.post("/devices")
+async def register_vendor_device(
+    device: DeviceTokenSchema,
+    user: dict = Depends(get_current_user),
+    db=Depends(get_database),
+):
+    try:
+        await register_device_token(
+            db, device.token, str(user["_id"]), "vendor", device.platform
+        )
+        return {"success": True, "message": "Device registered for notifications"}
+
+    except PyMongoError as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Database error: {str(e)}",
+        )
+    except Exception as e:
+        raise e
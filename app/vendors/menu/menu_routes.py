@@ -1,3 +1,5 @@
+from typing import Dict
+
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.encoders import jsonable_encoder
 from pymongo.errors import PyMongoError
@@ -5,6 +7,7 @@ from pymongo.errors import PyMongoError
 from app.general.utils.database import NEXTCHOW_COLLECTIONS, get_database
 from app.general.utils.helpers import *
 from app.general.utils.oauth_service import get_current_user
+from app.general.utils.pagination import PageParams, paginate
 from app.vendors.models import *
 from app.vendors.schemas import *
 
@@ -42,16 +45,15 @@ async def add_ride(
 # Fetch all menus for a vendor
 @menus_router.get("/menus")
 async def fetch_menus(
+    page: PageParams = Depends(),
     user: dict = Depends(get_current_user),
     db=Depends(get_database),
 ):
     try:
-        menus = (
-            await db[NEXTCHOW_COLLECTIONS.MENU]
-            .find({"user_id": user.get("_id")})
-            .to_list(length=100)
+        menus, next_cursor = await paginate(
+            db[NEXTCHOW_COLLECTIONS.MENU], {"user_id": user.get("_id")}, page
         )
-        return {"success": True, "data": menus}
+        return {"success": True, "data": menus, "next_cursor": next_cursor}
     except PyMongoError as e:
         raise HTTPException(
             status_code=500,
@@ -71,8 +73,12 @@ async def update_menu(
 ):
     try:
         menu_data = jsonable_encoder(menu_data)
-        result = await db[NEXTCHOW_COLLECTIONS.VENDOR_MENU].update_one(
-            {"_id": ObjectId(menu_id), "user_id": user.get("_id")}, {"$set": menu_data}
+        # The path decides which menu is updated, never the body
+        menu_data.pop("_id", None)
+        result = await update_priced(
+            db[NEXTCHOW_COLLECTIONS.MENU],
+            {"_id": {"$in": id_query_values([menu_id])}, "user_id": user.get("_id")},
+            menu_data,
         )
         if result.modified_count:
             return {"success": True, "message": "Menu successfully updated"}
@@ -151,16 +157,15 @@ async def add_category(
 # Fetch all categories for a vendor
 @categories_router.get("/categories")
 async def fetch_categories(
+    page: PageParams = Depends(),
     user: dict = Depends(get_current_user),
     db=Depends(get_database),
 ):
     try:
-        categories = (
-            await db[NEXTCHOW_COLLECTIONS.MENU_CATEGORY]
-            .find({"user_id": user.get("_id")})
-            .to_list(length=100)
+        categories, next_cursor = await paginate(
+            db[NEXTCHOW_COLLECTIONS.MENU_CATEGORY], {"user_id": user.get("_id")}, page
         )
-        return {"success": True, "data": categories}
+        return {"success": True, "data": categories, "next_cursor": next_cursor}
     except PyMongoError as e:
         raise HTTPException(
             status_code=500,
@@ -258,16 +263,15 @@ async def add_packaging(
 # Fetch all packaging for a vendor
 @packaging_router.get("/packaging")
 async def fetch_packaging(
+    page: PageParams = Depends(),
     user: dict = Depends(get_current_user),
     db=Depends(get_database),
 ):
     try:
-        packaging = (
-            await db[NEXTCHOW_COLLECTIONS.MENU_PACKAGING]
-            .find({"user_id": user.get("_id")})
-            .to_list(length=100)
+        packaging, next_cursor = await paginate(
+            db[NEXTCHOW_COLLECTIONS.MENU_PACKAGING], {"user_id": user.get("_id")}, page
         )
-        return {"success": True, "data": packaging}
+        return {"success": True, "data": packaging, "next_cursor": next_cursor}
     except PyMongoError as e:
         raise HTTPException(
             status_code=500,
@@ -287,19 +291,26 @@ async def update_packaging(
 ):
     try:
         packaging_data = jsonable_encoder(packaging_data)
-        result = await db[NEXTCHOW_COLLECTIONS.MENU_PACKAGING].update_one(
-            {"_id": ObjectId(packaging_id), "user_id": user.get("_id")},
-            {"$set": packaging_data},
+        result = await update_priced(
+            db[NEXTCHOW_COLLECTIONS.MENU_PACKAGING],
+            {
+                "_id": {"$in": id_query_values([packaging_id])},
+                "user_id": user.get("_id"),
+            },
+            packaging_data,
         )
         if result.modified_count:
             packaging = await db[NEXTCHOW_COLLECTIONS.MENU_PACKAGING].find_one(
-                {"user_id": user.get("_id")}
+                {
+                    "_id": {"$in": id_query_values([packaging_id])},
+                    "user_id": user.get("_id"),
+                }
             )
 
             return {
                 "success": True,
                 "message": "Packaging successfully updated",
-                "data": packaging,
+                "data": prepare_json(packaging),
             }
         raise HTTPException(
             status_code=404,
@@ -341,3 +352,17 @@ async def delete_packaging(
         )
     except Exception as e:
         raise e
+
+
+async def update_priced(collection, query: Dict, data: Dict):
+    """
+    Apply `data` to the document matching `query`, bumping its price_version
+    when the price changes so carts priced at the old version reprice it.
+    """
+    result = await collection.update_one(
+        {**query, "price": {"$ne": data["price"]}},
+        {"$set": data, "$inc": {"price_version": 1}},
+    )
+    if not result.matched_count:
+        result = await collection.update_one(query, {"$set": data})
+    return result
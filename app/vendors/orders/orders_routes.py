@@ -1,9 +1,15 @@
+import asyncio
+
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.encoders import jsonable_encoder
 from pymongo.errors import PyMongoError
 
 from app.general.utils.database import get_database
 from app.general.utils.helpers import *
+from app.general.utils.job_handlers import enqueue_push
+from app.general.utils.loaders import Loaders, get_loaders
+from app.general.utils.order_hydration import hydrate_orders
+from app.general.utils.pagination import NEWEST_FIRST, PageParams, paginate
 from app.vendors.models import *
 from app.vendors.schemas import *
 
@@ -11,24 +17,14 @@ order_router = APIRouter(prefix="/vendor", tags=["Vendor Orders"])
 
 
 @order_router.post("/orders")
-async def create_order(order_data: OrderSchema, db=Depends(get_database)):
+async def create_order(
+    order_data: OrderSchema,
+    db=Depends(get_database),
+    loaders: Loaders = Depends(get_loaders),
+):
     try:
         # Validate menu and packaging references
-        for pack in order_data.packs:
-            packaging = await db["packaging"].find_one(
-                {"_id": ObjectId(pack.packaging_id)}
-            )
-            if not packaging:
-                raise HTTPException(
-                    status_code=400, detail=f"Packaging {pack.packaging_id} not found"
-                )
-            for item in pack.items:
-                menu = await db["menu"].find_one({"_id": ObjectId(item.menu_id)})
-                if not menu:
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Menu item {item.menu_id} not found",
-                    )
+        await validate_order_references(loaders, order_data)
 
         # Insert the order
         order = jsonable_encoder(order_data)
@@ -43,23 +39,23 @@ async def create_order(order_data: OrderSchema, db=Depends(get_database)):
         )
 
 
-@order_router.get("/orders", response_model=List[OrderSchema])
-async def fetch_orders(db=Depends(get_database)):
+@order_router.get("/orders")
+async def fetch_orders(
+    page: PageParams = Depends(),
+    db=Depends(get_database),
+    loaders: Loaders = Depends(get_loaders),
+):
     try:
-        orders = await db["orders"].find().to_list(length=100)
+        orders, next_cursor = await paginate(db["orders"], {}, page, sort=NEWEST_FIRST)
 
-        # Populate menu and packaging details for each pack
-        for order in orders:
-            for pack in order["packs"]:
-                pack["packaging"] = await db["packaging"].find_one(
-                    {"_id": ObjectId(pack["packaging_id"])}
-                )
-                for item in pack["items"]:
-                    item["menu"] = await db["menu"].find_one(
-                        {"_id": ObjectId(item["menu_id"])}
-                    )
+        # Populate menu and packaging details for the whole page at once
+        await hydrate_orders(loaders, orders)
 
-        return orders
+        return {
+            "success": True,
+            "data": prepare_json(orders),
+            "next_cursor": next_cursor,
+        }
     except PyMongoError as e:
         raise HTTPException(
             status_code=500,
@@ -69,23 +65,14 @@ async def fetch_orders(db=Depends(get_database)):
 
 @order_router.put("/orders/{order_id}")
 async def update_order(
-    order_id: str, order_data: OrderSchema, db=Depends(get_database)
+    order_id: str,
+    order_data: OrderSchema,
+    db=Depends(get_database),
+    loaders: Loaders = Depends(get_loaders),
 ):
     try:
         # Validate menu and packaging references
-        for pack in order_data.packs:
-            packaging = await db["packaging"].find_one({"_id": pack.packaging_id})
-            if not packaging:
-                raise HTTPException(
-                    status_code=400, detail=f"Packaging {pack.packaging_id} not found"
-                )
-            for item in pack.items:
-                menu = await db["menu"].find_one({"_id": item.menu_id})
-                if not menu:
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Menu item {item.menu_id} not found",
-                    )
+        await validate_order_references(loaders, order_data)
 
         # Update the order
         updated_order = jsonable_encoder(order_data)
@@ -126,11 +113,21 @@ async def update_order_status(
     """
     try:
         # Validate the status and update the order
-        result = await db["orders"].update_one(
-            {"_id": ObjectId(order_id)}, {"$set": {"status": status}}
+        order = await db["orders"].find_one_and_update(
+            {"_id": ObjectId(order_id), "status": {"$ne": status}},
+            {"$set": {"status": status}},
+            projection={"customer_id": 1, "user_id": 1},
         )
 
-        if result.modified_count:
+        if order:
+            customer_id = order.get("customer_id") or order.get("user_id")
+            if customer_id:
+                await enqueue_push(
+                    db,
+                    [customer_id],
+                    "Order update",
+                    f"Your order is now {status.value}",
+                )
             return {"success": True, "message": f"Order status updated to {status}"}
 
         raise HTTPException(
@@ -144,16 +141,44 @@ async def update_order_status(
         )
 
 
-@order_router.get("/orders/by-status/{status}", response_model=List[OrderSchema])
-async def fetch_orders_by_status(status: OrderStatus, db=Depends(get_database)):
+@order_router.get("/orders/by-status/{status}")
+async def fetch_orders_by_status(
+    status: OrderStatus, page: PageParams = Depends(), db=Depends(get_database)
+):
     """
-    Fetch all orders with a specific status.
+    Fetch orders with a specific status, newest first.
     """
     try:
-        orders = await db["orders"].find({"status": status}).to_list(length=100)
-        return orders
+        orders, next_cursor = await paginate(
+            db["orders"], {"status": status}, page, sort=NEWEST_FIRST
+        )
+        return {
+            "success": True,
+            "data": prepare_json(orders),
+            "next_cursor": next_cursor,
+        }
     except PyMongoError as e:
         raise HTTPException(
             status_code=500,
             detail=f"Database error: {str(e)}",
         )
+
+
+async def validate_order_references(loaders: Loaders, order_data: OrderSchema):
+    """Raise 400 for the first packaging or menu item that does not exist."""
+    packaging_ids = [pack.packaging_id for pack in order_data.packs]
+    menu_ids = [item.menu_id for pack in order_data.packs for item in pack.items]
+    packaging, menus = await asyncio.gather(
+        loaders.packaging.load_many(packaging_ids), loaders.menu.load_many(menu_ids)
+    )
+    for pack in order_data.packs:
+        if str(pack.packaging_id) not in packaging:
+            raise HTTPException(
+                status_code=400, detail=f"Packaging {pack.packaging_id} not found"
+            )
+        for item in pack.items:
+            if str(item.menu_id) not in menus:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Menu item {item.menu_id} not found",
+                )
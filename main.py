@@ -1,3 +1,7 @@
+import logging
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
@@ -13,6 +17,22 @@ from app.customers.authentication.customer_change_password_router import (
 from app.customers.cart.customer_cart_router import cart_router
 from app.customers.customer_vendors.customer_vendors import customer_vendor_router
 from app.customers.orders.customer_orders_router import customer_order_router
+from app.general.utils import job_handlers  # noqa: F401 (registers job types)
+from app.general.utils.bank_list import bank_list_cache
+from app.general.utils.database import (
+    close_mongo_connection,
+    connect_to_mongo,
+    ensure_transactions_supported,
+    get_database,
+)
+from app.general.utils.indexes import ensure_indexes
+from app.general.utils.jobs import job_runner
+from app.general.utils.mail_sender import mail_dispatcher
+from app.general.utils.oauth_service import password_executor
+from app.general.utils.paystack import paystack_client
+from app.general.utils.push_notification import fcm_pusher
+from app.general.utils.vendor_index import vendor_index
+from app.payments.webhooks.paystack_webhook_router import paystack_webhook_router
 from app.vendors.authentication.change_password_router import vendor_password_router
 from app.vendors.authentication.vendor_authentication_router import vendor_auth_router
 from app.vendors.menu.menu_routes import (
@@ -22,7 +42,33 @@ from app.vendors.menu.menu_routes import (
 )
 from app.vendors.orders.orders_routes import order_router
 
-app = FastAPI()
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    client = await connect_to_mongo()
+    await ensure_transactions_supported(client)
+    db = get_database(client)
+    await ensure_indexes(db)
+    await paystack_client.start()
+    bank_list_cache.start()
+    job_runner.start(db)
+    vendor_index.start(db)
+    try:
+        yield
+    finally:
+        await vendor_index.stop()
+        await job_runner.stop()
+        await bank_list_cache.stop()
+        await paystack_client.aclose()
+        await mail_dispatcher.aclose()
+        await fcm_pusher.aclose()
+        password_executor.shutdown()
+        await close_mongo_connection()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 @app.exception_handler(RequestValidationError)
@@ -76,6 +122,20 @@ async def custom_http_exception_handler(request, exc):
     )
 
 
+@app.get("/api/health")
+async def health():
+    return {
+        "success": True,
+        "data": {
+            "password_executor": password_executor.stats(),
+            "paystack": paystack_client.stats(),
+            "bank_list": bank_list_cache.stats(),
+            "jobs": job_runner.stats(),
+            "vendor_index": vendor_index.stats(),
+        },
+    }
+
+
 # Vendor Routes
 app.include_router(vendor_auth_router, prefix="/api")
 app.include_router(vendor_password_router, prefix="/api")
@@ -93,6 +153,10 @@ app.include_router(customer_order_router, prefix="/api")
 app.include_router(customer_vendor_router, prefix="/api")
 
 
+# Payment Routes
+app.include_router(paystack_webhook_router, prefix="/api")
+
+
 # Rider Routes
 # app.include_router(customer_auth_router, prefix="/api")
 # app.include_router(customer_password_router, prefix="/api")
@@ -0,0 +1,50 @@
+"""
+Give orders without a `created_at` one, so the keyset-paginated order lists
+(which leave such orders out) show them again. ObjectId orders get the time
+embedded in their id; any other id falls back to the epoch and sorts last.
+Safe to re-run.
+
+    python scripts/backfill_order_created_at.py
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.general.utils.database import (  # noqa: E402
+    NEXTCHOW_COLLECTIONS,
+    close_mongo_connection,
+    connect_to_mongo,
+    get_database,
+)
+
+
+async def main():
+    db = get_database(await connect_to_mongo())
+    try:
+        result = await db[NEXTCHOW_COLLECTIONS.ORDERS].update_many(
+            {"created_at": None},
+            [
+                {
+                    "$set": {
+                        "created_at": {
+                            "$convert": {
+                                "input": "$_id",
+                                "to": "date",
+                                "onError": datetime(1970, 1, 1),
+                            }
+                        }
+                    }
+                }
+            ],
+        )
+    finally:
+        await close_mongo_connection()
+    print(f"Updated {result.modified_count} orders")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,37 @@
+"""
+Copy `user_id` into `customer_id` on orders placed through checkout before
+it wrote both, so they show up in the customer order endpoints. Safe to
+re-run. Their lines are not snapshotted: today's prices would not be what
+was charged, so those orders keep being hydrated on read.
+
+    python scripts/backfill_order_customer_ids.py
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.general.utils.database import (  # noqa: E402
+    NEXTCHOW_COLLECTIONS,
+    close_mongo_connection,
+    connect_to_mongo,
+    get_database,
+)
+
+
+async def main():
+    db = get_database(await connect_to_mongo())
+    try:
+        result = await db[NEXTCHOW_COLLECTIONS.ORDERS].update_many(
+            {"customer_id": {"$exists": False}, "user_id": {"$exists": True}},
+            [{"$set": {"customer_id": "$user_id"}}],
+        )
+    finally:
+        await close_mongo_connection()
+    print(f"Updated {result.modified_count} orders")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
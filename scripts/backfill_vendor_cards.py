@@ -0,0 +1,50 @@
+"""
+Build the vendor_profile discovery cards for vendors that completed their
+profile before cards were written on onboarding. Safe to re-run.
+
+    python scripts/backfill_vendor_cards.py
+    python scripts/backfill_vendor_cards.py --since 2024-05-01T00:00
+
+With --since only vendors whose vendor_users document was updated since
+then are re-synced, e.g. after editing approvals outside the app.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.general.utils.database import (  # noqa: E402
+    NEXTCHOW_COLLECTIONS,
+    close_mongo_connection,
+    connect_to_mongo,
+    get_database,
+)
+from app.general.utils.vendor_directory import sync_vendor_card  # noqa: E402
+
+
+async def main(since=None):
+    db = get_database(await connect_to_mongo())
+    synced = 0
+    try:
+        if since is None:
+            query = {"is_onboarded": True}
+        else:
+            # Includes vendors whose card has to go, e.g. an approval revoked
+            query = {"updated_at": {"$gte": since}}
+        cursor = db[NEXTCHOW_COLLECTIONS.VENDOR_USER].find(query, {"_id": 1})
+        async for vendor in cursor:
+            if await sync_vendor_card(db, vendor["_id"]) is not None:
+                synced += 1
+    finally:
+        await close_mongo_connection()
+    print(f"Synced {synced} vendor cards")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None)
+    asyncio.run(main(parser.parse_args().since))
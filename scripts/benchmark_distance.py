@@ -0,0 +1,94 @@
+"""
+Compare the NumPy haversine in app/general/utils/distance.py with geopy's
+geodesic at 1, 1k and 100k vendor-customer pairs around Jos.
+
+    python scripts/benchmark_distance.py
+    python scripts/benchmark_distance.py --sizes 1 1000 --geodesic-limit 1000
+
+geopy at 100k pairs takes a while, so it is measured on --geodesic-limit
+pairs and scaled linearly.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.general.utils.distance import (  # noqa: E402
+    GEODESIC,
+    HAVERSINE,
+    distance_km,
+    pairwise_km,
+)
+
+CENTRE = (8.8914, 9.8182)  # [longitude, latitude]
+
+
+def random_points(count, rng, spread=0.3):
+    return np.column_stack(
+        (
+            CENTRE[0] + rng.uniform(-spread, spread, count),
+            CENTRE[1] + rng.uniform(-spread, spread, count),
+        )
+    )
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 1000, 100000])
+    parser.add_argument("--geodesic-limit", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    print(
+        f"{'pairs':>8} {'haversine':>12} {'geodesic':>12} {'speedup':>9} "
+        f"{'max err %':>10}"
+    )
+    for size in args.sizes:
+        origins, destinations = random_points(size, rng), random_points(size, rng)
+
+        if size == 1:
+            fast, fast_result = best_of(
+                lambda: [distance_km(origins[0], destinations[0], HAVERSINE)],
+                args.repeat,
+            )
+        else:
+            fast, fast_result = best_of(
+                lambda: pairwise_km(origins, destinations, HAVERSINE), args.repeat
+            )
+
+        sample = min(size, args.geodesic_limit)
+        slow, slow_result = best_of(
+            lambda: pairwise_km(origins[:sample], destinations[:sample], GEODESIC),
+            1 if sample > 1000 else args.repeat,
+        )
+        slow *= size / sample
+
+        error = np.max(
+            np.abs(np.asarray(fast_result)[:sample] - slow_result)
+            / np.maximum(slow_result, 1e-9)
+        )
+        print(
+            f"{size:>8} {fast * 1000:>10.3f}ms {slow * 1000:>10.3f}ms "
+            f"{slow / fast:>8.0f}x {error * 100:>9.3f}%"
+            + ("  (geodesic extrapolated)" if sample < size else "")
+        )
+
+
+if __name__ == "__main__":
+    main()
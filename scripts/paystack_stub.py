@@ -0,0 +1,91 @@
+"""
+Local stand-in for the Paystack endpoints the service calls, so payment
+paths can be load-tested without network access or a Paystack account.
+
+    uvicorn --app-dir scripts paystack_stub:app --port 8010
+    PAYSTACK_BASE_URL=http://localhost:8010 uvicorn main:app
+
+STUB_LATENCY_MS adds a fixed delay to every response and STUB_FAILURE_RATE
+(0.0 - 1.0) makes that share of requests return a 500, to exercise the
+client's timeouts, retries and circuit breaker.
+"""
+
+import asyncio
+import os
+import random
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+STUB_LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "50"))
+STUB_FAILURE_RATE = float(os.getenv("STUB_FAILURE_RATE", "0"))
+
+BANKS = [
+    {"id": 1, "name": "Access Bank", "slug": "access-bank", "code": "044"},
+    {"id": 2, "name": "First Bank of Nigeria", "slug": "first-bank", "code": "011"},
+    {"id": 3, "name": "Guaranty Trust Bank", "slug": "gtbank", "code": "058"},
+    {"id": 4, "name": "OPay Digital Services", "slug": "opay", "code": "999992"},
+    {"id": 5, "name": "United Bank For Africa", "slug": "uba", "code": "033"},
+    {"id": 6, "name": "Zenith Bank", "slug": "zenith-bank", "code": "057"},
+]
+
+app = FastAPI(title="Paystack stub")
+
+
+@app.middleware("http")
+async def simulate_network(request: Request, call_next):
+    await asyncio.sleep(STUB_LATENCY_MS / 1000)
+    if random.random() < STUB_FAILURE_RATE:
+        return JSONResponse(
+            status_code=500, content={"status": False, "message": "Stub failure"}
+        )
+    return await call_next(request)
+
+
+@app.get("/bank")
+async def list_banks(country: str = "nigeria"):
+    return {"status": True, "message": "Banks retrieved", "data": BANKS}
+
+
+@app.get("/bank/resolve")
+async def resolve_account(account_number: str, bank_code: str):
+    if len(account_number) != 10 or not account_number.isdigit():
+        return JSONResponse(
+            status_code=422,
+            content={"status": False, "message": "Could not resolve account name"},
+        )
+    return {
+        "status": True,
+        "message": "Account number resolved",
+        "data": {
+            "account_number": account_number,
+            "account_name": f"STUB ACCOUNT {account_number[-4:]}",
+            "bank_id": 1,
+        },
+    }
+
+
+@app.post("/transaction/initialize")
+async def initialize_transaction(request: Request):
+    payload = await request.json()
+    reference = payload.get("reference") or uuid.uuid4().hex[:12]
+    access_code = uuid.uuid4().hex[:15]
+    return {
+        "status": True,
+        "message": "Authorization URL created",
+        "data": {
+            "authorization_url": f"https://checkout.paystack.com/{access_code}",
+            "access_code": access_code,
+            "reference": reference,
+        },
+    }
+
+
+@app.get("/transaction/verify/{reference}")
+async def verify_transaction(reference: str):
+    return {
+        "status": True,
+        "message": "Verification successful",
+        "data": {"reference": reference, "status": "success"},
+    }
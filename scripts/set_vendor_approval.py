@@ -0,0 +1,47 @@
+"""
+Approve a vendor, or withdraw their approval with --revoke, and refresh
+their discovery card so customers see the change straight away.
+
+    python scripts/set_vendor_approval.py <vendor_id>
+    python scripts/set_vendor_approval.py <vendor_id> --revoke
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.general.utils.database import (  # noqa: E402
+    NEXTCHOW_COLLECTIONS,
+    close_mongo_connection,
+    connect_to_mongo,
+    get_database,
+)
+from app.general.utils.helpers import id_query_values  # noqa: E402
+from app.general.utils.vendor_directory import set_vendor_approval  # noqa: E402
+
+
+async def main(vendor_id: str, approved: bool):
+    db = get_database(await connect_to_mongo())
+    try:
+        vendor = await db[NEXTCHOW_COLLECTIONS.VENDOR_USER].find_one(
+            {"_id": {"$in": id_query_values([vendor_id])}}, {"_id": 1}
+        )
+        if vendor is None:
+            sys.exit(f"No vendor {vendor_id}")
+        card = await set_vendor_approval(db, vendor["_id"], approved)
+    finally:
+        await close_mongo_connection()
+    state = "approved" if approved else "unapproved"
+    outcome = "card refreshed" if card is not None else "no card (no location yet)"
+    print(f"Vendor {vendor_id} {state}; {outcome}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("vendor_id")
+    parser.add_argument("--revoke", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.vendor_id, not args.revoke))
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from app.general.utils import account_resolver as resolver_module
+from app.general.utils.account_resolver import AccountResolver
+from app.general.utils.paystack import PaystackError
+
+
+class FakeResolve:
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    async def __call__(self, account_number, bank_code):
+        self.calls += 1
+        await asyncio.sleep(0)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def resolve(monkeypatch):
+    def install(*outcomes):
+        fake = FakeResolve(*outcomes)
+        monkeypatch.setattr(resolver_module.paystack_client, "resolve_account", fake)
+        return fake
+
+    return install
+
+
+@pytest.mark.asyncio
+async def test_resolved_accounts_are_cached_and_lookups_coalesced(resolve):
+    fake = resolve({"account_name": "ADA OBI"})
+    resolver = AccountResolver()
+
+    results = await asyncio.gather(
+        *(resolver.resolve("0123456789", "058") for _ in range(5))
+    )
+    again = await resolver.resolve(" 0123456789 ", "058")
+
+    assert fake.calls == 1
+    assert results == [{"account_name": "ADA OBI"}] * 5
+    assert again == {"account_name": "ADA OBI"}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("status_code", [400, 422])
+async def test_unresolvable_accounts_are_cached_as_fresh_errors(resolve, status_code):
+    fake = resolve(PaystackError("Could not resolve account", status_code))
+    resolver = AccountResolver()
+
+    errors = []
+    for _ in range(3):
+        with pytest.raises(PaystackError) as error:
+            await resolver.resolve("0123456789", "058")
+        errors.append(error.value)
+
+    assert fake.calls == 1
+    assert {e.status_code for e in errors} == {status_code}
+    assert {e.message for e in errors} == {"Could not resolve account"}
+    # Each request raises its own exception, not one shared object
+    assert len({id(e) for e in errors}) == 3
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("status_code", [401, 429, 502, 503])
+async def test_other_errors_are_not_cached(resolve, status_code):
+    fake = resolve(PaystackError("nope", status_code), {"account_name": "ADA OBI"})
+    resolver = AccountResolver()
+
+    with pytest.raises(PaystackError):
+        await resolver.resolve("0123456789", "058")
+
+    assert await resolver.resolve("0123456789", "058") == {"account_name": "ADA OBI"}
+    assert fake.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_callers_get_their_own_copy_of_the_result(resolve):
+    resolve({"account_name": "ADA OBI", "bank": {"code": "058"}})
+    resolver = AccountResolver()
+
+    first, second = await asyncio.gather(
+        resolver.resolve("0123456789", "058"), resolver.resolve("0123456789", "058")
+    )
+    first["account_name"] = "changed"
+    second["bank"]["code"] = "changed"
+
+    cached = await resolver.resolve("0123456789", "058")
+    assert cached == {"account_name": "ADA OBI", "bank": {"code": "058"}}
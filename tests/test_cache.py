@@ -0,0 +1,87 @@
+import pytest
+
+from app.general.utils import cache
+from app.general.utils.cache import TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    # cache.time is only used for monotonic(), so patching it here is safe
+    monkeypatch.setattr(cache, "time", type("time", (), {"monotonic": clock}))
+    return clock
+
+
+def test_entries_expire_after_ttl(clock):
+    entries = TTLCache(maxsize=10, ttl=30)
+    entries.set("a", 1)
+
+    clock.now += 29.9
+    assert entries.get("a") == 1
+    clock.now += 0.1
+    assert entries.get("a") is None
+    assert len(entries) == 0
+
+
+def test_per_entry_ttl_overrides_the_default(clock):
+    entries = TTLCache(maxsize=10, ttl=30)
+    entries.set("short", 1, ttl=5)
+    entries.set("long", 2)
+
+    clock.now += 5
+    assert "short" not in entries
+    assert "long" in entries
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    entries = TTLCache(maxsize=2, ttl=30)
+    entries.set("a", 1)
+    entries.set("b", 2)
+    entries.get("a")
+
+    entries.set("c", 3)
+
+    assert "a" in entries
+    assert "b" not in entries
+    assert "c" in entries
+
+
+def test_set_refreshes_recency_and_value(clock):
+    entries = TTLCache(maxsize=2, ttl=30)
+    entries.set("a", 1)
+    entries.set("b", 2)
+    entries.set("a", 10)
+
+    entries.set("c", 3)
+
+    assert entries.get("a") == 10
+    assert "b" not in entries
+
+
+def test_falsy_values_are_cached(clock):
+    entries = TTLCache(maxsize=10, ttl=30)
+    entries.set("none", None)
+    entries.set("zero", 0)
+
+    assert "none" in entries
+    assert entries.get("none", "missing") is None
+    assert entries.get("zero") == 0
+
+
+def test_pop_and_clear(clock):
+    entries = TTLCache(maxsize=10, ttl=30)
+    entries.set("a", 1)
+    entries.set("b", 2)
+
+    assert entries.pop("a") == 1
+    assert entries.pop("a", "gone") == "gone"
+    entries.clear()
+    assert len(entries) == 0
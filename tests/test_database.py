@@ -0,0 +1,29 @@
+import pytest
+
+from app.general.utils.database import ensure_transactions_supported
+
+
+class FakeClient:
+    def __init__(self, hello):
+        self.admin = self
+        self._hello = hello
+
+    async def command(self, name):
+        assert name == "hello"
+        return self._hello
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "hello",
+    [{"isWritablePrimary": True, "setName": "rs0"}, {"msg": "isdbgrid"}],
+    ids=["replica-set", "sharded"],
+)
+async def test_transactions_supported(hello):
+    await ensure_transactions_supported(FakeClient(hello))
+
+
+@pytest.mark.asyncio
+async def test_standalone_server_fails_at_startup():
+    with pytest.raises(RuntimeError, match="standalone"):
+        await ensure_transactions_supported(FakeClient({"isWritablePrimary": True}))
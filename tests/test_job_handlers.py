@@ -0,0 +1,43 @@
+import pytest
+
+from app.general.utils import job_handlers
+from app.general.utils.mail_sender import MailResult
+
+
+@pytest.fixture
+def send(monkeypatch):
+    results = []
+
+    async def sender(**kwargs):
+        return results.pop(0)
+
+    monkeypatch.setitem(job_handlers.EMAIL_SENDERS, "welcome", sender)
+    return results
+
+
+def email_job():
+    return {"template": "welcome", "kwargs": {"reciever_email": "a@b.c"}}
+
+
+@pytest.mark.asyncio
+async def test_sent_email_completes(send):
+    send.append(MailResult(True))
+
+    await job_handlers.run_email_job(None, email_job())
+
+
+@pytest.mark.asyncio
+async def test_outage_is_retried(send):
+    send.append(MailResult(False, retryable=True, error="503 - busy"))
+
+    with pytest.raises(RuntimeError, match="503"):
+        await job_handlers.run_email_job(None, email_job())
+
+
+@pytest.mark.asyncio
+async def test_rejection_is_dropped_not_retried(send, caplog):
+    send.append(MailResult(False, error="422 - invalid recipient"))
+
+    await job_handlers.run_email_job(None, email_job())
+
+    assert "invalid recipient" in caplog.text
@@ -0,0 +1,167 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo.errors import AutoReconnect, DuplicateKeyError
+
+from app.general.utils import jobs
+from app.general.utils.jobs import JobRunner, JobSettings, enqueue_job, job_handler
+
+
+class UpdateResult:
+    def __init__(self, matched_count):
+        self.matched_count = matched_count
+
+
+class FakeJobs:
+    """The jobs collection, as far as enqueue_job and the lease use it."""
+
+    def __init__(self):
+        self.documents = {}
+        self.renewal_errors = 0
+        self.renewals = []
+        self.settled = []
+        self.lease_token = None
+
+    async def find_one(self, filters, projection=None, session=None):
+        return self.documents.get(filters["_id"])
+
+    async def insert_one(self, document, session=None):
+        if document["_id"] in self.documents:
+            raise DuplicateKeyError("duplicate _id")
+        self.documents[document["_id"]] = document
+
+    async def update_one(self, filters, update):
+        if self.renewal_errors:
+            self.renewal_errors -= 1
+            raise AutoReconnect("primary stepped down")
+        matched = filters["lease_token"] == self.lease_token
+        if "lease_expires_at" in update["$set"]:
+            self.renewals.append(update["$set"]["lease_expires_at"])
+        elif matched:
+            self.settled.append(update["$set"]["status"])
+        return UpdateResult(int(matched))
+
+
+@pytest.fixture
+def db():
+    return {jobs.NEXTCHOW_COLLECTIONS.JOBS: FakeJobs()}
+
+
+@pytest.mark.asyncio
+async def test_dedupe_key_enqueues_once(db):
+    first = await enqueue_job(db, "push", {"n": 1}, dedupe_key="push:1")
+    second = await enqueue_job(db, "push", {"n": 2}, dedupe_key="push:1")
+
+    documents = db[jobs.NEXTCHOW_COLLECTIONS.JOBS].documents
+    assert first == second == "push:1"
+    assert documents["push:1"]["payload"] == {"n": 1}
+
+
+@pytest.mark.asyncio
+async def test_dedupe_in_a_transaction_checks_before_inserting(db):
+    await enqueue_job(db, "push", {}, dedupe_key="push:1")
+
+    # Would raise if it hit the duplicate key inside the transaction
+    assert await enqueue_job(db, "push", {}, dedupe_key="push:1", session=object())
+
+
+@pytest.mark.asyncio
+async def test_duplicate_key_in_a_transaction_is_not_swallowed(db, monkeypatch):
+    collection = db[jobs.NEXTCHOW_COLLECTIONS.JOBS]
+
+    async def raced(document, session=None):
+        raise DuplicateKeyError("inserted by a concurrent transaction")
+
+    monkeypatch.setattr(collection, "insert_one", raced)
+
+    with pytest.raises(DuplicateKeyError):
+        await enqueue_job(db, "push", {}, dedupe_key="push:1", session=object())
+    assert await enqueue_job(db, "push", {}, dedupe_key="push:1") == "push:1"
+
+
+def test_job_handler_registers_with_defaults(monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_HANDLERS", {})
+
+    @job_handler("test.job", concurrency=2)
+    async def handle(db, payload):
+        pass
+
+    registered = jobs.JOB_HANDLERS["test.job"]
+    assert registered.fn is handle
+    assert registered.concurrency == 2
+    assert registered.max_attempts == JobSettings.MAX_ATTEMPTS
+
+
+def test_backoff_grows_exponentially_with_jitter_and_a_cap(monkeypatch):
+    monkeypatch.setattr(JobSettings, "BACKOFF_BASE_SECONDS", 5)
+    monkeypatch.setattr(JobSettings, "BACKOFF_MAX_SECONDS", 60)
+
+    for attempts, ceiling in [(1, 5), (2, 10), (3, 20), (4, 40), (5, 60), (9, 60)]:
+        delays = [JobRunner._backoff(attempts) for _ in range(50)]
+        assert all(ceiling / 2 <= delay <= ceiling for delay in delays)
+
+
+def runner_for(db, monkeypatch, lease_seconds):
+    monkeypatch.setattr(JobSettings, "LEASE_SECONDS", lease_seconds)
+    monkeypatch.setattr(jobs, "LEASE_RENEW_RETRY_SECONDS", 0.01)
+    runner = JobRunner()
+    runner._db = db
+    collection = db[jobs.NEXTCHOW_COLLECTIONS.JOBS]
+    collection.lease_token = "claim-1"
+    job = {
+        "_id": "job-1",
+        "lease_token": "claim-1",
+        "lease_expires_at": datetime.now() + timedelta(seconds=lease_seconds),
+    }
+    return runner, collection, job
+
+
+@pytest.mark.asyncio
+async def test_failed_lease_renewals_are_retried(db, monkeypatch):
+    runner, collection, job = runner_for(db, monkeypatch, lease_seconds=0.3)
+    collection.renewal_errors = 3
+
+    heartbeat = asyncio.ensure_future(runner._renew_lease(job))
+    await asyncio.sleep(0.2)
+    heartbeat.cancel()
+
+    assert collection.renewal_errors == 0
+    assert collection.renewals
+
+
+@pytest.mark.asyncio
+async def test_lease_renewal_gives_up_once_the_lease_lapsed(db, monkeypatch):
+    runner, collection, job = runner_for(db, monkeypatch, lease_seconds=0.09)
+    collection.renewal_errors = 1000
+
+    await asyncio.wait_for(runner._renew_lease(job), timeout=1)
+
+    assert collection.renewals == []
+
+
+@pytest.mark.asyncio
+async def test_lease_renewal_stops_when_the_lease_was_taken(db, monkeypatch):
+    runner, collection, job = runner_for(db, monkeypatch, lease_seconds=0.06)
+    # Reclaimed after a lapse, possibly by this same worker
+    collection.lease_token = "claim-2"
+
+    await asyncio.wait_for(runner._renew_lease(job), timeout=1)
+
+    assert len(collection.renewals) == 1
+
+
+@pytest.mark.asyncio
+async def test_only_the_current_claim_settles_the_job(db):
+    runner = JobRunner()
+    runner._db = db
+    collection = db[jobs.NEXTCHOW_COLLECTIONS.JOBS]
+    collection.lease_token = "claim-2"
+
+    stale = {"_id": "job-1", "lease_token": "claim-1"}
+    await runner._finish(stale, {"status": jobs.JobStatus.DONE})
+    assert collection.settled == []
+
+    current = {"_id": "job-1", "lease_token": "claim-2"}
+    await runner._finish(current, {"status": jobs.JobStatus.DONE})
+    assert collection.settled == [jobs.JobStatus.DONE]
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+
+from app.general.utils.loaders import BatchLoader
+
+
+class FakeCollection:
+    """Answers `_id` `$in` queries from a dict, recording each query."""
+
+    def __init__(self, documents, error=None, delay=0):
+        self.documents = {str(d["_id"]): d for d in documents}
+        self.error = error
+        self.delay = delay
+        self.queries = []
+
+    def find(self, filters, projection=None):
+        self.queries.append(filters["_id"]["$in"])
+        return self
+
+    async def to_list(self, length):
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        ids = {str(value) for value in self.queries[-1]}
+        return [d for key, d in self.documents.items() if key in ids]
+
+
+MENU_ID = ObjectId()
+
+
+def menu_collection(**kwargs):
+    return FakeCollection(
+        [{"_id": MENU_ID, "name": "Jollof"}, {"_id": "plain-id", "name": "Suya"}],
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_loads_in_the_same_tick_share_one_query():
+    collection = menu_collection()
+    loader = BatchLoader(collection, {"name": 1})
+
+    jollof, suya, missing = await asyncio.gather(
+        loader.load(MENU_ID), loader.load("plain-id"), loader.load("gone")
+    )
+
+    assert len(collection.queries) == 1
+    assert jollof["name"] == "Jollof"
+    assert suya["name"] == "Suya"
+    assert missing is None
+
+
+@pytest.mark.asyncio
+async def test_loaded_ids_are_memoized():
+    collection = menu_collection()
+    loader = BatchLoader(collection, {"name": 1})
+
+    await loader.load_many([MENU_ID, "gone"])
+    found = await loader.load_many([str(MENU_ID), MENU_ID, None, "gone"])
+
+    assert len(collection.queries) == 1
+    assert list(found) == [str(MENU_ID)]
+
+
+@pytest.mark.asyncio
+async def test_load_none_does_not_query():
+    collection = menu_collection()
+    loader = BatchLoader(collection, {"name": 1})
+
+    assert await loader.load(None) is None
+    assert await loader.load_many([None]) == {}
+    assert collection.queries == []
+
+
+@pytest.mark.asyncio
+async def test_failed_lookups_are_retried_by_later_loads():
+    collection = menu_collection(error=RuntimeError("db down"))
+    loader = BatchLoader(collection, {"name": 1})
+
+    with pytest.raises(RuntimeError):
+        await loader.load(MENU_ID)
+
+    collection.error = None
+    assert (await loader.load(MENU_ID))["name"] == "Jollof"
+    assert len(collection.queries) == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_strand_the_others():
+    collection = menu_collection(delay=0.01)
+    loader = BatchLoader(collection, {"name": 1})
+
+    impatient = asyncio.ensure_future(loader.load(MENU_ID))
+    patient = asyncio.ensure_future(loader.load_many([MENU_ID, "plain-id"]))
+    await asyncio.sleep(0)
+    impatient.cancel()
+
+    found = await asyncio.wait_for(patient, timeout=1)
+
+    assert set(found) == {str(MENU_ID), "plain-id"}
+    assert impatient.cancelled()
+    assert (await loader.load(MENU_ID))["name"] == "Jollof"
+    assert len(collection.queries) == 1
@@ -0,0 +1,36 @@
+import pytest
+
+from app.general.utils import oauth_service
+from app.general.utils.database import NEXTCHOW_COLLECTIONS
+
+
+class FakeUsers:
+    def __init__(self, user):
+        self.user = user
+        self.reads = 0
+
+    async def find_one(self, filters, projection=None):
+        self.reads += 1
+        return {**self.user, "location": dict(self.user["location"])}
+
+
+@pytest.fixture
+def token(monkeypatch):
+    monkeypatch.setattr(oauth_service, "SECRET_KEY", "test-secret")
+    monkeypatch.setattr(oauth_service, "ALGORITHM", "HS256")
+    oauth_service.invalidate_user_cache("u1")
+    yield "Bearer " + oauth_service.create_access_token({"id": "u1"})
+    oauth_service.invalidate_user_cache("u1")
+
+
+@pytest.mark.asyncio
+async def test_cached_principal_is_not_shared_between_callers(token):
+    users = FakeUsers({"_id": "u1", "location": {"coordinates": [8.9, 9.9]}})
+    db = {NEXTCHOW_COLLECTIONS.VENDOR_USER: users}
+
+    first = await oauth_service.get_current_user(token, db)
+    first["location"]["coordinates"] = [0, 0]
+    second = await oauth_service.get_current_user(token, db)
+
+    assert users.reads == 1
+    assert second["location"]["coordinates"] == [8.9, 9.9]
@@ -0,0 +1,135 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+from pymongo import ASCENDING, DESCENDING
+
+from app.general.utils.pagination import (
+    ID_ASC,
+    NEWEST_FIRST,
+    PageParams,
+    decode_cursor,
+    encode_cursor,
+    keyset_filter,
+    paginate,
+)
+
+
+class RecordingCollection:
+    """Answers find() from a list, keeping the filter it was given."""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.filters = None
+
+    def find(self, filters, projection=None):
+        self.filters = filters
+        return self
+
+    def sort(self, sort):
+        return self
+
+    def limit(self, limit):
+        self.documents = self.documents[:limit]
+        return self
+
+    async def to_list(self, length):
+        return self.documents
+
+
+def test_cursor_round_trips_object_ids_and_datetimes():
+    values = [datetime(2024, 12, 29, 12, 30, 5, 123456), ObjectId()]
+
+    assert decode_cursor(encode_cursor(values), 2) == values
+
+
+def test_cursor_round_trips_plain_values():
+    values = ["pending", 3, None]
+
+    assert decode_cursor(encode_cursor(values), 3) == values
+
+
+def test_cursor_is_url_safe_without_padding():
+    cursor = encode_cursor([ObjectId(), "a/b+c?"])
+
+    assert "=" not in cursor
+    assert "+" not in cursor and "/" not in cursor
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "", encode_cursor({"a": 1}), "%%%"])
+def test_invalid_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, 2)
+    assert error.value.status_code == 400
+
+
+def test_cursor_for_another_sort_order_is_rejected():
+    with pytest.raises(HTTPException):
+        decode_cursor(encode_cursor([ObjectId()]), len(NEWEST_FIRST))
+
+
+def test_keyset_filter_single_ascending_key():
+    last = ObjectId()
+
+    assert keyset_filter(ID_ASC, [last]) == {"$or": [{"_id": {"$gt": last}}]}
+
+
+def test_keyset_filter_newest_first():
+    created_at, last = datetime(2024, 1, 1), ObjectId()
+
+    assert keyset_filter(NEWEST_FIRST, [created_at, last]) == {
+        "$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": last}},
+        ]
+    }
+
+
+def test_keyset_filter_mixed_directions():
+    sort = [("name", ASCENDING), ("price", DESCENDING), ("_id", ASCENDING)]
+
+    assert keyset_filter(sort, ["rice", 1500, 7]) == {
+        "$or": [
+            {"name": {"$gt": "rice"}},
+            {"name": "rice", "price": {"$lt": 1500}},
+            {"name": "rice", "price": 1500, "_id": {"$gt": 7}},
+        ]
+    }
+
+
+@pytest.mark.asyncio
+async def test_paginate_requires_sort_fields_and_returns_next_cursor():
+    documents = [
+        {"_id": ObjectId(), "created_at": datetime(2024, 1, day)} for day in (3, 2, 1)
+    ]
+    collection = RecordingCollection(documents)
+
+    page, next_cursor = await paginate(
+        collection,
+        {"customer_id": "c1"},
+        PageParams(limit=2, cursor=None),
+        sort=NEWEST_FIRST,
+    )
+
+    assert page == documents[:2]
+    assert collection.filters == {
+        "$and": [{"customer_id": "c1"}, {"created_at": {"$ne": None}}]
+    }
+    assert decode_cursor(next_cursor, 2) == [
+        documents[1]["created_at"],
+        documents[1]["_id"],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_paginate_applies_the_cursor():
+    last = ObjectId()
+    collection = RecordingCollection([])
+
+    page, next_cursor = await paginate(
+        collection, {}, PageParams(limit=2, cursor=encode_cursor([last]))
+    )
+
+    assert (page, next_cursor) == ([], None)
+    assert collection.filters == {"$and": [{}, {"$or": [{"_id": {"$gt": last}}]}]}
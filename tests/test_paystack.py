@@ -0,0 +1,195 @@
+import asyncio
+import hashlib
+import hmac
+
+import httpx
+import pytest
+
+from app.general.utils.paystack import (
+    CircuitBreaker,
+    PaystackClient,
+    PaystackError,
+    PaystackSettings,
+    PaystackUnavailable,
+    verify_webhook_signature,
+)
+
+
+def wait(breaker: CircuitBreaker, seconds: float) -> None:
+    """Move the breaker's clock forward by backdating when it opened."""
+    breaker.opened_at -= seconds
+
+
+def test_breaker_opens_after_threshold_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow_request()
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.state == "closed"
+
+
+def test_half_open_lets_one_trial_through_and_closes_on_success():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+
+    wait(breaker, 30)
+    assert breaker.state == "half_open"
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow_request()
+
+
+def test_failed_trial_reopens_for_another_reset_period():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    wait(breaker, 30)
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    wait(breaker, 29)
+    assert not breaker.allow_request()
+    wait(breaker, 1)
+    assert breaker.allow_request()
+
+
+def test_released_trial_lets_the_next_call_try():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    wait(breaker, 30)
+    assert breaker.allow_request()
+
+    breaker.release_trial()
+
+    assert breaker.state == "half_open"
+    assert breaker.allow_request()
+
+
+def client_for(handler) -> PaystackClient:
+    client = PaystackClient()
+    client._client = httpx.AsyncClient(
+        base_url="https://paystack.test", transport=httpx.MockTransport(handler)
+    )
+    return client
+
+
+def half_open(client: PaystackClient) -> None:
+    for _ in range(client.breaker.failure_threshold):
+        client.breaker.record_failure()
+    wait(client.breaker, client.breaker.reset_seconds)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_trial_does_not_wedge_the_breaker():
+    async def slow(request):
+        await asyncio.sleep(10)
+
+    client = client_for(slow)
+    half_open(client)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(client.list_banks(), timeout=0.01)
+
+    assert client.breaker.state == "half_open"
+    assert client.breaker.allow_request()
+
+
+@pytest.mark.asyncio
+async def test_trial_with_uncounted_error_does_not_wedge_the_breaker():
+    def broken(request):
+        raise RuntimeError("bug in the transport")
+
+    client = client_for(broken)
+    half_open(client)
+
+    with pytest.raises(RuntimeError):
+        await client.list_banks()
+
+    assert client.breaker.allow_request()
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_rejects_without_calling_paystack():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"data": []})
+
+    client = client_for(handler)
+    for _ in range(client.breaker.failure_threshold):
+        client.breaker.record_failure()
+
+    with pytest.raises(PaystackUnavailable):
+        await client.list_banks()
+    assert calls == []
+
+
+@pytest.mark.asyncio
+async def test_client_errors_close_the_breaker_and_raise():
+    client = client_for(
+        lambda request: httpx.Response(422, json={"message": "Invalid account"})
+    )
+    half_open(client)
+
+    with pytest.raises(PaystackError) as error:
+        await client.resolve_account("0123456789", "058")
+
+    assert error.value.status_code == 422
+    assert error.value.message == "Invalid account"
+    assert client.breaker.state == "closed"
+
+
+BODY = b'{"event":"charge.success","data":{"reference":"r1","amount":2000}}'
+
+
+def sign(body: bytes, secret: str = "sk_test") -> str:
+    return hmac.new(secret.encode(), body, hashlib.sha512).hexdigest()
+
+
+@pytest.fixture
+def secret_key(monkeypatch):
+    monkeypatch.setattr(PaystackSettings, "SECRET_KEY", "sk_test")
+
+
+def test_webhook_signature_accepts_the_hmac_of_the_raw_body(secret_key):
+    assert verify_webhook_signature(BODY, sign(BODY))
+
+
+@pytest.mark.parametrize(
+    "body, signature",
+    [
+        (BODY.replace(b"2000", b"2"), sign(BODY)),
+        (BODY, sign(BODY, secret="sk_other")),
+        (BODY, sign(BODY)[:-1]),
+        (BODY, None),
+        (BODY, ""),
+    ],
+    ids=["tampered-body", "wrong-secret", "truncated", "missing", "empty"],
+)
+def test_webhook_signature_rejects_anything_else(secret_key, body, signature):
+    assert not verify_webhook_signature(body, signature)
+
+
+def test_webhook_signature_fails_closed_without_a_secret_key(monkeypatch):
+    monkeypatch.setattr(PaystackSettings, "SECRET_KEY", None)
+
+    assert not verify_webhook_signature(BODY, sign(BODY, secret=""))
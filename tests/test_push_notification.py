@@ -0,0 +1,124 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.general.utils import push_notification
+from app.general.utils.push_notification import FCMPusher, PushError, PushSettings
+
+
+class FakeFCM:
+    """Answers multicasts, failing the tokens listed in `errors`."""
+
+    def __init__(self, errors=None, status_code=200):
+        self.errors = errors or {}
+        self.status_code = status_code
+        self.requests = []
+
+    def __call__(self, request):
+        tokens = json.loads(request.content)["registration_ids"]
+        self.requests.append(tokens)
+        results = [
+            {"error": self.errors[token]}
+            if token in self.errors
+            else {"message_id": f"m-{token}"}
+            for token in tokens
+        ]
+        return httpx.Response(self.status_code, json={"results": results})
+
+
+@pytest.fixture
+def pusher(monkeypatch):
+    monkeypatch.setattr(PushSettings, "BATCH_WINDOW_SECONDS", 0.01)
+
+    def build(fcm: FakeFCM) -> FCMPusher:
+        pusher = FCMPusher()
+        pusher._client = httpx.AsyncClient(transport=httpx.MockTransport(fcm))
+        return pusher
+
+    return build
+
+
+@pytest.mark.asyncio
+async def test_same_notification_is_merged_into_one_request(pusher):
+    fcm = FakeFCM()
+    sender = pusher(fcm)
+
+    results = await asyncio.gather(
+        sender.send(["a", "b"], "Order", "Ready"),
+        sender.send(["b", "c"], "Order", "Ready"),
+    )
+
+    assert fcm.requests == [["a", "b", "c"]]
+    assert results == [{"sent": 2, "invalid": []}, {"sent": 2, "invalid": []}]
+
+
+@pytest.mark.asyncio
+async def test_each_caller_gets_its_own_token_outcomes(pusher):
+    fcm = FakeFCM(errors={"dead": "NotRegistered", "busy": "Unavailable"})
+    sender = pusher(fcm)
+
+    good, dead, busy = await asyncio.gather(
+        sender.send(["ok"], "Order", "Ready"),
+        sender.send(["dead"], "Order", "Ready"),
+        sender.send(["busy"], "Order", "Ready"),
+    )
+
+    assert len(fcm.requests) == 1
+    assert good == {"sent": 1, "invalid": []}
+    assert dead == {"sent": 0, "invalid": ["dead"]}
+    assert busy == {"sent": 0, "invalid": []}
+
+
+@pytest.mark.asyncio
+async def test_large_batches_are_split(pusher, monkeypatch):
+    monkeypatch.setattr(PushSettings, "MAX_TOKENS_PER_REQUEST", 2)
+    fcm = FakeFCM()
+
+    result = await pusher(fcm).send(["a", "b", "c"], "Order", "Ready")
+
+    assert fcm.requests == [["a", "b"], ["c"]]
+    assert result == {"sent": 3, "invalid": []}
+
+
+@pytest.mark.asyncio
+async def test_request_failures_reach_every_caller(pusher):
+    sender = pusher(FakeFCM(status_code=401))
+
+    results = await asyncio.gather(
+        sender.send(["a"], "Order", "Ready"),
+        sender.send(["b"], "Order", "Ready"),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(result, PushError) for result in results)
+    assert results[0] is not results[1]
+
+
+@pytest.mark.asyncio
+async def test_send_push_notification_fails_for_a_rejected_token(pusher, monkeypatch):
+    sender = pusher(FakeFCM(errors={"dead": "NotRegistered"}))
+    monkeypatch.setattr(push_notification, "fcm_pusher", sender)
+
+    with pytest.raises(HTTPException):
+        await asyncio.gather(
+            push_notification.send_push_notification("ok", "Order", "Ready"),
+            push_notification.send_push_notification("dead", "Order", "Ready"),
+        )
+
+
+@pytest.mark.asyncio
+async def test_close_flushes_pending_sends(pusher, monkeypatch):
+    monkeypatch.setattr(PushSettings, "BATCH_WINDOW_SECONDS", 60)
+    fcm = FakeFCM()
+    sender = pusher(fcm)
+
+    send = asyncio.ensure_future(sender.send(["a"], "Order", "Ready"))
+    await asyncio.sleep(0)
+    await sender.aclose()
+
+    assert await send == {"sent": 1, "invalid": []}
+    assert fcm.requests == [["a"]]
+    assert not sender._flushes
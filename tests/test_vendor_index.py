@@ -0,0 +1,143 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.general.utils import vendor_index as vendor_index_module
+from app.general.utils.distance import MONGO_SPHERE_RADIUS_KM, haversine_km
+from app.general.utils.pagination import PageParams, decode_cursor
+from app.general.utils.vendor_index import (
+    VendorGridIndex,
+    VendorIndexSettings,
+    nearby_vendors,
+)
+
+# Around Jos; 0.01 degrees of latitude is ~1.1 km
+ORIGIN = (8.9, 9.9)
+
+
+def card(vendor_id, longitude, latitude, **fields):
+    return {
+        "_id": vendor_id,
+        "store_name": vendor_id.upper(),
+        "location": {"type": "Point", "coordinates": [longitude, latitude]},
+        "is_onboarded": True,
+        "is_approved": True,
+        **fields,
+    }
+
+
+@pytest.fixture
+def index():
+    index = VendorGridIndex()
+    index._apply_all(
+        [
+            card("near", 8.9, 9.91),
+            card("mid", 8.9, 9.95),
+            card("far", 8.9, 10.2),
+            card("pending", 8.9, 9.905, is_approved=False),
+            {"_id": "nowhere", "is_onboarded": True, "is_approved": True},
+        ]
+    )
+    return index
+
+
+def test_within_returns_discoverable_vendors_nearest_first(index):
+    hits = index.within(*ORIGIN, radius_m=10_000)
+
+    assert [vendor_id for _, vendor_id in hits] == ["near", "mid"]
+    expected = 1000 * haversine_km(ORIGIN, (8.9, 9.91), MONGO_SPHERE_RADIUS_KM)
+    assert hits[0][0] == pytest.approx(expected)
+
+
+def test_within_spans_neighbouring_cells(index):
+    # "far" is several cells away; a big enough radius must still reach it
+    hits = index.within(*ORIGIN, radius_m=50_000)
+
+    assert [vendor_id for _, vendor_id in hits] == ["near", "mid", "far"]
+
+
+def test_nearest_widens_the_search_until_k_are_found(index):
+    hits = index.nearest(*ORIGIN, k=3, max_radius_m=100_000)
+
+    assert [vendor_id for _, vendor_id in hits] == ["near", "mid", "far"]
+    assert index.nearest(*ORIGIN, k=3, max_radius_m=10_000) == hits[:2]
+
+
+def test_apply_moves_and_removes_vendors(index):
+    index.apply(card("near", 8.9, 10.21))
+    index.apply(card("mid", 8.9, 9.95, is_approved=False))
+
+    assert [v for _, v in index.within(*ORIGIN, radius_m=50_000)] == ["far", "near"]
+    assert index.stats()["vendors"] == 2
+
+
+def test_card_is_compact_and_carries_distance(index):
+    result = index.card("near", 1234.5)
+
+    assert result == {
+        "_id": "near",
+        "store_name": "NEAR",
+        "location": {"type": "Point", "coordinates": [8.9, 9.91]},
+        "distance_km": 1.23,
+    }
+
+
+def test_freshness_follows_refreshes(index, monkeypatch):
+    assert index.is_fresh()
+    monkeypatch.setattr(
+        vendor_index_module.VendorIndexSettings, "MAX_STALENESS_SECONDS", 0
+    )
+    assert not index.is_fresh()
+    assert not VendorGridIndex().is_fresh()
+
+
+@pytest.mark.asyncio
+async def test_nearby_vendors_pages_from_a_fresh_index(index, monkeypatch):
+    monkeypatch.setattr(vendor_index_module, "vendor_index", index)
+
+    first, cursor = await nearby_vendors(
+        None, *ORIGIN, radius_km=50, page=PageParams(limit=2, cursor=None)
+    )
+    second, last_cursor = await nearby_vendors(
+        None, *ORIGIN, radius_km=50, page=PageParams(limit=2, cursor=cursor)
+    )
+
+    assert [v["_id"] for v in first] == ["near", "mid"]
+    assert decode_cursor(cursor, 2)[1] == "mid"
+    assert [v["_id"] for v in second] == ["far"]
+    assert last_cursor is None
+
+
+class FakeCards:
+    """vendor_profile, as far as the index's refresh queries it."""
+
+    def __init__(self, cards):
+        self.cards = cards
+
+    def find(self, query, projection):
+        since = query.get("updated_at", {}).get("$gt")
+        self.matched = [
+            card for card in self.cards if since is None or card["updated_at"] > since
+        ]
+        return self
+
+    async def to_list(self, length):
+        return self.matched
+
+
+@pytest.mark.asyncio
+async def test_refresh_overlaps_the_watermark_for_clock_skew(monkeypatch):
+    monkeypatch.setattr(VendorIndexSettings, "REFRESH_OVERLAP_SECONDS", 60)
+    now = datetime.now()
+    # Stamped by a host whose clock runs 30s ahead
+    cards = [card("ahead", 8.9, 9.91, updated_at=now + timedelta(seconds=30))]
+    db = {vendor_index_module.NEXTCHOW_COLLECTIONS.VENDOR_PROFILE: FakeCards(cards)}
+    index = VendorGridIndex()
+    await index.load(db)
+
+    # Written afterwards by a host with an accurate clock
+    cards.append(card("behind", 8.9, 9.95, updated_at=now + timedelta(seconds=5)))
+    await index.refresh(db)
+
+    hits = index.within(*ORIGIN, radius_m=10_000)
+    assert [vendor_id for _, vendor_id in hits] == ["ahead", "behind"]